@@ -5,33 +5,21 @@ import os
 import webview
 from screeninfo import get_monitors
 import shutil
+import json
+import threading
+import urllib.request
 
 DEBUG = True
+PING_URL = 'http://localhost:7000/ping'
+STARTUP_TIMEOUT = 180  # seconds, slow Raspberry Pis need a while for the first start
+# line printed by py/main.py once the server accepts requests
+READY_MARKER = 'AETHERONE_READY'
 
 def debug_print(message):
     if DEBUG:
         print(f"[DEBUG] {message}")
         sys.stdout.flush()
 
-def show_loader(message, duration):
-    """Show an animated loader for the specified duration"""
-    import threading
-    import time
-    
-    def animate():
-        chars = ['|', '/', '-', '\\']
-        start_time = time.time()
-        i = 0
-        while time.time() - start_time < duration:
-            print(f"\r{message} {chars[i % len(chars)]}", end='', flush=True)
-            time.sleep(0.2)
-            i += 1
-        print(f"\r{message} ✓", flush=True)
-    
-    thread = threading.Thread(target=animate, daemon=True)
-    thread.start()
-    return thread
-
 def find_python_executable():
     """Find a working Python executable"""
     debug_print("Finding Python executable...")
@@ -71,6 +59,43 @@ def find_python_executable():
         # Development mode
         return sys.executable
 
+def check_ready(url):
+    """True if the server answers the readiness probe with ready."""
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            if response.status != 200:
+                return False
+            try:
+                return json.loads(response.read()).get('ready', True)
+            except ValueError:
+                return True
+    except Exception as e:
+        debug_print(f"Readiness probe: {e}")
+        return False
+
+def wait_until_ready(url, timeout, ready_event=None, process=None):
+    """
+    Waits until the server is ready, probing with exponential backoff (50 ms up to 2 s). The ready line on
+    stdout (ready_event) ends one backoff pause right away. Returns the seconds waited or None on failure.
+    """
+    start = time.monotonic()
+    delay = 0.05
+    attempt = 0
+    while time.monotonic() - start < timeout:
+        attempt += 1
+        print(f"\rWaiting for the Flask server ... {time.monotonic() - start:.1f} s (attempt {attempt})", end='', flush=True)
+        if check_ready(url):
+            return time.monotonic() - start
+        if process is not None and process.poll() is not None:
+            debug_print("Flask process died!")
+            return None
+        if ready_event is not None and ready_event.wait(delay):
+            ready_event.clear()  # only the first wake-up, later probes back off again
+        elif ready_event is None:
+            time.sleep(delay)
+        delay = min(delay * 2, 2.0)
+    return None
+
 def get_resource_path(relative_path):
     """Get absolute path to resource"""
     try:
@@ -118,14 +143,9 @@ def main():
                     import traceback
                     traceback.print_exc()
             
-            import threading
             flask_thread = threading.Thread(target=run_flask, daemon=True)
             flask_thread.start()
             
-            # Give Flask time to start
-            debug_print("Waiting for Flask to start...")
-            time.sleep(5)
-            
         else:
             # Development mode - use subprocess as before
             debug_print("Running in development mode - using subprocess")
@@ -163,69 +183,34 @@ def main():
             creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
             )
         
+        ready_event = threading.Event()
         if not getattr(sys, 'frozen', False):
             # Only for development mode with subprocess
             debug_print(f"Flask started with PID: {flask_process.pid}")
             
-            # Start thread to read Flask output
+            # Start thread to read Flask output, the ready line wakes up the readiness check
             def read_flask_output():
                 debug_print("Starting Flask output reader...")
                 try:
                     for line in flask_process.stdout:
+                        if line.startswith(READY_MARKER):
+                            ready_event.set()
                         print(f"[FLASK] {line.rstrip()}")
                         sys.stdout.flush()
                 except Exception as e:
                     debug_print(f"Flask output reader error: {e}")
             
-            import threading
             flask_output_thread = threading.Thread(target=read_flask_output, daemon=True)
             flask_output_thread.start()
-            
-            # Wait for Flask to start with visual feedback
-            debug_print("Waiting for Flask to start...")
-            loader_thread = show_loader("Starting Flask server", 12)
-            time.sleep(12)  # Give it more time to handle socket binding issues
-            loader_thread.join()  # Wait for loader to finish
-            
-            # Check if Flask is still running
-            if flask_process.poll() is not None:
-                debug_print("Flask process died!")
-                input("Press Enter to exit...")
-                return
-        
-        # Test connection with more patience for socket binding issues
-        debug_print("Testing Flask connection...")
-        import urllib.request
-        
-        connection_successful = False
-        print("Testing connection to Flask server...")
-        
-        for attempt in range(15):  # More attempts
-            try:
-                # Show a mini loader for each attempt
-                print(f"\rAttempt {attempt + 1}/15... ", end='', flush=True)
-                # Use /ping endpoint for health check instead of main page
-                response = urllib.request.urlopen('http://localhost:7000/ping', timeout=5)
-                print(f"\r✓ Flask server ready! Health check OK (Status: {response.code})")
-                debug_print(f"✓ Flask server ready! Health check OK (Status: {response.code})")
-                connection_successful = True
-                break
-            except Exception as e:
-                if attempt < 14:  # Don't show error on last attempt
-                    print(f"\rAttempt {attempt + 1}/15 failed, retrying... ", end='', flush=True)
-                debug_print(f"Attempt {attempt + 1}/15: {e}")
-                if "10061" in str(e) or "Connection refused" in str(e):
-                    # Connection refused - Flask might still be starting
-                    time.sleep(3)  # Longer wait for socket binding issues
-                else:
-                    time.sleep(2)
         
-        if not connection_successful:
-            print(f"\r❌ Could not connect to Flask after 15 attempts!")
-            debug_print("Could not connect to Flask after 15 attempts!")
+        debug_print("Waiting for Flask to become ready...")
+        seconds = wait_until_ready(PING_URL, STARTUP_TIMEOUT, ready_event, flask_process)
+        if seconds is None:
+            print(f"\r❌ Flask server not ready after {STARTUP_TIMEOUT} seconds!")
             debug_print("Flask process might have socket binding issues.")
             input("Press Enter to exit...")
             return
+        print(f"\r✓ Flask server ready after {seconds:.2f} s")
         
         # Start webview
         debug_print("Starting webview...")
@@ -367,7 +352,6 @@ def main():
                     except:
                         break  # Window might be closed
             
-            import threading
             threading.Thread(target=periodic_check, daemon=True).start()
 
         api = Api()
@@ -381,7 +365,6 @@ def main():
             js_api=api
         )
         
-        import threading
         threading.Thread(target=setup_bottom_bar, daemon=True).start()
         window.events.closed += on_window_closed
         webview.start()
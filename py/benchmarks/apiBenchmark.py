@@ -0,0 +1,279 @@
+"""
+Benchmark of the REST API. Boots AetherOnePy against a temporary data folder with deterministic stub hotbits,
+drives the main endpoints with concurrent clients and reports throughput and latency percentiles as JSON.
+
+    python benchmarks/apiBenchmark.py -c 8 -n 200 -o before.json
+    python benchmarks/apiBenchmark.py -c 8 -n 200 -o after.json --compare before.json
+
+With --compare the exit code is 1 if a scenario got slower than the threshold, so it can be used in CI.
+"""
+import argparse
+import contextlib
+import http.client
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.stubHotbits import StubHotbitsService
+from domains.aetherOneDomains import Catalog, Rate
+from services.productionServer import BoundedWSGIServer
+
+SCENARIOS = ('case', 'session', 'analysis', 'analyze', 'checkGV', 'rateCard', 'broadcast')
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))]
+
+
+class BenchmarkServer:
+    """
+    AetherOnePy on a free local port, with its own data folder and stub hotbits.
+    """
+
+    def __init__(self, catalog_size: int = 1000, workers: int = 64):
+        from main import AetherOnePy  # imported late, main pulls in all services
+        self.folder = tempfile.TemporaryDirectory(prefix='aetherone-benchmark-')
+        self.aetherOnePy = AetherOnePy('production', project_root=self.folder.name, collect_hotbits=False)
+        self.aetherOnePy.hotbits = StubHotbitsService(os.path.join(self.folder.name, 'hotbits'),
+                                                      self.aetherOnePy.aetherOneDB)
+        self.aetherOnePy.analysisJobs.hotbits = self.aetherOnePy.hotbits
+        self.aetherOnePy.start_services()
+        self.server = BoundedWSGIServer('127.0.0.1', 0, self.aetherOnePy.app, max_workers=workers,
+                                        max_connections=workers * 4)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.aetherOnePy.mark_ready()
+        self.catalog_id = self._create_catalog(catalog_size)
+
+    def _create_catalog(self, size: int) -> int:
+        db = self.aetherOnePy.aetherOneDB
+        db.insert_catalog(Catalog('Benchmark', 'Generated rates', 'apiBenchmark'))
+        catalog_id = db.get_catalog_by_name('Benchmark').id
+        for number in range(size):
+            db.insert_rate(Rate(f"Rate {number:05d}", f"Generated rate {number}", catalog_id))
+        return catalog_id
+
+    def close(self):
+        self.server.shutdown()
+        self.aetherOnePy.broadcastScheduler.stop()
+        self.aetherOnePy.broadcastService.stop()
+        self.aetherOnePy.rateCardBatch.shutdown()
+        self.aetherOnePy.analysisJobs.shutdown()
+        self.aetherOnePy.aetherOneDB.close()
+        self.folder.cleanup()
+
+
+class Client:
+    """
+    HTTP client with one keep-alive connection, each benchmark thread has its own.
+    """
+
+    def __init__(self, port: int):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+
+    def request(self, method: str, path: str, body=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        try:
+            self.connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                                    headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            raise
+        if response.status >= 400:
+            raise RuntimeError(f"{method} {path} returned {response.status}")
+        return json.loads(data) if response.getheader('Content-Type', '').startswith('application/json') else data
+
+    def close(self):
+        self.connection.close()
+
+
+class ApiBenchmark:
+
+    def __init__(self, server: BenchmarkServer, concurrency: int = 4, requests_per_scenario: int = 100):
+        self.server = server
+        self.concurrency = max(1, concurrency)
+        self.requests_per_scenario = requests_per_scenario
+        self.counter = itertools.count()
+        self.context = self._prepare()
+
+    def _prepare(self) -> dict:
+        client = Client(self.server.port)
+        now = datetime.now().isoformat()
+        case = client.request('POST', '/case', {'name': 'Benchmark case', 'email': '', 'color': '#000000',
+                                                 'description': '', 'created': now, 'lastChange': now})
+        client.request('POST', '/session', {'intention': 'Benchmark', 'description': '', 'caseID': case['id']})
+        session_id = self.server.aetherOnePy.aetherOneDB.get_last_session(case['id']).id
+        analysis = client.request('POST', '/analysis', {'note': 'Benchmark', 'sessionID': session_id,
+                                                        'catalogId': self.server.catalog_id})
+        client.request('POST', '/analyze', {'analysis_id': analysis['id'], 'catalog_id': self.server.catalog_id})
+        client.close()
+        return {'case_id': case['id'], 'session_id': session_id, 'analysis_id': analysis['id'], 'created': now}
+
+    def call(self, client: Client, scenario: str):
+        number = next(self.counter)
+        context = self.context
+        if scenario == 'case':
+            client.request('POST', '/case', {'name': f"Case {number}", 'email': '', 'color': '#000000',
+                                             'description': '', 'created': context['created'],
+                                             'lastChange': context['created']})
+            client.request('GET', '/case')
+        elif scenario == 'session':
+            client.request('POST', '/session', {'intention': f"Session {number}", 'description': '',
+                                                'caseID': context['case_id']})
+            client.request('GET', f"/session?caseId={context['case_id']}")
+        elif scenario == 'analysis':
+            client.request('POST', '/analysis', {'note': f"Analysis {number}", 'sessionID': context['session_id'],
+                                                 'catalogId': self.server.catalog_id})
+        elif scenario == 'analyze':
+            client.request('POST', '/analyze', {'analysis_id': context['analysis_id'],
+                                                'catalog_id': self.server.catalog_id})
+        elif scenario == 'checkGV':
+            client.request('GET', '/checkGV')
+        elif scenario == 'rateCard':
+            # different rates every time, otherwise the response cache answers
+            client.request('GET', f"/rateCard?rates={number % 10}.{number % 97}%20{number % 11}.5&rateName=Card{number}")
+        elif scenario == 'broadcast':
+            client.request('POST', '/broadcast', {'analysis_id': None, 'intention': f"Benchmark {number}",
+                                                  'signature': f"Signature {number}"})
+        else:
+            raise ValueError(f"Unknown scenario {scenario}")
+
+    def run_scenario(self, scenario: str) -> dict:
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        remaining = itertools.count()
+
+        def worker():
+            client = Client(self.server.port)
+            while next(remaining) < self.requests_per_scenario:
+                start = time.perf_counter()
+                try:
+                    self.call(client, scenario)
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    client = Client(self.server.port)
+                    continue
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+            client.close()
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+        if scenario == 'broadcast':
+            Client(self.server.port).request('DELETE', '/broadcast')
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': len(errors),
+            'first_error': errors[0] if errors else None,
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(len(latencies) / duration, 2) if duration else 0.0,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+                'p50': round(percentile(latencies, 0.50) * 1000, 3),
+                'p90': round(percentile(latencies, 0.90) * 1000, 3),
+                'p99': round(percentile(latencies, 0.99) * 1000, 3),
+                'max': round(percentile(latencies, 1.0) * 1000, 3)
+            }
+        }
+
+    def run(self, scenarios=SCENARIOS) -> dict:
+        results = {}
+        for scenario in scenarios:
+            self.server.aetherOnePy.hotbits.reset()
+            results[scenario] = self.run_scenario(scenario)
+            latency = results[scenario]['latency_ms']
+            print(f"{scenario:>10}: {results[scenario]['throughput_rps']:>8} req/s | p50 {latency['p50']} ms | "
+                  f"p99 {latency['p99']} ms | errors {results[scenario]['errors']}", file=sys.stderr)
+        return results
+
+
+def environment_info() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'timestamp': datetime.now().isoformat()}
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2) -> list:
+    """
+    Lists the regressions of current against baseline: p50/p99 latency higher or throughput lower than the threshold.
+    """
+    regressions = []
+    for scenario, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(scenario)
+        if before is None:
+            continue
+        checks = [('p50', before['latency_ms']['p50'], result['latency_ms']['p50'], True),
+                  ('p99', before['latency_ms']['p99'], result['latency_ms']['p99'], True),
+                  ('throughput', before['throughput_rps'], result['throughput_rps'], False)]
+        for metric, old, new, lower_is_better in checks:
+            if not old:
+                continue
+            change = (new - old) / old
+            if (change > threshold) if lower_is_better else (change < -threshold):
+                regressions.append({'scenario': scenario, 'metric': metric, 'baseline': old, 'current': new,
+                                    'change': round(change * 100, 1)})
+    return regressions
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(prog='apiBenchmark', description='Benchmark of the AetherOnePy REST API')
+    argParser.add_argument('-c', '--concurrency', type=int, default=4)
+    argParser.add_argument('-n', '--requests', type=int, default=100, help='requests per scenario')
+    argParser.add_argument('-s', '--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    argParser.add_argument('--catalog-size', type=int, default=1000, help='number of rates analyzed by /analyze')
+    argParser.add_argument('-o', '--output', help='write the JSON report to this file')
+    argParser.add_argument('--compare', help='JSON report of an earlier run')
+    argParser.add_argument('--threshold', type=float, default=20, help='allowed slowdown in percent')
+    args = argParser.parse_args()
+
+    # the server logs to stdout, which is kept for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        server = BenchmarkServer(args.catalog_size)
+        try:
+            benchmark = ApiBenchmark(server, args.concurrency, args.requests)
+            report = {'environment': environment_info(),
+                      'config': {'concurrency': args.concurrency, 'requests': args.requests,
+                                 'catalog_size': args.catalog_size},
+                      'scenarios': benchmark.run(args.scenarios)}
+        finally:
+            server.close()
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            report['regressions'] = compare(json.load(f), report, args.threshold / 100)
+        exit_code = 1 if report['regressions'] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+    sys.exit(exit_code)
@@ -0,0 +1,143 @@
+"""
+Memory and construction time of large catalogs: the slotted domain classes built by their sqlite3 row factory
+against the former dict-backed classes built by hand from the row indexes.
+
+    python benchmarks/domainMemoryReport.py                   # 50000 rates
+    python benchmarks/domainMemoryReport.py --rates 200000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from domains.aetherOneDomains import Rate, AnalysisRate, Session
+
+
+class LegacyRate:
+    def __init__(self, signature: str, description: str, catalogID: int):
+        self.id = 0
+        self.signature = signature
+        self.description = description
+        self.catalogID = catalogID
+
+
+class LegacyAnalysisRate:
+    def __init__(self, signature: str, description: str, catalog_id: int, analysis_id: int, energetic_value: int,
+                 gv: int, level: int, potency_type: str, potency: int, note: str):
+        self.id = 0
+        self.signature = signature
+        self.description = description
+        self.catalog_id = catalog_id
+        self.analysis_id = analysis_id
+        self.energetic_value = energetic_value
+        self.gv = gv
+        self.level = level
+        self.potency_type = potency_type
+        self.potency = potency
+        self.note = note
+
+
+class LegacySession:
+    def __init__(self, intention: str, description: str, caseID: int):
+        self.id = 0
+        self.intention = intention
+        self.description = description
+        self.created = datetime.now()
+        self.caseID = caseID
+
+
+def legacy_rate(row):
+    rate = LegacyRate(row[1], row[2], row[3])
+    rate.id = row[0]
+    return rate
+
+
+def legacy_analysis_rate(row):
+    rate = LegacyAnalysisRate(row[1], row[2], row[3], row[4], row[5], row[6], row[7], row[8], row[9], row[10])
+    rate.id = row[0]
+    return rate
+
+
+def legacy_session(row):
+    session = LegacySession(row[1], row[2], row[4])
+    session.created = datetime.fromisoformat(row[3])
+    session.id = row[0]
+    return session
+
+
+def create_database(rates: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE rate (id INTEGER PRIMARY KEY AUTOINCREMENT, signature TEXT, description TEXT, '
+                 'catalog_id INTEGER NOT NULL)')
+    conn.execute('CREATE TABLE rate_analysis (id INTEGER PRIMARY KEY AUTOINCREMENT, signature TEXT, '
+                 'description TEXT, catalog_id INTEGER NOT NULL, analysis_id INTEGER NOT NULL, energetic_value INTEGER, '
+                 'gv INTEGER, level INTEGER, potencyType TEXT, potency INTEGER, note TEXT)')
+    conn.execute('CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, intention TEXT, description TEXT, '
+                 'created DATETIME, case_id INTEGER)')
+    conn.executemany('INSERT INTO rate (signature, description, catalog_id) VALUES (?, ?, 1)',
+                     [(f"Rate {n}", f"Description of rate {n}") for n in range(rates)])
+    conn.executemany('INSERT INTO rate_analysis (signature, description, catalog_id, analysis_id, energetic_value, gv, '
+                     'level, potencyType, potency, note) VALUES (?, ?, 1, 1, ?, ?, 0, "", 0, "")',
+                     [(f"Rate {n}", f"Description of rate {n}", n % 1000, n % 1500) for n in range(rates)])
+    conn.executemany("INSERT INTO sessions (intention, description, created, case_id) VALUES (?, '', datetime('now'), 1)",
+                     [(f"Session {n}",) for n in range(rates)])
+    return conn
+
+
+def load_legacy(conn, query: str, build) -> list:
+    return [build(row) for row in conn.execute(query)]
+
+
+def load_slotted(conn, query: str, row_factory) -> list:
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    return cursor.execute(query).fetchall()
+
+
+def measure(load, rounds: int = 5) -> dict:
+    load()  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        load()
+    seconds = (time.perf_counter() - start) / rounds
+    tracemalloc.start()
+    objects = load()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'ms': seconds * 1000, 'mb': memory / 1024 / 1024, 'bytes_per_object': memory / max(1, len(objects))}
+
+
+def report(rates: int) -> list:
+    conn = create_database(rates)
+    cases = [
+        ('rate', 'SELECT * FROM rate', legacy_rate, Rate.from_row),
+        ('rate_analysis', 'SELECT * FROM rate_analysis', legacy_analysis_rate, AnalysisRate.from_row),
+        ('sessions', 'SELECT * FROM sessions', legacy_session, Session.from_row),
+    ]
+    rows = []
+    for table, query, legacy_build, row_factory in cases:
+        legacy = measure(lambda: load_legacy(conn, query, legacy_build))
+        slotted = measure(lambda: load_slotted(conn, query, row_factory))
+        rows.append({'table': table, 'legacy': legacy, 'slotted': slotted})
+    conn.close()
+    return rows
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(prog='domainMemoryReport', description='Memory of large catalogs')
+    argParser.add_argument('--rates', type=int, default=50000, help='rows per table')
+    args = argParser.parse_args()
+
+    print(f"{args.rates} rows per table, Python {sys.version.split()[0]}")
+    print(f"{'table':<14} {'':<8} {'load ms':>9} {'MB':>8} {'B/object':>9}")
+    for row in report(args.rates):
+        for name in ('legacy', 'slotted'):
+            values = row[name]
+            print(f"{row['table']:<14} {name:<8} {values['ms']:>9.1f} {values['mb']:>8.2f} "
+                  f"{values['bytes_per_object']:>9.0f}")
+        print(f"{'':<14} {'change':<8} {row['slotted']['ms'] / row['legacy']['ms'] - 1:>+9.0%} "
+              f"{row['slotted']['mb'] / row['legacy']['mb'] - 1:>+8.0%}")
@@ -0,0 +1,300 @@
+"""
+Micro-benchmarks of the hot paths with deterministic stub entropy.
+
+    python benchmarks/microBenchmarks.py                      # run all
+    python benchmarks/microBenchmarks.py -k analyze           # only benchmarks containing 'analyze'
+    python benchmarks/microBenchmarks.py --save before        # store the results as baseline 'before'
+    python benchmarks/microBenchmarks.py --compare before     # compare against the baseline 'before'
+
+Baselines are JSON files in benchmarks/baselines, they are only comparable on the same machine.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.stubHotbits import StubHotbitsService
+from domains.aetherOneDomains import Case, Session, Analysis, Catalog, AnalysisRate
+from services.analyzeService import analyze, analyze_catalogs
+from services.captureRandomnessFromWebCam import WebCamCollector
+from services.databaseService import CaseDAO
+from services.hotbitsService import generate_random_integer
+from services.rateCard import RadionicChart
+
+BASELINE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+CATALOG_SIZES = (100, 1000, 5000)
+SEED = 42
+
+BENCHMARKS = {}  # name -> factory(context) returning the function to measure
+
+
+def benchmark(name: str):
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+class Context:
+    """
+    Shared, deterministic test data: a temporary database with cases, sessions, analyses and a catalog.
+    """
+
+    def __init__(self):
+        self.folder = tempfile.TemporaryDirectory(prefix='aetherone-micro-')
+        self.hotbits_folder = os.path.join(self.folder.name, 'hotbits')
+        os.makedirs(self.hotbits_folder)
+        self.dao = CaseDAO(os.path.join(self.folder.name, 'benchmark.db'))
+        self.hotbits = StubHotbitsService(self.hotbits_folder, self.dao, SEED)
+
+        self.dao.insert_catalog(Catalog('Benchmark', 'Generated rates', 'microBenchmarks'))
+        self.catalog_id = self.dao.get_catalog_by_name('Benchmark').id
+        self.dao.conn.executemany('INSERT INTO rate (signature, description, catalog_id) VALUES (?, ?, ?)',
+                                  [(f"Rate {n:05d}", f"Generated rate {n}", self.catalog_id)
+                                   for n in range(max(CATALOG_SIZES))])
+        self.rates = self.dao.list_rates_from_catalog(self.catalog_id)
+
+        now = datetime.now()
+        for n in range(200):
+            self.dao.insert_case(Case(f"Case {n}", '', '#000000', '', now, now))
+        self.case_id = self.dao.list_cases()[0].id
+        for n in range(200):
+            self.dao.insert_session(Session(f"Session {n}", '', self.case_id))
+        self.session_id = self.dao.get_last_session(self.case_id).id
+        for n in range(200):
+            analysis = Analysis(f"Analysis {n}", self.session_id)
+            analysis.catalogId = self.catalog_id
+            self.dao.insert_analysis(analysis)
+        self.analysis_id = self.dao.get_last_analysis(self.session_id).id
+        self.dao.insert_rates_for_analysis([
+            AnalysisRate(rate.signature, rate.description, self.catalog_id, self.analysis_id, n, 0, 0, '', 0, '')
+            for n, rate in enumerate(self.rates[:1000])])
+
+    def reset_entropy(self):
+        self.hotbits.reset()
+
+    def close(self):
+        self.dao.close()
+        self.folder.cleanup()
+
+
+for _size in CATALOG_SIZES:
+    @benchmark(f"analyze.default[{_size}]")
+    def _analyze_default(context, size=_size):
+        rates = context.rates[:size]
+        return lambda: analyze(1, list(rates), context.hotbits)
+
+    @benchmark(f"analyze.advanced[{_size}]")
+    def _analyze_advanced(context, size=_size):
+        rates = context.rates[:size]
+        return lambda: analyze(1, list(rates), context.hotbits, enhancedAnalysis=True)
+
+
+@benchmark(f"analyze.columnar[{max(CATALOG_SIZES)}]")
+def _analyze_columnar(context):
+    catalog = context.dao.get_catalog_columns(context.catalog_id)
+    return lambda: analyze(1, catalog, context.hotbits)
+
+
+@benchmark(f"analyze.catalogs[10x{max(CATALOG_SIZES)}]")
+def _analyze_catalogs(context):
+    catalogs = [context.dao.get_catalog_columns(context.catalog_id)] * 10
+    return lambda: analyze_catalogs(1, catalogs, context.hotbits)
+
+
+@benchmark(f"analyze.separately[10x{max(CATALOG_SIZES)}]")
+def _analyze_separately(context):
+    catalog = context.dao.get_catalog_columns(context.catalog_id)
+    return lambda: [analyze(1, catalog, context.hotbits) for _ in range(10)]
+
+
+@benchmark("analyze.autoCheckGV[1000]")
+def _analyze_gv(context):
+    rates = context.rates[:1000]
+    return lambda: analyze(1, list(rates), context.hotbits, autoCheckGV=True)
+
+
+@benchmark("hotbits.getInt")
+def _get_int(context):
+    return lambda: context.hotbits.getInt(0, 1000)
+
+
+@benchmark("hotbits.getInts[1000]")
+def _get_ints(context):
+    return lambda: context.hotbits.getInts(0, 1000, 1000)
+
+
+@benchmark("hotbits.getHotbits[file]")
+def _get_hotbits(context):
+    # the real implementation, which loads (and deletes) one hotbits file of 10000 integers
+    from services.hotbitsService import HotbitsService
+    integers = np.random.default_rng(SEED).integers(0, 2 ** 32, 10000).tolist()
+    content = json.dumps({"integerList": integers, "source": "benchmark"})
+
+    def load():
+        with open(os.path.join(context.hotbits_folder, 'hotbits_benchmark.json'), 'w') as f:
+            f.write(content)
+        return HotbitsService.getHotbits(context.hotbits)
+    return load
+
+
+@benchmark("hotbits.generate_random_integer")
+def _generate_random_integer(context):
+    return lambda: generate_random_integer()
+
+
+@benchmark("webcam.pixel_to_bit[640x480]")
+def _pixel_to_bit(context):
+    rng = np.random.default_rng(SEED)
+    frame1 = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    frame2 = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    collector = WebCamCollector(None, None)
+    return lambda: collector.pixel_to_bit(frame1, frame2)
+
+
+@benchmark("rateCard.draw_chart")
+def _draw_chart(context):
+    chart = RadionicChart('Benchmark', 'base10')
+    rates = RadionicChart.parse_input('10.34 5.75 1.5 4.65')
+    return lambda: chart.draw_chart(rates)
+
+
+@benchmark("rateCard.render_png")
+def _render_png(context):
+    chart = RadionicChart('Benchmark', 'base44')
+    rates = RadionicChart.parse_input('40.2 5.75 21.5 4.65')
+    return lambda: chart.render(rates, 'png')
+
+
+@benchmark("dao.list_cases[200]")
+def _list_cases(context):
+    return lambda: context.dao.list_cases()
+
+
+@benchmark("dao.list_sessions[200]")
+def _list_sessions(context):
+    return lambda: context.dao.list_sessions(context.case_id)
+
+
+@benchmark("dao.list_analysis[200]")
+def _list_analysis(context):
+    return lambda: context.dao.list_analysis(context.session_id)
+
+
+@benchmark("dao.list_catalogs")
+def _list_catalogs(context):
+    return lambda: context.dao.list_catalogs()
+
+
+@benchmark(f"dao.list_rates_from_catalog[{max(CATALOG_SIZES)}]")
+def _list_rates_from_catalog(context):
+    return lambda: context.dao.list_rates_from_catalog(context.catalog_id)
+
+
+@benchmark("dao.list_rates_for_analysis[1000]")
+def _list_rates_for_analysis(context):
+    return lambda: context.dao.list_rates_for_analysis(context.analysis_id)
+
+
+def measure(function, context: Context, min_time: float = 0.5, min_rounds: int = 3, max_rounds: int = 1000) -> dict:
+    """
+    Calls the function until min_time has passed (at least min_rounds times), the entropy is reset before
+    every call so each round does exactly the same work.
+    """
+    context.reset_entropy()
+    function()  # warm up caches
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_rounds and (len(timings) < min_rounds or time.perf_counter() - started < min_time):
+        context.reset_entropy()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {
+        'rounds': len(timings),
+        'min_ms': round(min(timings) * 1000, 4),
+        'median_ms': round(statistics.median(timings) * 1000, 4),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 4),
+        'stdev_ms': round(statistics.stdev(timings) * 1000, 4) if len(timings) > 1 else 0.0
+    }
+
+
+def run(selection: str | None = None, min_time: float = 0.5) -> dict:
+    context = Context()
+    results = {}
+    try:
+        for name, factory in BENCHMARKS.items():
+            if selection and selection not in name:
+                continue
+            # the log output of the services would dominate the terminal and the timings
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                results[name] = measure(factory(context), context, min_time)
+            print(f"{name:<40} median {results[name]['median_ms']:>12.4f} ms  min {results[name]['min_ms']:>12.4f} ms"
+                  f"  ({results[name]['rounds']} rounds)", file=sys.stderr)
+    finally:
+        context.close()
+    return results
+
+
+def compare(baseline: dict, results: dict, threshold: float = 0.1) -> list:
+    """
+    Median change per benchmark in percent, regressions are slower than the threshold.
+    """
+    rows = []
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before is None or not before['median_ms']:
+            continue
+        change = (result['median_ms'] - before['median_ms']) / before['median_ms']
+        rows.append({'name': name, 'baseline_ms': before['median_ms'], 'current_ms': result['median_ms'],
+                     'change': round(change * 100, 1), 'regression': change > threshold})
+    return rows
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_FOLDER, f"{name}.json")
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(prog='microBenchmarks', description='Micro-benchmarks of the AetherOnePy hot paths')
+    argParser.add_argument('-k', '--select', help='only run benchmarks whose name contains this text')
+    argParser.add_argument('-t', '--min-time', type=float, default=0.5, help='seconds per benchmark')
+    argParser.add_argument('--save', help='store the results as baseline with this name')
+    argParser.add_argument('--compare', help='compare the results with the baseline of this name')
+    argParser.add_argument('--threshold', type=float, default=10, help='allowed slowdown in percent')
+    argParser.add_argument('--list', action='store_true', help='list the benchmarks')
+    args = argParser.parse_args()
+
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        sys.exit(0)
+
+    report = {'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                              'timestamp': datetime.now().isoformat()},
+              'results': run(args.select, args.min_time)}
+
+    exit_code = 0
+    if args.compare:
+        with open(baseline_path(args.compare)) as f:
+            rows = compare(json.load(f), report['results'], args.threshold / 100)
+        for row in rows:
+            marker = '  REGRESSION' if row['regression'] else ''
+            print(f"{row['name']:<40} {row['baseline_ms']:>12.4f} -> {row['current_ms']:>12.4f} ms "
+                  f"({row['change']:+.1f} %){marker}")
+        exit_code = 1 if any(row['regression'] for row in rows) else 0
+
+    if args.save:
+        os.makedirs(BASELINE_FOLDER, exist_ok=True)
+        with open(baseline_path(args.save), 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {baseline_path(args.save)}")
+    sys.exit(exit_code)
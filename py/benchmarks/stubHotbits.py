@@ -0,0 +1,39 @@
+# Deterministic entropy for benchmarks, so runs are comparable and need neither webcam nor hotbits files
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.hotbitsService import HotbitsService, HotbitsSource
+from services.databaseService import CaseDAO
+
+STUB_BLOCK_SIZE = 10000
+
+
+class StubHotbitsService(HotbitsService):
+    """
+    HotbitsService whose pool is refilled from a seeded NumPy generator instead of hotbits files.
+    Everything above getHotbits (getInt, takeHotbits, the pool handling) is the real implementation.
+    """
+
+    def __init__(self, folder_path: str, aetherOneDB: CaseDAO | None = None, seed: int = 42):
+        super().__init__(HotbitsSource.WEBCAM, folder_path, aetherOneDB, None)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.fallback = random.Random(seed)
+
+    def getHotbits(self):
+        return self.rng.integers(0, 2 ** 32, STUB_BLOCK_SIZE, dtype=np.int64).tolist()
+
+    def isSimulated(self) -> bool:
+        return False
+
+    def reset(self):
+        """Starts the same sequence of hotbits again."""
+        self.rng = np.random.default_rng(self.seed)
+        self.fallback = random.Random(self.seed)
+        self.hotbits = []
+        self.draw_count = 0
+        self.lent = 0
@@ -1,8 +1,28 @@
 import sys,os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from dataclasses import dataclass, field
 from datetime import datetime
 
 
+class LazyDates:
+    """
+    Base of the slotted domain classes. Objects loaded by CaseDAO keep the stored ISO string of a date in the
+    hidden field _raw_<name> and leave the date itself unset, it is parsed on first access. Listing thousands
+    of rows does not pay for datetime.fromisoformat of dates nobody reads.
+    """
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        # only called for unset slots and unknown names
+        try:
+            raw = object.__getattribute__(self, '_raw_' + name)
+        except AttributeError:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}") from None
+        value = datetime.fromisoformat(raw) if raw is not None else None
+        object.__setattr__(self, name, value)
+        return value
+
+
 # Scenarios:
 # A case describes a target, with different situations (sessions), an initial analysis, the continuing balancing and
 # a final conclusion.  Inbetween are the rates, the collections of rates and correlations between them.
@@ -11,16 +31,24 @@ from datetime import datetime
 # During a session occur multiple analysis and broadcasts.
 # Each analysis has a set of rates (AnalysisRate) persisted in the database.
 # Checking the GV after one broadcast is virtually a new analysis, so it will generate a new set of rates (copies).
-class Case:
-    def __init__(self, name: str, email: str, color: str, description: str, created: datetime,
-                 last_change: datetime):
-        self.id = 0
-        self.name = name
-        self.email = email
-        self.color = color
-        self.description = description
-        self.created = created
-        self.last_change = last_change
+@dataclass(slots=True, eq=False)
+class Case(LazyDates):
+    id: int = field(default=0, init=False)
+    name: str
+    email: str
+    color: str
+    description: str
+    created: datetime
+    last_change: datetime
+    _raw_created: str | None = field(default=None, init=False, repr=False)
+    _raw_last_change: str | None = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row factory for SELECT * FROM cases"""
+        case = cls.__new__(cls)
+        case.id, case.name, case.email, case.color, case.description, case._raw_created, case._raw_last_change = row
+        return case
 
     def to_dict(self):
         return {
@@ -34,13 +62,21 @@ class Case:
         }
 
 
-class Session:
-    def __init__(self, intention: str, description: str, caseID: int):
-        self.id = 0
-        self.intention = intention
-        self.description = description
-        self.created = datetime.now()
-        self.caseID = caseID
+@dataclass(slots=True, eq=False)
+class Session(LazyDates):
+    id: int = field(default=0, init=False)
+    intention: str
+    description: str
+    created: datetime = field(default_factory=datetime.now, init=False)
+    caseID: int
+    _raw_created: str | None = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row factory for SELECT * FROM sessions"""
+        session = cls.__new__(cls)
+        session.id, session.intention, session.description, session._raw_created, session.caseID = row
+        return session
 
     def to_dict(self):
         return {
@@ -51,18 +87,28 @@ class Session:
             'caseID': self.caseID
         }
 
+    @staticmethod
     def from_dict(data):
         return Session(data.get('intention'), data.get('description'), int(data.get('caseID')))
 
 
-class Analysis:
-    def __init__(self, note: str, sessionID: int):
-        self.id = 0
-        self.note = note
-        self.target_gv = 0
-        self.sessionID = sessionID
-        self.catalogId = -1
-        self.created = datetime.now()
+@dataclass(slots=True, eq=False)
+class Analysis(LazyDates):
+    id: int = field(default=0, init=False)
+    note: str
+    target_gv: int = field(default=0, init=False)
+    sessionID: int
+    catalogId: int = field(default=-1, init=False)
+    created: datetime = field(default_factory=datetime.now, init=False)
+    _raw_created: str | None = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row factory for SELECT * FROM analysis"""
+        analysis = cls.__new__(cls)
+        analysis.id, analysis.note, analysis.target_gv, analysis.sessionID, analysis.catalogId, \
+            analysis._raw_created = row
+        return analysis
 
     def to_dict(self):
         return {
@@ -76,13 +122,21 @@ class Analysis:
 
 
 # A catalog describes a set of rates, for example homeopathy, or rates from specific authors
-class Catalog:
-    def __init__(self, name: str, description: str, author: str, importdate: datetime = datetime.now()):
-        self.id = 0
-        self.name = name
-        self.description = description
-        self.author = author
-        self.importdate = importdate
+@dataclass(slots=True, eq=False)
+class Catalog(LazyDates):
+    id: int = field(default=0, init=False)
+    name: str
+    description: str
+    author: str
+    importdate: datetime = field(default_factory=datetime.now)
+    _raw_importdate: str | None = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row factory for SELECT * FROM catalog"""
+        catalog = cls.__new__(cls)
+        catalog.id, catalog.name, catalog.description, catalog.author, catalog._raw_importdate = row
+        return catalog
 
     def to_dict(self):
         return {
@@ -95,12 +149,19 @@ class Catalog:
 
 
 # A rate is a carrier for intention, a link towards a morphic field
+@dataclass(slots=True, eq=False)
 class Rate:
-    def __init__(self, signature: str, description: str, catalogID: int):
-        self.id = 0
-        self.signature = signature
-        self.description = description  # Markdown
-        self.catalogID = catalogID
+    id: int = field(default=0, init=False)
+    signature: str
+    description: str  # Markdown
+    catalogID: int
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row factory for SELECT * FROM rate"""
+        rate = cls.__new__(cls)
+        rate.id, rate.signature, rate.description, rate.catalogID = row
+        return rate
 
     def to_dict(self):
         return {
@@ -111,21 +172,19 @@ class Rate:
         }
 
 
+@dataclass(slots=True, eq=False)
 class BroadCastData:
-    def __init__(self, clear: bool, intention: str, signature: str, delay: int, repeat: int, analysis_id: int | None = None,
-                 entering_with_general_vitality: int | None = None, leaving_with_general_vitality: int | None = None, sessionID: int | None = None,
-                 created: datetime = datetime.now()):
-        self.id = 0
-        self.clear = clear
-        self.intention = intention
-        self.signature = signature
-        self.delay = delay
-        self.repeat = repeat
-        self.analysis_id = analysis_id
-        self.entering_with_general_vitality = entering_with_general_vitality
-        self.leaving_with_general_vitality = leaving_with_general_vitality
-        self.sessionID = sessionID
-        self.created = created
+    id: int = field(default=0, init=False)
+    clear: bool
+    intention: str
+    signature: str
+    delay: int
+    repeat: int
+    analysis_id: int | None = None
+    entering_with_general_vitality: int | None = None
+    leaving_with_general_vitality: int | None = None
+    sessionID: int | None = None
+    created: datetime = field(default_factory=datetime.now)
 
     def to_dict(self):
         return {
@@ -143,20 +202,63 @@ class BroadCastData:
         }
 
 
-class AnalysisRate:
-    def __init__(self, signature: str, description: str, catalog_id: int, analysis_id: int, energetic_value: int,
-                 gv: int, level: int, potency_type: str, potency: int, note: str):
+class ScheduledBroadcast:
+    """
+    A broadcast waiting for its time, either a fixed time (run_at) or the next hour / day ruled by a planet.
+    Recurring jobs are rescheduled to the next matching planetary hour or day after each run.
+    """
+    def __init__(self, signature: str, intention: str = '', planet: str | None = None, unit: str = 'hour',
+                 run_at: datetime | None = None, recurring: bool = False, analysis_id: int | None = None,
+                 session_id: int | None = None):
         self.id = 0
         self.signature = signature
-        self.description = description
-        self.catalog_id = catalog_id
+        self.intention = intention
+        self.planet = planet
+        self.unit = unit
+        self.run_at = run_at
+        self.recurring = recurring
         self.analysis_id = analysis_id
-        self.energetic_value = energetic_value
-        self.gv = gv
-        self.level = level
-        self.potency_type = potency_type
-        self.potency = potency
-        self.note = note
+        self.session_id = session_id
+        self.next_run: datetime | None = None
+        self.created = datetime.now()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'signature': self.signature,
+            'intention': self.intention,
+            'planet': self.planet,
+            'unit': self.unit,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'recurring': self.recurring,
+            'analysis_id': self.analysis_id,
+            'session_id': self.session_id,
+            'next_run': self.next_run.isoformat() if self.next_run else None,
+            'created': self.created.isoformat() if self.created else None
+        }
+
+
+@dataclass(slots=True, eq=False)
+class AnalysisRate:
+    id: int = field(default=0, init=False)
+    signature: str
+    description: str
+    catalog_id: int
+    analysis_id: int
+    energetic_value: int
+    gv: int
+    level: int
+    potency_type: str
+    potency: int
+    note: str
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row factory for SELECT * FROM rate_analysis"""
+        rate = cls.__new__(cls)
+        rate.id, rate.signature, rate.description, rate.catalog_id, rate.analysis_id, rate.energetic_value, \
+            rate.gv, rate.level, rate.potency_type, rate.potency, rate.note = row
+        return rate
 
     def to_dict(self):
         return {
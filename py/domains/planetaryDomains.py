@@ -96,3 +96,31 @@ class Hour:
             "hour": self.hour,
             "planet": self.planet,
         }
+
+
+class PlanetaryDay:
+    def __init__(self):
+        self.date = ''
+        self.day = ''
+        self.planet = ''
+        self.month = ''
+        self.zodiac = ''
+        self.monthPlanet = ''
+        self.season = ''
+        self.element = ''
+        self.seasonProgress = 0
+        self.hours = []
+
+    def to_dict(self):
+        return {
+            "date": self.date,
+            "day": self.day,
+            "planet": self.planet,
+            "month": self.month,
+            "zodiac": self.zodiac,
+            "monthPlanet": self.monthPlanet,
+            "season": self.season,
+            "element": self.element,
+            "seasonProgress": self.seasonProgress,
+            "hours": self.hours,
+        }
@@ -1,101 +1,146 @@
 # AetherOnyPy Main Application
 # Copyright Isuret Polos 2025
 # Support me on https://www.patreon.com/aetherone
+import time
+STARTED = time.monotonic()  # before the other imports, which take a good part of the startup time
 import io, os, sys, multiprocessing, subprocess
 import asyncio
 import argparse
-import platform as sys_platform
 import qrcode
 import socket
 import re
 import json
+import hmac
 import logging
 import urllib.request
-import psutil
+import threading
 from flasgger import Swagger
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 os.environ['FLASK_ENV'] = 'development'
 
-from flask import Flask, jsonify, request, send_from_directory, send_file, Response, abort
+from flask import Flask, jsonify, request, send_from_directory, Response, abort, g
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-from PIL import ImageDraw, ImageFont
+from PIL import ImageDraw
 from dateutil import parser
+from datetime import datetime, date, timedelta
 import importlib
 
-from services.rateCard import RadionicChart
+from services.rateCard import RadionicChart, load_font
+from services.rateCardBatch import RateCardBatchRenderer, MAX_CARDS
+from services.analysisJobs import AnalysisJobRunner
 from services.databaseService import get_case_dao
 from services.updateRadionicsRates import update_or_clone_repo
 from services.rateImporter import RateImporter
 from services.hotbitsService import HotbitsService, HotbitsSource
-from services.analyzeService import analyze as analyzeService, transformAnalyzeListToDict, checkGeneralVitality
-from domains.aetherOneDomains import Analysis, Session, Case, BroadCastData, AnalysisRate
+from services.randomnessTestService import RandomnessTests, bits_from_integers, ALPHA
+from services.analyzeService import analyze_catalogs, replay_analysis, checkGeneralVitality, checkGeneralVitalityBatch
+from services.entropyStream import EntropyStream
+from domains.aetherOneDomains import Analysis, Session, Case, BroadCastData, AnalysisRate, ScheduledBroadcast
 from services.broadcastService import BroadcastService, BroadcastTask
+from services.broadcastScheduler import BroadcastScheduler
 from services.planetaryInfluence import PlanetaryRulershipCalendarAPI
+from services.responseCache import ResponseCache
+from services.productionServer import BoundedWSGIServer, SERVER_MODES, serve
+from services.metrics import REGISTRY, SOCKETIO_EMITS, instrument_flask
+from services.logService import setup_logging, get_logger, fields
+from services.profilerService import SamplingProfiler, RequestProfiles
+from services.systemInfo import SystemInfo, detect_raspberry_pi
+from services.serializer import FastJSONProvider, enable_compression, json_response
 from openai import OpenAI
 from setup import check_and_install_packages
 
+log = get_logger('main')
+# Printed to stdout once the server accepts requests, desktop_launcher.py waits for this line
+READY_MARKER = 'AETHERONE_READY'
 
 # Start the hotbits service in a separate process
 def start_hotbits_service():
     PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     aetherOneDB = get_case_dao(os.path.join(PROJECT_ROOT, 'data/aetherone.db'))
+    # a separate process with its own log file, two processes must not rotate the same file
+    setup_logging(os.path.join(PROJECT_ROOT, 'logs'), aetherOneDB.get_setting('logLevel') or 'INFO', 'hotbits.log')
     hotbits = HotbitsService(HotbitsSource.WEBCAM, os.path.join(PROJECT_ROOT, "hotbits"),aetherOneDB,None)
     hotbits.initHotbits()
 
 
 class AetherOnePy:
-    def __init__(self):
-        self.PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    def __init__(self, server_mode: str | None = None, project_root: str | None = None, collect_hotbits: bool = True):
+        """
+        :param project_root: folder for data, hotbits and broadcasts, defaults to the repository root
+        :param collect_hotbits: start the background process collecting hotbits (disabled by the benchmarks)
+        """
+        self.PROJECT_ROOT = project_root or os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
         self.raspberryPi = self.is_raspberry_pi()
-        if self.raspberryPi:
-            print("This system is a Raspberry Pi.")
         self.setup_directories()
         self.aetherOneDB = get_case_dao(os.path.join(self.PROJECT_ROOT, 'data/aetherone.db'))
+        self.setup_logging()
+        if self.raspberryPi:
+            log.info("This system is a Raspberry Pi")
+        self.systemInfo = SystemInfo(self.raspberryPi, float(self.aetherOneDB.get_setting('systemInfoRefreshSeconds') or 30))
         self.hotbits = HotbitsService(HotbitsSource.WEBCAM, os.path.join(self.PROJECT_ROOT, "hotbits"), self.aetherOneDB, self, self.raspberryPi)
-        process = multiprocessing.Process(target=start_hotbits_service) # Start the hotbits service in a separate process
-        process.daemon = True
-        process.start()
+        if collect_hotbits:
+            process = multiprocessing.Process(target=start_hotbits_service) # Start the hotbits service in a separate process
+            process.daemon = True
+            process.start()
+        self.rateCardBatch = RateCardBatchRenderer(int(self.aetherOneDB.get_setting('rateCardWorkers') or 2))
+        self.analysisJobs = AnalysisJobRunner(self.aetherOneDB, os.path.join(self.PROJECT_ROOT, 'data/aetherone.db'),
+                                              self.hotbits, self.emitAnalysisJob,
+                                              int(self.aetherOneDB.get_setting('analysisWorkers') or 0))
+        self.responseCache = ResponseCache(os.path.join(self.PROJECT_ROOT, 'cache', 'responses'), self.get_version())
+        self.host_ip = None
+        self.host_ip_checked = 0
         self.app = Flask(__name__)
         self.app.case_dao = self.aetherOneDB 
+        self.app.json = FastJSONProvider(self.app)
+        if self.aetherOneDB.get_setting('responseCompression'):
+            enable_compression(self.app, int(self.aetherOneDB.get_setting('responseCompressionMinSize') or 1024))
         Swagger(self.app)
-        self.socketio = SocketIO(self.app, cors_allowed_origins="*", ping_interval=10, ping_timeout=300, debug=False)
+        self.server_mode = server_mode or self.aetherOneDB.get_setting('serverMode') or 'production'
+        if self.server_mode not in SERVER_MODES:
+            print(f"[WARNING] Unknown server mode {self.server_mode}, using production")
+            self.server_mode = 'production'
+        # without an explicit mode an installed eventlet would be picked up without monkey patching
+        async_mode = 'eventlet' if self.server_mode == 'eventlet' else 'threading'
+        self.socketio = SocketIO(self.app, cors_allowed_origins="*", ping_interval=10, ping_timeout=300, debug=False,
+                                 async_mode=async_mode)
+        self.server = None
         self.port = 80
+        self.ready = False
+        self.ready_seconds = None
         CORS(self.app)
-        self.setup_logging()
+        self.setup_metrics()
+        self.setup_profiling()
         self.load_plugins()
         self.setup_routes()
         self.cleanup_broadcast_folder()
-        self.planetaryInfoApi = PlanetaryRulershipCalendarAPI()
+        planetary_span = int(self.aetherOneDB.get_setting('planetaryCalendarSpan') or 5)
+        this_year = datetime.now().year
+        self.planetaryInfoApi = PlanetaryRulershipCalendarAPI(this_year - planetary_span, this_year + planetary_span)
 
 
     def is_raspberry_pi(self):
         """Check if the computer is a Raspberry Pi."""
+        return detect_raspberry_pi()
+
+    def get_version(self):
         try:
-            # Check the platform
-            if sys_platform.system() != "Linux":
-                return False
-
-            # Check for the presence of Raspberry Pi-specific files
-            if os.path.exists('/sys/firmware/devicetree/base/model'):
-                with open('/sys/firmware/devicetree/base/model', 'r') as model_file:
-                    model_info = model_file.read().lower()
-                    print(model_info)
-                    if 'raspberry pi' in model_info:
-                        return True
-
-            # Check the CPU information for Raspberry Pi specific hardware
-            with open('/proc/cpuinfo', 'r') as cpuinfo:
-                for line in cpuinfo:
-                    print(line)
-                    if 'Hardware' in line and 'BCM' in line:
-                        return True
-                    if 'Model' in line and 'Raspberry Pi' in line:
-                        return True
+            with open(os.path.join(self.PROJECT_ROOT, 'py/version.txt'), "r") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            log.error("Version file not found")
+            return "0.0.0"
         except Exception as e:
-            print(f"Error while checking Raspberry Pi: {e}")
-        return False
+            log.error("Error reading version file: %s", e)
+            return "0.0.0"
+
+    def get_host_ip(self, max_age: int = 60):
+        """The IP address of this host in the local network, looked up at most every max_age seconds."""
+        if self.host_ip is None or time.monotonic() - self.host_ip_checked > max_age:
+            self.host_ip = (([ip for ip in socket.gethostbyname_ex(socket.gethostname())[2] if not ip.startswith("127.")] or [[(s.connect(("8.8.8.8", 53)), s.getsockname()[0], s.close()) for s in [socket.socket(socket.AF_INET, socket.SOCK_DGRAM)]][0][1]]) + ["no IP found"])[0]
+            self.host_ip_checked = time.monotonic()
+        return self.host_ip
 
     def cleanup_broadcast_folder(self):
         broadcast_folder = os.path.join(self.PROJECT_ROOT, "broadcasts")
@@ -108,8 +153,89 @@ class AetherOnePy:
                     print(f"Error deleting file {file_path}: {e}")
 
     def setup_logging(self):
-        log = logging.getLogger('werkzeug')
-        log.setLevel(logging.ERROR)
+        """Console and rotating file (logs/aetherone.log) logging, level and rotation come from the settings."""
+        setup_logging(os.path.join(self.PROJECT_ROOT, 'logs'), self.aetherOneDB.get_setting('logLevel') or 'INFO',
+                      max_bytes=int(self.aetherOneDB.get_setting('logFileMaxBytes') or 5 * 1024 * 1024),
+                      backup_count=int(self.aetherOneDB.get_setting('logFileBackups') or 5),
+                      sample_interval=float(self.aetherOneDB.get_setting('logSampleInterval') or 10))
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    def setup_metrics(self):
+        """Request timing for all routes, plus the values read on every scrape of /metrics."""
+        instrument_flask(self.app)
+        REGISTRY.callback('aetherone_hotbits_pool_size', 'Hotbits left in the in-memory pool',
+                          lambda: len(self.hotbits.hotbits))
+        REGISTRY.callback('aetherone_hotbits_files', 'Hotbits files waiting in the hotbits folder',
+                          lambda: self.hotbits.countHotbits())
+        REGISTRY.callback('aetherone_hotbits_draws_total', 'Hotbits taken from the pool, rate() gives the draw rate',
+                          lambda: self.hotbits.taken_total, 'counter')
+        REGISTRY.callback('aetherone_hotbits_returned_total', 'Hotbits taken but not used and put back into the pool',
+                          lambda: self.hotbits.returned_total, 'counter')
+        # quality of the hotbits sources, from the health tests of the collectors (see services/hotbitsHealth.py)
+        for field, name, documentation, type_name in (
+                ('bits', 'aetherone_hotbits_health_bits_total', 'Raw bits health tested per source', 'counter'),
+                ('quarantined', 'aetherone_hotbits_health_quarantined_total', 'Batches failing the health tests', 'counter'),
+                ('bias', 'aetherone_hotbits_health_bias', 'Rolling proportion of ones minus 0.5', 'gauge'),
+                ('min_entropy', 'aetherone_hotbits_health_min_entropy', 'Rolling min-entropy estimate per bit', 'gauge')):
+            REGISTRY.callback(name, documentation,
+                              lambda field=field: {(source,): snapshot[field]
+                                                   for source, snapshot in self.hotbits.health.report().items()},
+                              type_name, ('source',))
+        for field, name, documentation in (
+                ('raw_bits', 'aetherone_hotbits_mixer_raw_bits_total', 'Raw bits read by the mixer per source'),
+                ('contributed_bytes', 'aetherone_hotbits_mixer_contributed_bytes_total',
+                 'Debiased bytes of each source consumed by the extractor')):
+            REGISTRY.callback(name, documentation,
+                              lambda field=field: {(source,): stats[field] for source, stats
+                                                   in self.hotbits.mixer.report()['sources'].items()}
+                              if self.hotbits.mixer is not None else None, 'counter', ('source',))
+        REGISTRY.callback('aetherone_broadcast_queue_depth', 'Broadcast tasks waiting in the queue',
+                          lambda: self.broadcastService.task_queue.qsize() if hasattr(self, 'broadcastService') else None)
+        REGISTRY.callback('aetherone_scheduled_broadcasts', 'Broadcasts waiting for their planetary hour',
+                          lambda: len(self.broadcastScheduler.jobs) if hasattr(self, 'broadcastScheduler') else None)
+        REGISTRY.callback('aetherone_response_cache_hit_ratio', 'Hit ratio of the response cache',
+                          lambda: self.responseCache.stats()['hit_rate'])
+        REGISTRY.callback('aetherone_http_connections_active', 'Connections handled by the production server',
+                          lambda: self.server.stats()['active_connections'] if self.server is not None else None)
+        REGISTRY.callback('aetherone_http_connections_rejected_total', 'Connections answered with 503',
+                          lambda: self.server.stats()['rejected_connections'] if self.server is not None else None,
+                          'counter')
+
+    def setup_profiling(self):
+        """
+        Admin requests with the header X-Profile: 1 are run under cProfile, the response carries the id of the
+        capture in X-Profile-Id. The sampling profiler over all threads is controlled by /admin/profiler.
+        """
+        self.samplingProfiler = SamplingProfiler()
+        self.requestProfiles = RequestProfiles()
+
+        @self.app.before_request
+        def start_request_profile():
+            if request.headers.get('X-Profile') == '1' and self.admin_forbidden() is None:
+                g.request_profile = (self.requestProfiles.begin(), time.perf_counter())
+
+        @self.app.after_request
+        def finish_request_profile(response):
+            capture = g.pop('request_profile', None)
+            if capture is not None:
+                profile, start = capture
+                profile_id = self.requestProfiles.finish(profile, request.method, request.full_path,
+                                                         time.perf_counter() - start)
+                response.headers['X-Profile-Id'] = str(profile_id)
+            return response
+
+    def admin_forbidden(self):
+        """
+        None if the request may use the admin endpoints, otherwise the 403 response. Without the setting adminToken
+        only requests from this machine are allowed, with it the header X-Admin-Token has to match.
+        """
+        token = str(self.aetherOneDB.get_setting('adminToken') or '')
+        if token:
+            if hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+                return None
+        elif request.remote_addr in ('127.0.0.1', '::1', None):
+            return None
+        return jsonify({'error': 'Admin access required'}), 403
 
     def setup_directories(self):
         if not os.path.isdir(os.path.join(self.PROJECT_ROOT, "data")):
@@ -289,9 +415,18 @@ class AetherOnePy:
 
     def emitMessage(self, event: str, text: str):
         try:
+            SOCKETIO_EMITS.inc(event=event)
             self.socketio.emit(event, {'message': text})
         except Exception as e:
-            logging.error(f"Error emitting message: {e}")
+            log.error("Error emitting message: %s", e)
+
+    def emitAnalysisJob(self, job: dict):
+        """Progress of a batch analysis job, sent after every finished analysis."""
+        try:
+            SOCKETIO_EMITS.inc(event='analysis_job')
+            self.socketio.emit('analysis_job', job)
+        except Exception as e:
+            log.error("Error emitting analysis job progress: %s", e)
 
     def setup_routes(self):
         # Serving the Angular UI
@@ -300,23 +435,23 @@ class AetherOnePy:
             return send_from_directory('../ui/dist/ui/browser/', 'index.html')
 
         # Health check, you make a ping and get a pong
+        # Liveness: constant time, touches neither the database nor the system
+        @self.app.route('/healthz', methods=['GET'])
+        def healthz():
+            return Response(b'{"status":"ok"}', content_type='application/json')
+
+        # Readiness plus the system info, polled by the UI and the desktop launcher
         @self.app.route('/ping', methods=['GET'])
         def ping():
+            # 503 until DB, plugins, routes and services are up and the server is listening
+            if not self.ready:
+                return jsonify({'ready': False}), 503
+            return jsonify({**self.systemInfo.snapshot(), 'ready': True, 'startupSeconds': self.ready_seconds})
 
-            system_info = {
-                'system': sys_platform.system(),
-                'release': sys_platform.release(),
-                'version': sys_platform.version(),
-                'architecture': sys_platform.architecture(),
-                'processor': sys_platform.processor(),
-                'cpu_count': psutil.cpu_count(logical=True),
-                'memory': psutil.virtual_memory().total,
-                'disk': psutil.disk_usage('/').total,
-                'raspberryPi': self.raspberryPi,
-                'esp32available': False,
-                'arduinoavailable': False,
-            }
-            return jsonify(system_info)
+        # Static facts read once, memory, disk and CPU load refreshed at most every systemInfoRefreshSeconds
+        @self.app.route('/systemInfo', methods=['GET'])
+        def system_info():
+            return jsonify(self.systemInfo.snapshot())
 
         # Serving static files, like images, css, js, etc.
         @self.app.route('/<path:path>')
@@ -328,13 +463,16 @@ class AetherOnePy:
         # Reacting to the websockets connect event, in order to get the UI know you are connected
         @self.socketio.on('connect')
         def handle_connect():
+            SOCKETIO_EMITS.inc(event='server_update')
             emit('server_update', {'message': 'Server connected to websockets!'}, broadcast=True)
+            SOCKETIO_EMITS.inc(event='broadcast_info')
             emit('broadcast_info', {'message': 'Broadcast messaging ready!'}, broadcast=True)
 
         @self.socketio.on('ping')
         def handle_ping(data=None):
             """Respond to ping events from the client."""
-            logging.info('Received ping event')
+            log.debug('Received ping event')
+            SOCKETIO_EMITS.inc(event='pong')
             emit('pong')
 
         # Restart application
@@ -358,7 +496,7 @@ class AetherOnePy:
                 os.kill(os.getpid(), 9)
             except Exception as e:
                 print(e)
-                logging.error(f"Error shutting down server: {e}")
+                log.error("Error shutting down server: %s", e)
 
 
             return jsonify({'message': 'Shutting down server ...'}), 200
@@ -371,15 +509,7 @@ class AetherOnePy:
         # Version, in order to know which version of the software is running
         @self.app.route('/version', methods=['GET'])
         def version():
-            try:
-                with open(os.path.join(self.PROJECT_ROOT, 'py/version.txt'), "r") as f:
-                    return f.read().strip()
-            except FileNotFoundError:
-                logging.error("Version file not found")
-                return "0.0.0"
-            except Exception as e:
-                logging.error(f"Error reading version file: {e}")
-                return "0.0.0"
+            return self.get_version()
 
         # Remote version, in order to know which version of the software is available on the remote repository
         @self.app.route('/remoteVersion', methods=['GET'])
@@ -393,14 +523,12 @@ class AetherOnePy:
         # smartphone or tablet
         @self.app.route('/qrcode', methods=['GET'])
         def get_qrcode():
+            data = f"http://{self.get_host_ip()}:{self.port}"
+            self.emitMessage('server_update', data)
+            # the image only depends on the URL, it may change with the network so it is revalidated after 5 minutes
+            return self.responseCache.respond('qrcode', {'url': data}, lambda: render_qrcode(data), 300, False)
 
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(('8.8.8.8', 1))  # connect() for UDP doesn't send packets
-
-            myip = (([ip for ip in socket.gethostbyname_ex(socket.gethostname())[2] if not ip.startswith("127.")] or [[(s.connect(("8.8.8.8", 53)), s.getsockname()[0], s.close()) for s in [socket.socket(socket.AF_INET, socket.SOCK_DGRAM)]][0][1]]) + ["no IP found"])[0]
-            data = f"http://{myip}:{self.port}"
-            self.socketio.emit('server_update', {'message': data})
-
+        def render_qrcode(data):
             qr = qrcode.QRCode(
                 version=1,
                 error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -414,13 +542,12 @@ class AetherOnePy:
             draw = ImageDraw.Draw(img)
 
             text = "AetherOnePy"
-            font = ImageFont.truetype("arial.ttf", 16)
+            font = load_font(16)
             text_width = font.getbbox(text)[2]
             text_height = font.getbbox(text)[3]
             text_position = ((img.size[0] - text_width) // 2, img.size[1] - text_height - 15)
             draw.text(text_position, text, fill='black', font=font)
 
-            font = ImageFont.truetype("arial.ttf", 16)
             text_width = font.getbbox(data)[2]
             text_height = font.getbbox(data)[3]
             text_position = ((img.size[0] - text_width) // 2, img.size[1] - text_height)
@@ -428,9 +555,7 @@ class AetherOnePy:
 
             img_byte_arr = io.BytesIO()
             img.save(img_byte_arr, format='PNG')
-            img_byte_arr.seek(0)
-
-            return send_file(img_byte_arr, mimetype='image/png')
+            return img_byte_arr.getvalue(), 'image/png'
 
         # CRUD operations for cases
         @self.app.route('/case', methods=['GET', 'POST', 'PUT', 'DELETE'])
@@ -447,15 +572,10 @@ class AetherOnePy:
                 )
                 user_id = self.aetherOneDB.insert_case(new_case)
                 case_data["id"] = user_id
-                response_data = json.dumps(case_data, ensure_ascii=False)
-                return Response(response_data, content_type='application/json; charset=utf-8')
+                return json_response(case_data)
 
             if request.method == 'GET':
-                allCases = []
-                for caseObj in self.aetherOneDB.list_cases():
-                    allCases.append(caseObj.to_dict())
-                response_data = json.dumps(allCases, ensure_ascii=False)
-                return Response(response_data, content_type='application/json; charset=utf-8')
+                return json_response(self.aetherOneDB.list_cases())
 
             if request.method == 'DELETE':
                 self.aetherOneDB.delete_case(int(request.args.get('id')))
@@ -470,31 +590,22 @@ class AetherOnePy:
                 new_session = Session.from_dict(request.json)
                 if new_session is None:
                     return jsonify({'error': 'No active session found'}), 404
-                session_id = self.aetherOneDB.insert_session(new_session)
-                session_data = new_session.to_dict()
-                session_data['session_id'] = session_id
-                response_data = json.dumps(new_session.to_dict(), ensure_ascii=False)
-                return Response(response_data, content_type='application/json; charset=utf-8')
+                self.aetherOneDB.insert_session(new_session)
+                return json_response(new_session)
 
             if request.method == 'GET':
                 if request.args.get('id') is not None:
                     session = self.aetherOneDB.get_session(int(request.args.get('id')))
                     if session is None:
                         return jsonify({'error': 'No last session found'}), 404
-                    response_data = json.dumps(session.to_dict(), ensure_ascii=False)
-                    return Response(response_data, content_type='application/json; charset=utf-8')
+                    return json_response(session)
                 if request.args.get('last') is not None:
                     session = self.aetherOneDB.get_last_session(int(request.args.get('caseId')))
                     if session is None:
                         return jsonify({'error': 'No last session found'}), 404
-                    response_data = json.dumps(session.to_dict(), ensure_ascii=False)
-                    return Response(response_data, content_type='application/json; charset=utf-8')
+                    return json_response(session)
                 else:
-                    allSessions = []
-                    for session in self.aetherOneDB.list_sessions(int(request.args.get('caseId'))):
-                        allSessions.append(session.to_dict())
-                    response_data = json.dumps(allSessions, ensure_ascii=False)
-                    return Response(response_data, content_type='application/json; charset=utf-8')
+                    return json_response(self.aetherOneDB.list_sessions(int(request.args.get('caseId'))))
 
             if request.method == 'DELETE':
                 self.aetherOneDB.delete_session(int(request.args.get('id')))
@@ -509,13 +620,25 @@ class AetherOnePy:
 
             if request.method == 'POST':
                 settings = request.json
+                # the admin token is never sent to clients, settings without it keep the stored one
+                stored_token = self.aetherOneDB.get_setting('adminToken') or ''
+                token = settings.get('adminToken', stored_token)
+                if token != stored_token:
+                    forbidden = self.admin_forbidden()
+                    if forbidden is not None:
+                        return forbidden
+                settings['adminToken'] = token
                 self.aetherOneDB.ensure_settings_defaults(settings)
                 with open(json_file_path, 'w') as f:
                     json.dump(settings, f, indent=4)
-                return jsonify(settings), 200
+                if hasattr(self, 'broadcastService'):
+                    self.broadcastService.reload_gpio_settings()
+                return jsonify({key: value for key, value in settings.items() if key != 'adminToken'}), 200
 
             if request.method == 'GET':
-                return self.aetherOneDB.loadSettings(), 200
+                settings = self.aetherOneDB.loadSettings()
+                settings.pop('adminToken', None)
+                return settings, 200
 
         # CRUD operations for rates
         @self.app.route('/catalog', methods=['GET', 'POST', 'PUT', 'DELETE'])
@@ -523,14 +646,9 @@ class AetherOnePy:
             if request.method == 'GET':
                 if request.args.get('id') is not None:
                     catalog = self.aetherOneDB.get_catalog(int(request.args.get('id')))
-                    response_data = json.dumps(catalog.to_dict(), ensure_ascii=False)
-                    return Response(response_data, content_type='application/json; charset=utf-8')
+                    return json_response(catalog)
                 else:
-                    allCatalogs = []
-                    for catalog in self.aetherOneDB.list_catalogs():
-                        allCatalogs.append(catalog.to_dict())
-                    response_data = json.dumps(allCatalogs, ensure_ascii=False)
-                    return Response(response_data, content_type='application/json; charset=utf-8')
+                    return json_response(self.aetherOneDB.list_catalogs())
 
             return "NOT IMPLEMENTED"
 
@@ -600,6 +718,48 @@ class AetherOnePy:
             hotbits = self.hotbits.getHotbits()
             return jsonify({'hotbits': hotbits}), 200
 
+        # Mixing of all enabled hotbits sources (hotbits_use_* settings): throughput and contribution per source
+        @self.app.route('/hotbits/mixer', methods=['GET', 'POST', 'DELETE'])
+        def hotbitsMixer():
+            if request.method == 'POST':
+                try:
+                    self.hotbits.startMixing()
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+            elif request.method == 'DELETE':
+                self.hotbits.stopMixing()
+            if self.hotbits.mixer is None:
+                return jsonify({'running': False}), 200
+            return json_response(self.hotbits.mixer.report())
+
+        # Health of the hotbits sources: continuous SP 800-90B tests of the collectors, quarantined batches
+        @self.app.route('/hotbits/health', methods=['GET'])
+        def hotbitsHealth():
+            return json_response(self.hotbits.health.report())
+
+        # NIST SP 800-22 style tests of a hotbits file (file=<name>, by default the newest) or of posted integers
+        @self.app.route('/hotbits/randomness', methods=['GET', 'POST'])
+        def hotbitsRandomness():
+            tester = RandomnessTests(request.args.get('alpha', ALPHA, type=float))
+            try:
+                if request.method == 'POST':
+                    body = request.json or {}
+                    if not body.get('integers'):
+                        return jsonify({'error': 'integers is required'}), 400
+                    bits = bits_from_integers(body['integers'], int(body.get('bit_count', 32)))
+                    return json_response(tester.run_nist_tests(bits))
+                folder = self.hotbits.folder_path
+                name = request.args.get('file') or max((f for f in os.listdir(folder) if f.endswith('.json')), default=None)
+                if name is None:
+                    return jsonify({'error': 'No hotbits files'}), 404
+                # the file is read, not consumed
+                return json_response(tester.test_hotbits_file(os.path.join(folder, os.path.basename(name)),
+                                                              request.args.get('bit_count', 32, type=int)))
+            except FileNotFoundError:
+                return jsonify({'error': 'Hotbits file not found'}), 404
+            except (ValueError, TypeError, KeyError, OverflowError) as e:
+                return jsonify({'error': str(e)}), 400
+
         # CRUD operations for analysis
         @self.app.route('/analysis', methods=['GET', 'POST', 'PUT', 'DELETE'])
         def analysis():
@@ -608,32 +768,25 @@ class AetherOnePy:
                     analysis = self.aetherOneDB.get_analysis(int(request.args.get('id')))
                     if analysis is None:
                         return jsonify({"error": "Analysis not found"}), 404
-                    response_data = json.dumps(analysis.to_dict(), ensure_ascii=False)
-                    return Response(response_data, content_type='application/json; charset=utf-8')
+                    return json_response(analysis)
                 elif request.args.get('last') is not None:
                     analysis = self.aetherOneDB.get_last_analysis(int(request.args.get('session_id')))
                     if analysis is None:
                         return jsonify({"error": "Analysis not found"}), 404
-                    response_data = json.dumps(analysis.to_dict(), ensure_ascii=False)
-                    return Response(response_data, content_type='application/json; charset=utf-8')
+                    return json_response(analysis)
                 else:
-                    analysisList = []
-                    for analysis in self.aetherOneDB.list_analysis(int(request.args.get('session_id'))):
-                        analysisList.append(analysis.to_dict())
-                    response_data = json.dumps(analysisList, ensure_ascii=False)
-                    return Response(response_data, content_type='application/json; charset=utf-8')
+                    return json_response(self.aetherOneDB.list_analysis(int(request.args.get('session_id'))))
 
             if request.method == 'POST':
                 # Create a new analysis object, which later will be analyzed by the method analyze()
                 analyzeRequest = request.json
-                print(analyzeRequest)
+                log.debug("New analysis %s", analyzeRequest)
                 analysis = Analysis(analyzeRequest['note'], analyzeRequest['sessionID'])
                 analysis.catalogId = analyzeRequest['catalogId']
                 if self.aetherOneDB.get_setting('analysisAlwaysCheckGV'):
                     analysis.target_gv = checkGeneralVitality(self.hotbits)
                 analysis = self.aetherOneDB.insert_analysis(analysis)
-                response_data = json.dumps(analysis.to_dict(), ensure_ascii=False)
-                return Response(response_data, content_type='application/json; charset=utf-8')
+                return json_response(analysis)
 
             if request.method == 'PUT':
                 analyzeRequest = request.json
@@ -642,8 +795,7 @@ class AetherOnePy:
                     return jsonify({"error": "Analysis not found"}), 404
                 analysis.note = analyzeRequest['note']
                 self.aetherOneDB.update_analysis(analysis)
-                response_data = json.dumps(analysis.to_dict(), ensure_ascii=False)
-                return Response(response_data, content_type='application/json; charset=utf-8')
+                return json_response(analysis)
 
             if request.method == 'DELETE':
                 self.aetherOneDB.delete_analysis(int(request.args.get('id')))
@@ -656,30 +808,91 @@ class AetherOnePy:
         def analyze():
             if request.method == 'GET':
                 analysis_id = int(request.args.get('analysis_id'))
-                rates_list = self.aetherOneDB.list_rates_for_analysis(analysis_id)
-                enhanced_rates = []
-                for rate in rates_list:
-                    enhanced_rate = AnalysisRate(rate.signature, rate.description, rate.catalog_id, analysis_id, rate.energetic_value, rate.gv, rate.level, rate.potency_type, rate.potency, rate.note)
-                    enhanced_rate.id = rate.id
-                    enhanced_rates.append(enhanced_rate)
-                return jsonify(transformAnalyzeListToDict(enhanced_rates)), 200
+                return json_response(self.aetherOneDB.list_rates_for_analysis(analysis_id))
             if request.method == 'POST':
                 analyzeRequest = request.json
                 analysis = self.aetherOneDB.get_analysis(int(analyzeRequest['analysis_id']))
-                print(f"[DEBUG] analyzeRequest: {analyzeRequest}")
-                print(f"[DEBUG] analysis: {analysis}")
-                rates_list = self.aetherOneDB.list_rates_from_catalog(analyzeRequest["catalog_id"])
-                print(f"[DEBUG] rates_list: {rates_list}")
-                enhanced_rates = analyzeService(analysis.id, rates_list, self.hotbits, self.aetherOneDB.get_setting('analysisAlwaysCheckGV'), self.aetherOneDB.get_setting('analysisAdvanced'))
-                print(f"[DEBUG] enhanced_rates: {enhanced_rates}")
+                # several catalogs (catalog_ids) are analyzed in one pass with the top_n rates of each catalog
+                catalog_ids = analyzeRequest.get('catalog_ids') or [analyzeRequest['catalog_id']]
+                # ids and signatures only, cached until the catalog changes
+                catalogs = [self.aetherOneDB.get_catalog_columns(int(catalog_id)) for catalog_id in catalog_ids]
+                log.debug("Analyze request %s, %d rates", analyzeRequest, sum(len(catalog) for catalog in catalogs))
+                parameters = {'catalog_ids': [int(catalog_id) for catalog_id in catalog_ids],
+                              'advanced': bool(self.aetherOneDB.get_setting('analysisAdvanced')),
+                              'auto_check_gv': bool(self.aetherOneDB.get_setting('analysisAlwaysCheckGV')),
+                              'top_n': int(analyzeRequest.get('top_n', 24))}
+                # the hotbits of this analysis only, recorded for /analyze/replay
+                stream = EntropyStream(source=self.hotbits)
+                enhanced_rates = analyze_catalogs(analysis.id, catalogs, stream, parameters['auto_check_gv'],
+                                                  parameters['advanced'], parameters['top_n'])
                 self.aetherOneDB.insert_rates_for_analysis(enhanced_rates)
-                print(f"[DEBUG] enhanced_rates: {enhanced_rates}")
-                analyzeList = transformAnalyzeListToDict(enhanced_rates)
-                print(f"[DEBUG] analyzeList: {analyzeList}")
-                return jsonify(analyzeList), 200
+                if self.aetherOneDB.get_setting('recordEntropyStreams'):
+                    self.aetherOneDB.insert_entropy_streams([(stream.id, analysis.id, stream.recorded(), parameters)])
+                log.debug("Analysis %s result: %s", analysis.id, enhanced_rates,
+                          extra=fields(stream=stream.id, draws=stream.draw_count))
+                response = json_response(enhanced_rates)
+                response.headers['X-Entropy-Stream'] = stream.id
+                return response
 
             return "NOT IMPLEMENTED"
 
+        # Runs an analysis again on its recorded hotbits (by analysis_id or stream_id) and compares the result
+        @self.app.route('/analyze/replay', methods=['GET'])
+        def analyzeReplay():
+            if request.args.get('stream_id'):
+                stream = self.aetherOneDB.get_entropy_stream(request.args['stream_id'])
+            else:
+                stream = self.aetherOneDB.get_entropy_stream_for_analysis(request.args.get('analysis_id', -1, type=int))
+            if stream is None:
+                return jsonify({'error': 'No recorded entropy stream'}), 404
+            catalogs = [self.aetherOneDB.get_catalog_columns(catalog_id)
+                        for catalog_id in stream['parameters']['catalog_ids']]
+            try:
+                rates = replay_analysis(stream['analysis_id'], catalogs, stream['values'], stream['parameters'])
+            except RuntimeError as e:  # the catalogs changed and the analysis drew more hotbits than recorded
+                return jsonify({'error': str(e)}), 409
+            # the rates of the recorded run are the last ones stored for the analysis
+            stored = self.aetherOneDB.list_rates_for_analysis(stream['analysis_id'])
+            stored = stored[len(stored) - len(rates):]
+            key = lambda rate: (rate.signature, rate.catalog_id, rate.energetic_value, rate.gv)
+            return json_response({'stream_id': stream['id'], 'analysis_id': stream['analysis_id'],
+                                  'draws': stream['draws'], 'parameters': stream['parameters'],
+                                  'identical': [key(rate) for rate in rates] == [key(rate) for rate in stored],
+                                  'rates': rates})
+
+        # Batch analysis of many analyses or cases on a process pool, the progress is sent as 'analysis_job' event
+        @self.app.route('/analysisJobs', methods=['GET', 'POST'])
+        def analysisJobs():
+            if request.method == 'GET':
+                return json_response(self.analysisJobs.list())
+            jobRequest = request.json or {}
+            catalog_ids = jobRequest.get('catalog_ids') or ([jobRequest['catalog_id']] if jobRequest.get('catalog_id') else None)
+            try:
+                catalog_ids = [int(catalog_id) for catalog_id in catalog_ids] if catalog_ids else None
+                if jobRequest.get('case_ids'):
+                    if not catalog_ids:
+                        return jsonify({'error': 'catalog_id or catalog_ids is required for case_ids'}), 400
+                    analysis_ids = self.analysisJobs.analyses_for_cases([int(case_id) for case_id in jobRequest['case_ids']],
+                                                                        catalog_ids[0], jobRequest.get('note') or 'Batch analysis')
+                else:
+                    analysis_ids = [int(analysis_id) for analysis_id in jobRequest.get('analysis_ids') or []]
+                job = self.analysisJobs.submit(analysis_ids, catalog_ids,
+                                               bool(self.aetherOneDB.get_setting('analysisAdvanced')),
+                                               bool(self.aetherOneDB.get_setting('analysisAlwaysCheckGV')),
+                                               int(jobRequest.get('top_n', 24)))
+            except (ValueError, TypeError) as e:
+                return jsonify({'error': str(e)}), 400
+            return json_response(job.to_dict(), 202)
+
+        @self.app.route('/analysisJobs/<int:job_id>', methods=['GET', 'DELETE'])
+        def analysisJob(job_id: int):
+            job = self.analysisJobs.get(job_id)
+            if job is None:
+                return jsonify({'error': 'Job not found'}), 404
+            if request.method == 'DELETE':
+                self.analysisJobs.cancel(job_id)
+            return json_response(job.to_dict())
+
         @self.app.route('/checkGV', methods=['GET', 'POST'])
         def checkGV():
             # Single check
@@ -691,14 +904,15 @@ class AetherOnePy:
             if request.method == 'POST':
                 analysis:Analysis = self.aetherOneDB.get_analysis(int(request.json['id']))
                 rates_list = self.aetherOneDB.list_rates_for_analysis(analysis.id)
-                analysis.target_gv = checkGeneralVitality(self.hotbits)
+                # one batch for the target GV and the GV of every rate
+                target_gv, *rate_gvs = checkGeneralVitalityBatch(self.hotbits, len(rates_list) + 1)
+                analysis.target_gv = target_gv
                 analysis = self.aetherOneDB.insert_analysis(analysis)
                 enhanced_rates = []
-                for rate in rates_list:
-                    enhanced_rates.append(AnalysisRate(rate.signature, rate.description, rate.catalog_id, analysis.id, rate.energetic_value, checkGeneralVitality(self.hotbits), rate.level, rate.potency_type, rate.potency, rate.note))
+                for rate, gv in zip(rates_list, rate_gvs):
+                    enhanced_rates.append(AnalysisRate(rate.signature, rate.description, rate.catalog_id, analysis.id, rate.energetic_value, gv, rate.level, rate.potency_type, rate.potency, rate.note))
                 self.aetherOneDB.insert_rates_for_analysis(enhanced_rates)
-                response_data = json.dumps(analysis.to_dict(), ensure_ascii=False)
-                return Response(response_data, content_type='application/json; charset=utf-8')
+                return json_response(analysis)
             return "NOT IMPLEMENTED"
 
         @self.app.route('/openAiModels', methods=['GET'])
@@ -709,7 +923,7 @@ class AetherOnePy:
             client = OpenAI(api_key=openAiKey)
             try:
                 models = client.models.list()
-                print(models)
+                log.debug("OpenAI models %s", models)
                 model_names = [model.id for model in models.data]
                 return jsonify(model_names)
             except Exception as e:
@@ -726,7 +940,7 @@ class AetherOnePy:
             user_prompt = f"{userContent}\n\n{data}"
 
             try:
-                print(user_prompt)
+                log.debug("OpenAI prompt %s", user_prompt)
                 response = client.chat.completions.create(
                     model="chatgpt-4o-latest",
                     messages=[
@@ -735,7 +949,7 @@ class AetherOnePy:
                     ],
                     temperature=0.5
                 )
-                print(response)
+                log.debug("OpenAI response %s", response)
                 # Structure a detailed response
                 detailed_output = {
                     "id": response.id,
@@ -765,7 +979,7 @@ class AetherOnePy:
                 return jsonify(tasks), 200
             if request.method == 'POST':
                 broadcast_data = request.json
-                print(broadcast_data)
+                log.debug("Broadcast request %s", broadcast_data)
                 if (broadcast_data['analysis_id']):
                     analysis = self.aetherOneDB.get_analysis(int(broadcast_data['analysis_id']))
                     rateObject = self.aetherOneDB.get_rate(int(broadcast_data['rate_id']))
@@ -796,17 +1010,78 @@ class AetherOnePy:
 
             return "NOT IMPLEMENTED"
 
+        # Broadcasts scheduled for a time or for the hours / days ruled by a planet
+        @self.app.route('/broadcastSchedule', methods=['GET', 'POST', 'DELETE'])
+        def broadcastSchedule():
+            if request.method == 'GET':
+                return jsonify([job.to_dict() for job in self.broadcastScheduler.list_jobs()]), 200
+            if request.method == 'POST':
+                scheduleRequest = request.json or {}
+                try:
+                    run_at = scheduleRequest.get('run_at')
+                    job = ScheduledBroadcast(
+                        scheduleRequest.get('signature', ''),
+                        scheduleRequest.get('intention', ''),
+                        scheduleRequest.get('planet'),
+                        scheduleRequest.get('unit', 'hour'),
+                        datetime.fromisoformat(run_at) if run_at else None,
+                        bool(scheduleRequest.get('recurring', False)),
+                        scheduleRequest.get('analysis_id'),
+                        scheduleRequest.get('sessionID')
+                    )
+                    job = self.broadcastScheduler.schedule(job)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                return jsonify(job.to_dict()), 200
+            if request.method == 'DELETE':
+                if not self.broadcastScheduler.cancel(int(request.args.get('id', 0))):
+                    return jsonify({'error': 'Scheduled broadcast not found'}), 404
+                return jsonify({'message': 'scheduled broadcast deleted'}), 200
+
         # Generate a rate card image
         @self.app.route('/rateCard', methods=['GET'])
         def rateCard():
             input_string = request.args.get('rates')
             rates = RadionicChart.parse_input(input_string)
             chart = RadionicChart(request.args.get('rateName'), request.args.get('base'))
-            image = chart.draw_chart(rates)
-            buffer = io.BytesIO()
-            image.save(buffer, format='PNG')
-            buffer.seek(0)
-            return send_file(buffer, mimetype='image/png')
+            image_format = 'svg' if request.args.get('format') == 'svg' else 'png'
+            params = {'rates': rates, 'rateName': chart.rate_text, 'base': chart.base, 'format': image_format}
+            return self.responseCache.respond('rateCard', params, lambda: chart.render(rates, image_format))
+
+        # Generate the rate cards of a whole analysis or of a list of rates at once, as ZIP or multi-page PDF
+        @self.app.route('/rateCards', methods=['POST'])
+        def rateCards():
+            batchRequest = request.json
+            base = batchRequest.get('base', 'base10')
+            cards = []
+            if batchRequest.get('analysis_id') is not None:
+                for rate in self.aetherOneDB.list_rates_for_analysis(int(batchRequest['analysis_id'])):
+                    cards.append({'name': rate.signature, 'rates': RadionicChart.generate_rates(rate.signature, base)})
+            else:
+                for entry in batchRequest.get('rates', []):
+                    if isinstance(entry, str):
+                        cards.append({'name': entry, 'rates': entry})
+                    else:
+                        name = entry.get('name', '')
+                        cards.append({'name': name, 'rates': entry.get('rates') or RadionicChart.generate_rates(name, base)})
+            if len(cards) == 0:
+                return jsonify({'error': 'No rates found'}), 400
+            if len(cards) > MAX_CARDS:
+                return jsonify({'error': f'Not more than {MAX_CARDS} rate cards per request'}), 400
+            slot = self.rateCardBatch.try_acquire()
+            if slot is None:
+                return jsonify({'error': 'Too many rate card batches running, try again later'}), 503
+            if batchRequest.get('format') == 'pdf':
+                response = Response(self.rateCardBatch.stream_pdf(cards, base, slot), mimetype='application/pdf',
+                                    headers={'Content-Disposition': 'attachment; filename=rateCards.pdf'})
+            else:
+                image_format = 'svg' if batchRequest.get('imageFormat') == 'svg' else 'png'
+                response = Response(self.rateCardBatch.stream_zip(cards, base, image_format, slot),
+                                    mimetype='application/zip',
+                                    headers={'Content-Disposition': 'attachment; filename=rateCards.zip'})
+            # also if the client disconnects before the stream was started
+            response.call_on_close(slot.release)
+            return response
 
         @self.app.route("/planetary_info", methods=["GET"])
         def planetary_info():
@@ -814,8 +1089,98 @@ class AetherOnePy:
 
         @self.app.route("/planetary_calendar/<int:year>", methods=["GET"])
         def planetary_calendar(year):
-            calendar_data = self.planetaryInfoApi.generate_calendar(year).to_dict()
-            return jsonify(calendar_data)
+            def render_calendar():
+                calendar_data = self.planetaryInfoApi.generate_calendar(year).to_dict()
+                return json.dumps(calendar_data).encode('utf-8'), 'application/json'
+            return self.responseCache.respond('planetary_calendar', {'year': year}, render_calendar)
+
+        # Planetary days (weekday ruler, zodiac, season and progress, hour rulers) of a date range
+        @self.app.route("/planetary_days", methods=["GET"])
+        def planetary_days():
+            try:
+                from_date = date.fromisoformat(request.args.get('from', ''))
+                to_date = date.fromisoformat(request.args.get('to', request.args.get('from', '')))
+            except ValueError:
+                return jsonify({'error': 'from and to must be dates in the format YYYY-MM-DD'}), 400
+            if to_date < from_date or (to_date - from_date).days > 366:
+                return jsonify({'error': 'The range must be between 1 and 367 days'}), 400
+            with_hours = request.args.get('hours', 'true').lower() != 'false'
+            days = self.planetaryInfoApi.days(from_date, to_date, with_hours)
+            return jsonify([day.to_dict() for day in days]), 200
+
+        # Ruling planets of every hour of a time range
+        @self.app.route("/planetary_hours", methods=["GET"])
+        def planetary_hours():
+            try:
+                from_time = datetime.fromisoformat(request.args.get('from', ''))
+                to_time = datetime.fromisoformat(request.args.get('to', ''))
+            except ValueError:
+                return jsonify({'error': 'from and to must be ISO date times, e.g. 2025-01-01T06:00'}), 400
+            if to_time < from_time or to_time - from_time > timedelta(days=31):
+                return jsonify({'error': 'The range must not be longer than 31 days'}), 400
+            hours = self.planetaryInfoApi.hours(from_time, to_time)
+            return jsonify([{'hour': hour.isoformat(), 'planet': planet} for hour, planet in hours]), 200
+
+        # Sampling profiler over all threads (Flask, broadcasts, hotbits), for finding out why something is slow
+        @self.app.route('/admin/profiler', methods=['GET', 'POST', 'DELETE'])
+        def admin_profiler():
+            forbidden = self.admin_forbidden()
+            if forbidden is not None:
+                return forbidden
+            if request.method == 'POST':
+                data = request.get_json(silent=True) or {}
+                try:
+                    seconds = float(data.get('seconds', request.args.get('seconds', 30)))
+                    interval = float(data.get('interval', request.args.get('interval', 0.01)))
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'seconds and interval have to be numbers'}), 400
+                if seconds <= 0:
+                    return jsonify({'error': 'seconds has to be positive'}), 400
+                if not self.samplingProfiler.start(seconds, interval):
+                    return jsonify({'error': 'The profiler is already running'}), 409
+            if request.method == 'DELETE':
+                self.samplingProfiler.stop()
+            return jsonify(self.samplingProfiler.status()), 200
+
+        # Collapsed stacks of the last profile, open them in speedscope or render them with flamegraph.pl
+        @self.app.route('/admin/profiler/collapsed', methods=['GET'])
+        def admin_profiler_collapsed():
+            forbidden = self.admin_forbidden()
+            if forbidden is not None:
+                return forbidden
+            return Response(self.samplingProfiler.collapsed(), content_type='text/plain; charset=utf-8',
+                            headers={'Content-Disposition': 'attachment; filename=aetherone.collapsed'})
+
+        # cProfile captures of the requests sent with the header X-Profile: 1
+        @self.app.route('/admin/profiler/requests', methods=['GET'])
+        @self.app.route('/admin/profiler/requests/<int:profile_id>', methods=['GET'])
+        def admin_request_profiles(profile_id=None):
+            forbidden = self.admin_forbidden()
+            if forbidden is not None:
+                return forbidden
+            if profile_id is None:
+                return jsonify(self.requestProfiles.list()), 200
+            if request.args.get('format') == 'pstats':
+                data = self.requestProfiles.as_pstats(profile_id)
+                if data is None:
+                    return jsonify({'error': 'Profile not found'}), 404
+                return Response(data, content_type='application/octet-stream',
+                                headers={'Content-Disposition': f'attachment; filename=request-{profile_id}.pstats'})
+            text = self.requestProfiles.as_text(profile_id, request.args.get('sort', 'cumulative'),
+                                                int(request.args.get('limit', 50)))
+            if text is None:
+                return jsonify({'error': 'Profile not found'}), 404
+            return Response(text, content_type='text/plain; charset=utf-8')
+
+        # Prometheus metrics: request latencies, DAO timings, hotbits, broadcasts and Socket.IO emits
+        @self.app.route('/metrics', methods=['GET'])
+        def metrics():
+            return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+        # Hit rates and sizes of the response cache
+        @self.app.route('/cacheStats', methods=['GET'])
+        def cacheStats():
+            return jsonify(self.responseCache.stats()), 200
 
         @self.app.route('/sqlSelect', methods=['POST'])
         def sqlSelect():
@@ -850,39 +1215,105 @@ class AetherOnePy:
         return sanitized[:255]
 
     def run(self, args):
-        asyncio.run(update_or_clone_repo(os.path.join(self.PROJECT_ROOT, "data", "radionics-rates"),
-                 "https://github.com/isuretpolos/radionics-rates.git"))
-        self.broadcastService = BroadcastService(self.hotbits, self)
+        # pulling the rates repository needs the network, it must not delay the startup
+        threading.Thread(target=self.update_rates_repository, name='RatesRepository', daemon=True).start()
+        self.start_services()
+        port = int(args['port'])
+        self.port = port
+        if self.server_mode == 'production':
+            self.server = BoundedWSGIServer('0.0.0.0', port, self.app,
+                                            max_workers=int(self.aetherOneDB.get_setting('serverWorkers') or 64),
+                                            max_connections=int(self.aetherOneDB.get_setting('serverMaxConnections') or 256),
+                                            keep_alive_timeout=float(self.aetherOneDB.get_setting('serverKeepAliveTimeout') or 5))
+            print(f"Production server with {self.server.max_workers} workers listening on port {port}")
+            self.mark_ready()  # the socket is bound and listening, connections wait in the backlog
+            serve(self.server, float(self.aetherOneDB.get_setting('serverShutdownGrace') or 10), self.shutdown)
+            return
+        threading.Thread(target=self.mark_ready_when_listening, args=(port,), name='Readiness', daemon=True).start()
         try:
-            port = args['port']
-            self.socketio.run(self.app, host='0.0.0.0', port=port, debug=False)
+            if self.server_mode == 'eventlet':
+                self.socketio.run(self.app, host='0.0.0.0', port=port, debug=False,
+                                  max_size=int(self.aetherOneDB.get_setting('serverMaxConnections') or 256),
+                                  keepalive=float(self.aetherOneDB.get_setting('serverKeepAliveTimeout') or 5))
+            else:
+                self.socketio.run(self.app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True)
         except KeyboardInterrupt:
-            print("\nStopping AetherOnePy server ...")
-            self.aetherOneDB.close()
-            sys.exit(0)
-
+            pass
+        self.shutdown()
 
-if __name__ == '__main__':
+    def update_rates_repository(self):
+        asyncio.run(update_or_clone_repo(os.path.join(self.PROJECT_ROOT, "data", "radionics-rates"),
+                                         "https://github.com/isuretpolos/radionics-rates.git"))
+
+    def mark_ready(self):
+        """/ping answers with ready from now on, the marker line tells a launcher reading stdout right away."""
+        self.ready_seconds = round(time.monotonic() - STARTED, 3)
+        self.ready = True
+        print(f"{READY_MARKER} port={self.port} seconds={self.ready_seconds}", flush=True)
+
+    def mark_ready_when_listening(self, port: int, timeout: float = 60):
+        """socketio.run blocks without a hook after binding, so the port is probed until it accepts connections."""
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1):
+                    self.mark_ready()
+                    return
+            except OSError:
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+        log.error("Server did not start listening on port %d within %d seconds", port, timeout)
+
+    def start_services(self):
+        """Starts the broadcast queue and the scheduler, which are needed before requests are served."""
+        self.broadcastService = BroadcastService(self.hotbits, self)
+        self.broadcastScheduler = BroadcastScheduler(self.aetherOneDB, self.planetaryInfoApi,
+                                                     self.broadcastService.add_scheduled_task)
+        self.broadcastScheduler.start()
+
+    def shutdown(self):
+        print("\nStopping AetherOnePy server ...")
+        if hasattr(self, 'broadcastScheduler'):
+            self.broadcastScheduler.stop()
+        if hasattr(self, 'broadcastService'):
+            self.broadcastService.stop()
+        self.rateCardBatch.shutdown()
+        self.analysisJobs.shutdown()
+        self.aetherOneDB.close()
+        sys.exit(0)
+
+
+def main(argv: list | None = None):
     """
-    Main application, starts the webserver and provides services for digital radionics
+    Main application, starts the webserver and provides services for digital radionics.
+    The bundled desktop launcher calls it from a thread, with the port in the environment variable FLASK_PORT.
     """
-    multiprocessing.set_start_method("spawn")  # Ensures compatibility on Windows
-    port = 80
+    try:
+        multiprocessing.set_start_method("spawn")  # Ensures compatibility on Windows
+    except RuntimeError:
+        pass  # already set, e.g. when started by the desktop launcher
     argParser = argparse.ArgumentParser(
         prog='AetherOnePy',
         description='Open Source Digital Radionics'
     )
-    argParser.add_argument('-p', '--port', default='80')
+    argParser.add_argument('-p', '--port', default=os.environ.get('FLASK_PORT', '80'))
+    argParser.add_argument('-s', '--server', choices=SERVER_MODES, default=None,
+                           help='production (bounded thread pool, default), development (Werkzeug) or eventlet')
     argParser.print_help()
-    args = vars(argParser.parse_args())
+    args = vars(argParser.parse_args(argv))
     
     print("Starting AetherOnePy server ...")
     #cpuCount = multiprocessing.cpu_count() --> on Ubuntu Windows Subsystem it produces an endless loop of stupidity
     #print("CPU Count: ", cpuCount)
     print(f"Click here http://localhost:{args['port']} or open the URL in your favorite browser\nSupport me on Patreon https://www.patreon.com/aetherone")
-    aetherOnePy = AetherOnePy()
+    aetherOnePy = AetherOnePy(args['server'])
     aetherOnePy.run(args)
 
+
+if __name__ == '__main__':
+    main()
+
     
 
     
@@ -0,0 +1,130 @@
+"""
+Load test for a running AetherOnePy server, reports requests per second and latency percentiles.
+
+Compare the server modes by starting the server once with --server development and once with
+--server production and running the same test against both:
+
+    python scripts/loadTest.py http://localhost:7000/ping http://localhost:7000/rateCard?rates=10.3%205.7 -c 32 -d 20
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Client(threading.Thread):
+    """
+    One simulated user, sends requests one after another over a keep-alive connection.
+    """
+
+    def __init__(self, urls: list, deadline: float, method: str, body: bytes | None, keep_alive: bool):
+        super().__init__(daemon=True)
+        self.urls = [urlsplit(url) for url in urls]
+        self.deadline = deadline
+        self.method = method
+        self.body = body
+        self.keep_alive = keep_alive
+        self.latencies = []
+        self.errors = {}
+        self.connection = None
+
+    def _connect(self, url):
+        if self.connection is None or not self.keep_alive:
+            if self.connection is not None:
+                self.connection.close()
+            connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+            self.connection = connection_class(url.hostname, url.port, timeout=60)
+        return self.connection
+
+    def run(self):
+        headers = {'Content-Type': 'application/json'} if self.body else {}
+        count = 0
+        while time.monotonic() < self.deadline:
+            url = self.urls[count % len(self.urls)]
+            count += 1
+            path = url.path + ('?' + url.query if url.query else '')
+            start = time.perf_counter()
+            try:
+                connection = self._connect(url)
+                connection.request(self.method, path or '/', body=self.body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    self.errors[response.status] = self.errors.get(response.status, 0) + 1
+                    if response.getheader('Connection', '').lower() == 'close':
+                        self.connection.close()
+                        self.connection = None
+                    continue
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.connection.close()
+                    self.connection = None
+            except (OSError, http.client.HTTPException) as e:
+                self.errors[type(e).__name__] = self.errors.get(type(e).__name__, 0) + 1
+                if self.connection is not None:
+                    self.connection.close()
+                self.connection = None
+                continue
+            self.latencies.append(time.perf_counter() - start)
+        if self.connection is not None:
+            self.connection.close()
+
+
+def run_load_test(urls: list, concurrency: int, duration: float, method: str = 'GET', body: bytes | None = None,
+                  keep_alive: bool = True) -> dict:
+    deadline = time.monotonic() + duration
+    clients = [Client(urls, deadline, method, body, keep_alive) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    errors = {}
+    for client in clients:
+        for key, count in client.errors.items():
+            errors[str(key)] = errors.get(str(key), 0) + count
+    return {
+        'urls': urls,
+        'concurrency': concurrency,
+        'duration': round(elapsed, 2),
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'latency_ms': {name: round(percentile(latencies, fraction) * 1000, 2)
+                       for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))}
+    }
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(prog='loadTest', description='Load test for the AetherOnePy server')
+    argParser.add_argument('urls', nargs='+', help='URLs requested in turn by every client')
+    argParser.add_argument('-c', '--concurrency', type=int, default=16)
+    argParser.add_argument('-d', '--duration', type=float, default=10, help='seconds')
+    argParser.add_argument('-m', '--method', default='GET')
+    argParser.add_argument('-b', '--body', default=None, help='JSON body for POST requests')
+    argParser.add_argument('--no-keep-alive', action='store_true', help='open a new connection for every request')
+    argParser.add_argument('--json', action='store_true', help='print the result as JSON')
+    args = argParser.parse_args()
+
+    result = run_load_test(args.urls, args.concurrency, args.duration, args.method.upper(),
+                           args.body.encode('utf-8') if args.body else None, not args.no_keep_alive)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        latency = result['latency_ms']
+        print(f"{result['requests']} requests in {result['duration']} s with {result['concurrency']} clients")
+        print(f"{result['requests_per_second']} requests/s | p50 {latency['p50']} ms | p90 {latency['p90']} ms | "
+              f"p99 {latency['p99']} ms | max {latency['max']} ms")
+        if result['errors']:
+            print(f"errors: {result['errors']}")
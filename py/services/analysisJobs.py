@@ -0,0 +1,340 @@
+# Batch analysis of many analyses or cases at once (e.g. a weekly sweep in group practice), run on a process pool
+import itertools
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from scipy.special import bdtrc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from domains.aetherOneDomains import Analysis, Session
+from services.analyzeService import analyze_catalogs
+from services.databaseService import CaseDAO
+from services.entropyStream import EntropyExhausted, EntropyStream
+from services.hotbitsService import HotbitsExhausted, TimeLoopHotbits
+from services.logService import get_logger, fields, sampled
+
+log = get_logger('analysisJobs')
+
+MAX_ANALYSES_PER_JOB = 1000
+INSERT_BATCH_ROWS = 1000
+FINISHED_JOBS_KEPT = 50
+RACE_PASSES = 200  # passes of the race to 1000, 5 points per rate and pass on average
+BUDGET_MARGIN = 1.2
+
+# the DAO of a worker process, opened by _init_worker, and the catalog revision of the parent its cache belongs to
+_worker_dao = None
+_worker_catalog_revision = None
+
+
+def _init_worker(db_filename: str):
+    global _worker_dao
+    _worker_dao = CaseDAO(db_filename)
+
+
+def run_analysis(analysis_id: int, catalog_ids: list, hotbits, advanced: bool, auto_check_gv: bool,
+                 top_n: int, catalog_revision: int) -> tuple:
+    """
+    Analyzes one analysis inside a worker process with its own entropy stream. The catalogs are cached by the
+    DAO of the worker until the catalog_revision of the parent DAO changes (rates inserted or deleted), the
+    AnalysisRate objects and the hotbits drawn are returned to the parent which writes them in bulk. The stream
+    is strict: if the block of hotbits is used up EntropyExhausted is raised and the parent runs the analysis
+    again with a larger block (which starts with the same hotbits, so the result is the same).
+    Without a block the worker generates time loop hotbits itself.
+    """
+    global _worker_catalog_revision
+    if catalog_revision != _worker_catalog_revision:
+        _worker_dao.catalog_columns.clear()
+        _worker_catalog_revision = catalog_revision
+    catalogs = [_worker_dao.get_catalog_columns(catalog_id) for catalog_id in catalog_ids]
+    stream = EntropyStream(source=TimeLoopHotbits()) if hotbits is None else EntropyStream(hotbits, strict=True)
+    return analyze_catalogs(analysis_id, catalogs, stream, auto_check_gv, advanced, top_n), stream.recorded()
+
+
+def advanced_preselection(size: int) -> tuple:
+    """
+    Expected passes of the advanced pre-selection over a catalog of size rates (every pass adds 1 with a
+    probability of 1/5 to each rate, until 20 rates exceed 10) and the expected number of rates exceeding 10.
+    """
+    passes = np.arange(11, 1000)
+    worthy = size * bdtrc(10, passes, 0.2)  # rates with at least 11 hits after that many passes
+    index = min(int(np.argmax(worthy >= 20)), passes.size - 1)
+    return int(passes[index]), float(worthy[index])
+
+
+def entropy_budget(catalog_sizes: list, advanced: bool, auto_check_gv: bool, top_n: int) -> int:
+    """
+    Hotbits taken from the pool for one analysis, the expected draws of analyze_catalogs with a margin: the
+    shuffle seed, the pre-selection (24 draws, or the passes over every rate in advanced mode), the race to 1000
+    of the selected rates and the GV checks (three values and a few dice per rate). Unused hotbits go back to the
+    pool, an analysis running short is repeated with a larger block.
+    """
+    draws = 2
+    for size in catalog_sizes:
+        if not advanced:
+            selected = min(24, size)
+            draws += selected + RACE_PASSES * selected
+        elif size >= 20:
+            passes, worthy = advanced_preselection(size)
+            draws += passes * size + RACE_PASSES * worthy
+        if auto_check_gv:
+            draws += 4 * min(top_n, size)
+    return int(draws * BUDGET_MARGIN)
+
+
+class AnalysisJob:
+
+    def __init__(self, job_id: int, analysis_ids: list, catalog_ids: dict):
+        self.id = job_id
+        self.analysis_ids = analysis_ids
+        self.catalog_ids = catalog_ids  # analysis id -> catalog ids
+        self.status = 'queued'
+        self.done = 0
+        self.failed = {}  # analysis id -> error message
+        self.error = None
+        self.rates = 0
+        self.created = time.time()
+        self.finished = None
+        self.futures = []
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total': len(self.analysis_ids),
+            'done': self.done,
+            'failed': self.failed,
+            'error': self.error,
+            'rates': self.rates,
+            'analysis_ids': self.analysis_ids,
+            'created': self.created,
+            'finished': self.finished
+        }
+
+
+class AnalysisJobRunner:
+    """
+    Runs batch analysis jobs on a pool of worker processes (one per core by default). Every analysis gets its own
+    block of hotbits, the results are written in bulk and the progress is reported with emit(job dict).
+    """
+
+    def __init__(self, aetherOneDB: CaseDAO, db_filename: str, hotbits, emit=None, max_workers: int = 0):
+        self.aetherOneDB = aetherOneDB
+        self.db_filename = db_filename
+        self.hotbits = hotbits
+        self.emit = emit
+        self.max_workers = max_workers if max_workers > 0 else (os.cpu_count() or 1)
+        self.executor = None
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.ids = itertools.count(1)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # the pool is started on the first job, not at server startup
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                    initargs=(self.db_filename,))
+            return self.executor
+
+    def analyses_for_cases(self, case_ids: list, catalog_id: int, note: str) -> list:
+        """
+        Creates a new analysis in the last session of every case (or a new session), returns their ids.
+        """
+        unknown = [case_id for case_id in case_ids if self.aetherOneDB.get_case(case_id) is None]
+        if unknown:
+            raise ValueError(f"unknown cases {unknown}")
+        analysis_ids = []
+        for case_id in case_ids:
+            session = self.aetherOneDB.get_last_session(case_id)
+            if session is None:
+                session = Session(note, '', case_id)
+                self.aetherOneDB.insert_session(session)
+            analysis = Analysis(note, session.id)
+            analysis.catalogId = catalog_id
+            analysis_ids.append(self.aetherOneDB.insert_analysis(analysis).id)
+        return analysis_ids
+
+    def submit(self, analysis_ids: list, catalog_ids: list | None = None, advanced: bool = False,
+               auto_check_gv: bool = False, top_n: int = 24) -> AnalysisJob:
+        """
+        Starts a job, without catalog_ids each analysis uses its own catalog. Raises ValueError for unknown
+        analyses or analyses without catalog.
+        """
+        if not analysis_ids or len(analysis_ids) > MAX_ANALYSES_PER_JOB:
+            raise ValueError(f"between 1 and {MAX_ANALYSES_PER_JOB} analyses per job")
+        job_catalogs = {}
+        for analysis_id in analysis_ids:
+            analysis = self.aetherOneDB.get_analysis(analysis_id)
+            if analysis is None:
+                raise ValueError(f"unknown analysis {analysis_id}")
+            job_catalogs[analysis_id] = list(catalog_ids) if catalog_ids else [analysis.catalogId]
+            if job_catalogs[analysis_id][0] is None or job_catalogs[analysis_id][0] < 0:
+                raise ValueError(f"analysis {analysis_id} has no catalog")
+        with self.lock:
+            job = AnalysisJob(next(self.ids), list(analysis_ids), job_catalogs)
+            self.jobs[job.id] = job
+            finished = [old.id for old in self.jobs.values() if old.finished is not None]
+            for old_id in finished[:max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+                del self.jobs[old_id]
+        threading.Thread(target=self._run, args=(job, advanced, auto_check_gv, top_n), name=f"AnalysisJob-{job.id}",
+                         daemon=True).start()
+        return job
+
+    def _run(self, job: AnalysisJob, advanced: bool, auto_check_gv: bool, top_n: int):
+        start = time.perf_counter()
+        job.status = 'running'
+        try:
+            self._analyze(job, advanced, auto_check_gv, top_n)
+        except Exception as e:
+            log.exception("Analysis job %s failed", job.id)
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished = time.time()
+        if job.status == 'running':
+            job.status = 'failed' if len(job.failed) == len(job.analysis_ids) else 'finished'
+        job.futures = []
+        log.info("Analysis job finished", extra=fields(job=job.id, status=job.status, analyses=len(job.analysis_ids),
+                                                      rates=job.rates, seconds=round(time.perf_counter() - start, 3)))
+        self._emit(job)
+
+    def _analyze(self, job: AnalysisJob, advanced: bool, auto_check_gv: bool, top_n: int):
+        executor = self._get_executor()
+        # read before the sizes: a change in between only makes the workers reload once more
+        catalog_revision = self.aetherOneDB.catalog_revision
+        sizes = {catalog_id: len(self.aetherOneDB.get_catalog_columns(catalog_id))
+                 for catalog_ids in job.catalog_ids.values() for catalog_id in catalog_ids}
+        # the time loop is slow, in simulation mode it runs in the workers instead of before every submit
+        simulated = self.hotbits.isSimulated()
+        futures = {}  # future -> (analysis id, block of hotbits)
+
+        def submit(analysis_id: int, hotbits):
+            future = executor.submit(run_analysis, analysis_id, job.catalog_ids[analysis_id], hotbits, advanced,
+                                     auto_check_gv, top_n, catalog_revision)
+            futures[future] = (analysis_id, hotbits)
+            job.futures.append(future)
+
+        for analysis_id in job.analysis_ids:
+            if job.status == 'cancelled':
+                break
+            if simulated:
+                submit(analysis_id, None)
+                continue
+            budget = entropy_budget([sizes[catalog_id] for catalog_id in job.catalog_ids[analysis_id]], advanced,
+                                    auto_check_gv, top_n)
+            # the block is taken here, the hotbits pool and its files belong to this process
+            try:
+                submit(analysis_id, self.hotbits.takeHotbits(budget, strict=True))
+            except HotbitsExhausted as e:
+                log.error("Analysis %s of job %s failed: %s", analysis_id, job.id, e)
+                job.failed[analysis_id] = str(e)
+                job.done += 1
+        self._emit(job)
+
+        record = self.aetherOneDB.get_setting('recordEntropyStreams')
+        pending_rates, pending_streams = [], []
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                analysis_id, hotbits = futures.pop(future)
+                used = 0  # hotbits of the block used by the worker
+                try:
+                    if future.cancelled():
+                        continue
+                    rates, recorded = future.result()
+                    used = recorded.size
+                    pending_rates += rates
+                    if record:
+                        parameters = {'catalog_ids': job.catalog_ids[analysis_id], 'advanced': advanced,
+                                      'auto_check_gv': auto_check_gv, 'top_n': top_n}
+                        pending_streams.append((uuid.uuid4().hex, analysis_id, recorded, parameters))
+                except EntropyExhausted:
+                    if job.status == 'cancelled':
+                        continue
+                    # the same hotbits followed by more, the analysis draws them in the same order again
+                    log.info("Analysis %s of job %s needs more than %d hotbits", analysis_id, job.id,
+                             hotbits.size, extra=sampled('analysisJobs.exhausted'))
+                    try:
+                        more = self.hotbits.takeHotbits(hotbits.size // 2, strict=True)
+                    except HotbitsExhausted as e:
+                        log.error("Analysis %s of job %s failed: %s", analysis_id, job.id, e)
+                        job.failed[analysis_id] = str(e)
+                    else:
+                        submit(analysis_id, np.concatenate([hotbits, more]))
+                        hotbits = None  # the block goes on with the new submit
+                        continue
+                except Exception as e:
+                    log.error("Analysis %s of job %s failed: %s", analysis_id, job.id, e)
+                    job.failed[analysis_id] = str(e)
+                    used = hotbits.size if hotbits is not None else 0  # the hotbits drawn are unknown
+                finally:
+                    if hotbits is not None:
+                        self.hotbits.returnHotbits(hotbits, used)
+                job.done += 1
+                if len(pending_rates) >= INSERT_BATCH_ROWS:
+                    self._insert(job, pending_rates, pending_streams)
+                    pending_rates, pending_streams = [], []
+                self._emit(job)
+        self._insert(job, pending_rates, pending_streams)
+
+    def _insert(self, job: AnalysisJob, rates: list, streams: list):
+        if rates:
+            self.aetherOneDB.insert_rates_for_analysis(rates)
+            job.rates += len(rates)
+        if streams:
+            self.aetherOneDB.insert_entropy_streams(streams)
+
+    def _emit(self, job: AnalysisJob):
+        if self.emit is not None:
+            self.emit(job.to_dict())
+
+    def get(self, job_id: int) -> AnalysisJob | None:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> list:
+        with self.lock:
+            return [job.to_dict() for job in reversed(self.jobs.values())]
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancels the analyses of the job which have not started yet."""
+        job = self.get(job_id)
+        if job is None or job.finished is not None:
+            return False
+        job.status = 'cancelled'
+        for future in list(job.futures):
+            future.cancel()
+        return True
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+
+# Example Usage
+if __name__ == "__main__":
+    import tempfile
+    from benchmarks.stubHotbits import StubHotbitsService
+    from domains.aetherOneDomains import Case, Catalog
+    from datetime import datetime
+
+    folder = tempfile.mkdtemp()
+    os.makedirs(os.path.join(folder, 'hotbits'))
+    db_filename = os.path.join(folder, 'aetherone.db')
+    dao = CaseDAO(db_filename)
+    dao.insert_catalog(Catalog('Generated', '', ''))
+    dao.conn.executemany('INSERT INTO rate (signature, description, catalog_id) VALUES (?, ?, 1)',
+                         [(f"Rate {n}", '') for n in range(5000)])
+    case_ids = [dao.insert_case(Case(f"Case {n}", '', '#000000', '', datetime.now(), datetime.now())) for n in range(48)]
+    runner = AnalysisJobRunner(dao, db_filename, StubHotbitsService(os.path.join(folder, 'hotbits'), dao),
+                               lambda job: print(job['status'], job['done'], '/', job['total']))
+    job = runner.submit(runner.analyses_for_cases(case_ids, 1, 'Weekly sweep'), advanced=True)
+    while job.finished is None:
+        time.sleep(0.1)
+    runner.shutdown()
@@ -1,11 +1,13 @@
-import sys, os, random
+import sys, os
+import numpy as np
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from services.databaseService import get_case_dao
 from services.hotbitsService import HotbitsService, HotbitsSource
-from domains.aetherOneDomains import AnalysisRate
+from services.rateCatalog import ColumnarCatalog
+from services.entropyStream import EntropyStream
 
 
 def transformAnalyzeListToDict(rates: []):
@@ -15,101 +17,142 @@ def transformAnalyzeListToDict(rates: []):
     return dictList
 
 
-def analyze(analysis_id: int, rates: list, hotbits_service: HotbitsService, autoCheckGV:bool = False, enhancedAnalysis:bool = False) -> list:
-
-    if rates is None or len(rates) == 0:
-        return []
-
-    enhanced_rates = []
-    random.shuffle(rates)
-    random.shuffle(rates)
-    random.shuffle(rates)
+def analyze(analysis_id: int, rates, hotbits_service: HotbitsService, autoCheckGV:bool = False, enhancedAnalysis:bool = False) -> list:
+    """
+    rates is a ColumnarCatalog (see CaseDAO.get_catalog_columns) or a list of Rate objects. The analysis runs on
+    the indices of the rates, AnalysisRate objects are only created for the (at most 24) selected rates.
+    """
+    catalog = rates if isinstance(rates, ColumnarCatalog) else ColumnarCatalog.from_rates(rates or [])
+    return analyze_catalogs(analysis_id, [catalog], hotbits_service, autoCheckGV, enhancedAnalysis)
+
+
+def analyze_catalogs(analysis_id: int, catalogs: list, hotbits_service: HotbitsService, autoCheckGV: bool = False,
+                     enhancedAnalysis: bool = False, top_n: int = 24) -> list:
+    """
+    Analysis of several catalogs (ColumnarCatalog) in one pass over their combined index space. Every catalog
+    gets its own pre-selection and its own race to 1000, the hotbits of each pass are drawn for all catalogs
+    at once. Returns the top_n rates of each catalog, in the order of the catalogs.
+    """
+    sizes = [len(catalog) for catalog in catalogs]
+    starts = np.cumsum([0] + sizes[:-1]).tolist() if catalogs else []
+
+    # the order of the rates of each catalog, shuffled three times like the rate list was before, by a private
+    # generator seeded with two hotbits (so the whole analysis depends on the drawn hotbits only)
+    shuffler = np.random.default_rng((hotbits_service.takeHotbits(2) & 0xFFFFFFFF).tolist())
+    orders = []
+    for start, size in zip(starts, sizes):
+        order = np.arange(start, start + size)
+        for _ in range(3):
+            shuffler.shuffle(order)
+        orders.append(order)
 
     # PRE-SELECTION
     # FIRST ITERATION
     if not enhancedAnalysis:
-        # DEFAULT PRE-SELECTION
-        countSelected = 0
-        while countSelected < 24 and len(rates) > 0:
-            countSelected += 1
-            #if len(rates) == 0:
-             #   break
-            pos = hotbits_service.getInt(0, len(rates)) - 1
-            rate = rates.pop(pos)  # random select 24 rates
-            newRate = AnalysisRate(rate.signature, rate.description, rate.catalogID, analysis_id, 0, 0,
-                                   0, "", 0, "")
-            newRate.id = rate.id
-            enhanced_rates.append(newRate)
+        # DEFAULT PRE-SELECTION, random select 24 rates per catalog
+        selections = []
+        for order in orders:
+            selected = []
+            while len(selected) < 24 and order.size > 0:
+                pos = hotbits_service.getInt(0, order.size) - 1
+                selected.append(order[pos])
+                order = np.delete(order, pos)
+            selections.append(np.array(selected, dtype=np.int64))
+        selected = np.concatenate(selections) if selections else np.empty(0, dtype=np.int64)
+        segments = np.repeat(np.arange(len(selections)), [selection.size for selection in selections])
+        values = np.zeros(selected.size, dtype=np.int64)
     else:
         # ADVANCED PRE-SELECTION
-        for rate in rates:
-            newRate = AnalysisRate(rate.signature, rate.description, rate.catalogID, analysis_id, 0, 0,
-                                   0, "", 0, "")
-            newRate.id = rate.id
-            enhanced_rates.append(newRate)
-        # assign +1 to value until 20 of them reach at least a value 10
-        while True:
-            for rate in enhanced_rates:
-                random_value = hotbits_service.getInt(1, 5)
-                if random_value == 5:
-                    rate.energetic_value += 1
-            if len(enhanced_rates) < 20:
-                break
-            countSelected = 0
-            for rate in enhanced_rates:
-                if rate.energetic_value > 10:
-                    countSelected += 1
-            if countSelected >= 20:
-                break
+        selected = np.concatenate(orders) if orders else np.empty(0, dtype=np.int64)
+        segments = np.repeat(np.arange(len(orders)), sizes)
+        values = np.zeros(selected.size, dtype=np.int64)
+        # assign +1 to value until 20 of them reach at least a value 10, for each catalog
+        # (catalogs with less than 20 rates cannot get a value of 11 and are left out)
+        open_catalogs = np.array([size >= 20 for size in sizes], dtype=bool)
+        while open_catalogs.any():
+            active = np.flatnonzero(open_catalogs[segments])
+            # no value can exceed 10 within the next 10 - max passes, they are drawn in one block
+            passes = max(1, 10 - int(values[active].max()))
+            values[active] += (hotbits_service.getInts(1, 5, passes * active.size).reshape(passes, -1) == 5).sum(axis=0)
+            open_catalogs &= np.bincount(segments[values > 10], minlength=len(sizes)) < 20
         # CLEAN ALL NON WORTHY
-        enhanced_rates = [rate for rate in enhanced_rates if rate.energetic_value >= 11]
+        worthy = values >= 11
+        selected, values, segments = selected[worthy], values[worthy], segments[worthy]
 
     # SECOND ITERATION, assign 0 to 10 until at least one reach 1000
     # from this point there is no difference between advanced or default analysis
-    maxReached = False
-
-    while maxReached == False:
-        for rate in enhanced_rates:
-            rate.energetic_value += hotbits_service.getInt(0, 10)
-
-            if rate.energetic_value >= 1000:
-                maxReached = True
-                break
+    bounds = np.searchsorted(segments, np.arange(len(catalogs) + 1))  # the rates of catalog k are bounds[k]:bounds[k+1]
+    open_catalogs = bounds[1:] > bounds[:-1]
+    while open_catalogs.any():
+        active = np.flatnonzero(open_catalogs[segments])
+        # no value can reach 1000 within the next (999 - max) // 10 passes, they are drawn in one block
+        passes = (999 - int(values[active].max())) // 10
+        if passes > 0:
+            values[active] += hotbits_service.getInts(0, 10, passes * active.size).reshape(passes, -1).sum(axis=0)
+            continue
+        updated = values.copy()
+        updated[active] += hotbits_service.getInts(0, 10, active.size)
+        reached = updated >= 1000
+        for k in np.flatnonzero(open_catalogs):
+            first, last = bounds[k], bounds[k + 1]
+            hits = np.flatnonzero(reached[first:last])
+            if hits.size > 0:
+                # like the former loop over the rates, the pass stops at the first rate reaching 1000
+                last = first + hits[0] + 1
+                open_catalogs[k] = False
+            values[first:last] = updated[first:last]
 
-    enhanced_rates.sort(key=lambda r: r.energetic_value, reverse=True)
-
-    if len(enhanced_rates) > 24:
-        enhanced_rates = enhanced_rates[0:24]
+    enhanced_rates = []
+    for k, catalog in enumerate(catalogs):
+        first, last = bounds[k], bounds[k + 1]
+        ranked = first + np.argsort(-values[first:last], kind='stable')[:top_n]
+        # back from the combined index space to the indices of the catalog
+        enhanced_rates += catalog.analysis_rates(selected[ranked] - starts[k], analysis_id, values[ranked].tolist())
 
     if autoCheckGV:
-        for rate in enhanced_rates:
-            rate.gv = checkGeneralVitality(hotbits_service)
+        for rate, gv in zip(enhanced_rates, checkGeneralVitalityBatch(hotbits_service, len(enhanced_rates))):
+            rate.gv = gv
 
     return enhanced_rates
 
 
+def replay_analysis(analysis_id: int, catalogs: list, recorded, parameters: dict) -> list:
+    """
+    Runs an analysis again on the hotbits recorded by its EntropyStream, with the parameters stored next to them.
+    The result is the same as the original one as long as the catalogs did not change.
+    """
+    return analyze_catalogs(analysis_id, catalogs, EntropyStream.replay(recorded), parameters['auto_check_gv'],
+                            parameters['advanced'], parameters['top_n'])
+
+
 def checkGeneralVitality(hotbits_service: HotbitsService):
-    list = []
-    for i in range(3):
-        list.append(hotbits_service.getInt(0,1000))
+    return checkGeneralVitalityBatch(hotbits_service, 1)[0]
 
-    list.sort(reverse=True)
-    gv = list[0]
 
-    if gv > 950:
-        randomDice = hotbits_service.getInt(0,100)
+def checkGeneralVitalityBatch(hotbits_service: HotbitsService, count: int) -> list:
+    """
+    Computes count general vitality values in one vectorized pass over pooled hotbits.
+    Each GV is the highest of three values between 0 and 1000. Above 950 dice (0-100) are rolled and added
+    as long as they show at least 50, the dice are rolled for all open GVs at once.
+    """
+    if count < 1:
+        return []
+    gv = hotbits_service.getInts(0, 1000, 3 * count).reshape(count, 3).max(axis=1)
 
-        while randomDice >= 50:
-            gv += randomDice
-            randomDice = hotbits_service.getInt(0, 100)
-    return gv
+    open_gv = np.flatnonzero(gv > 950)
+    while open_gv.size > 0:
+        dice = hotbits_service.getInts(0, 100, open_gv.size)
+        lucky = dice >= 50
+        gv[open_gv[lucky]] += dice[lucky]
+        open_gv = open_gv[lucky]
+    return gv.tolist()
 
 
 # Example Usage
 if __name__ == "__main__":
     aetherOneDB = get_case_dao(os.path.join(PROJECT_ROOT, 'data/aetherone.db'))
     catalogs = aetherOneDB.list_catalogs()
-    rates_list = aetherOneDB.list_rates_from_catalog(catalogs[0].id)
+    rates_list = aetherOneDB.get_catalog_columns(catalogs[0].id)
     hotbits = HotbitsService(HotbitsSource.WEBCAM, os.path.join(PROJECT_ROOT, "hotbits"))
     #rates_list = [
     #    Rate("R1", "Rate 1 Description", 101),
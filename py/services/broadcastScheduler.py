@@ -0,0 +1,176 @@
+# Scheduler for broadcasts which should run at a given time or during the hours / days ruled by a planet
+import heapq
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from domains.aetherOneDomains import ScheduledBroadcast
+from services.planetaryInfluence import PlanetaryRulershipCalendarAPI, planetary_hours
+from services.logService import get_logger
+
+log = get_logger('scheduler')
+
+# Upper bound of a single sleep, so a changed system clock (or a suspended machine) is noticed within this time
+MAX_SLEEP_SECONDS = 3600
+UNITS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+
+
+class BroadcastScheduler:
+    """
+    Keeps the scheduled broadcasts in a heap ordered by their next run. A single thread sleeps on a condition
+    until the earliest job is due (or a job is added or cancelled), so idle jobs cost no CPU, however many there are.
+    Jobs are persisted in the scheduled_broadcast table and loaded again on start().
+    """
+
+    def __init__(self, aetherOneDB, planetary_api: PlanetaryRulershipCalendarAPI, submit):
+        """
+        :param submit: called with a due ScheduledBroadcast, e.g. BroadcastService.add_scheduled_task
+        """
+        self.aetherOneDB = aetherOneDB
+        self.planetary_api = planetary_api
+        self.submit = submit
+        self.jobs = {}  # id -> ScheduledBroadcast
+        self.heap = []  # (timestamp of next run, job id), outdated entries are skipped when popped
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.wakeups = 0
+        self.thread = None
+
+    def start(self):
+        now = datetime.now()
+        for job in self.aetherOneDB.list_scheduled_broadcasts():
+            # planetary slots missed while the server was down are not caught up, the job waits for its next slot
+            if job.next_run is None or (job.planet and job.next_run + UNITS[job.unit] <= now):
+                job.next_run = self.next_run(job, now)
+                self.aetherOneDB.update_scheduled_broadcast_next_run(job.id, job.next_run)
+            if job.next_run is None:
+                self.aetherOneDB.delete_scheduled_broadcast(job.id)
+                continue
+            self._push(job)
+        self.thread = threading.Thread(target=self._run, name='BroadcastScheduler', daemon=True)
+        self.thread.start()
+        log.info("Broadcast scheduler started with %d jobs", len(self.jobs))
+
+    def stop(self, timeout: float = 5):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def next_run(self, job: ScheduledBroadcast, after: datetime) -> datetime | None:
+        """
+        Next time the job is due at or after the given time, None if it will never run (again).
+        """
+        if job.run_at is not None and job.run_at > after:
+            after = job.run_at
+        if not job.planet:
+            return after if job.run_at is not None else None
+        slot = self.planetary_api.next_slot(job.planet, after, job.unit)
+        return max(slot, after) if slot is not None else None
+
+    def schedule(self, job: ScheduledBroadcast) -> ScheduledBroadcast:
+        if job.planet is not None and job.planet not in planetary_hours:
+            raise ValueError(f"Unknown planet {job.planet}")
+        if job.unit not in UNITS:
+            raise ValueError(f"Unknown unit {job.unit}, use one of {list(UNITS)}")
+        if job.planet is None and job.run_at is None:
+            raise ValueError("A scheduled broadcast needs a planet or a time (run_at)")
+        job.next_run = self.next_run(job, datetime.now())
+        job.id = self.aetherOneDB.insert_scheduled_broadcast(job)
+        self._push(job)
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        with self.condition:
+            job = self.jobs.pop(job_id, None)
+            self.condition.notify()
+        self.aetherOneDB.delete_scheduled_broadcast(job_id)
+        return job is not None
+
+    def list_jobs(self) -> list:
+        with self.condition:
+            return sorted(self.jobs.values(), key=lambda job: job.next_run)
+
+    def stats(self) -> dict:
+        with self.condition:
+            return {'jobs': len(self.jobs), 'heap': len(self.heap), 'wakeups': self.wakeups,
+                    'next_run': self.heap[0][0] if self.heap else None}
+
+    def _push(self, job: ScheduledBroadcast):
+        with self.condition:
+            self.jobs[job.id] = job
+            heapq.heappush(self.heap, (job.next_run.timestamp(), job.id))
+            # only the scheduler thread's sleep is affected, if the new job is the earliest one
+            if self.heap[0][1] == job.id:
+                self.condition.notify()
+
+    def _next_due(self) -> ScheduledBroadcast | None:
+        """
+        Sleeps until the earliest job is due and removes it from the heap, returns None when stopped.
+        """
+        with self.condition:
+            while not self.stopped:
+                if self.heap:
+                    timestamp, job_id = self.heap[0]
+                    job = self.jobs.get(job_id)
+                    if job is None or job.next_run.timestamp() != timestamp:
+                        heapq.heappop(self.heap)  # cancelled or rescheduled
+                        continue
+                    delay = timestamp - time.time()
+                    if delay <= 0:
+                        heapq.heappop(self.heap)
+                        return job
+                    self.condition.wait(min(delay, MAX_SLEEP_SECONDS))
+                else:
+                    self.condition.wait()
+                self.wakeups += 1
+        return None
+
+    def _run(self):
+        while True:
+            job = self._next_due()
+            if job is None:
+                return
+            try:
+                self.submit(job)
+            except Exception as e:
+                log.error("Scheduled broadcast %s could not be started: %s", job.id, e)
+
+            next_run = None
+            if job.recurring and job.planet:
+                slot_end = job.next_run.replace(minute=0, second=0, microsecond=0)
+                if job.unit == 'day':
+                    slot_end = slot_end.replace(hour=0)
+                next_run = self.next_run(job, slot_end + UNITS[job.unit])
+            if next_run is None:
+                with self.condition:
+                    self.jobs.pop(job.id, None)
+                self.aetherOneDB.delete_scheduled_broadcast(job.id)
+            else:
+                job.next_run = next_run
+                self.aetherOneDB.update_scheduled_broadcast_next_run(job.id, next_run)
+                with self.condition:
+                    if job.id in self.jobs:  # not cancelled while it was submitted
+                        self._push(job)
+
+
+# Example Usage
+if __name__ == "__main__":
+    import tempfile
+    from services.databaseService import CaseDAO
+
+    with tempfile.TemporaryDirectory() as folder:
+        dao = CaseDAO(os.path.join(folder, 'scheduler.db'))
+        scheduler = BroadcastScheduler(dao, PlanetaryRulershipCalendarAPI(), lambda job: print(f"due: {job.to_dict()}"))
+        scheduler.start()
+        for planet in planetary_hours:
+            print(scheduler.schedule(ScheduledBroadcast('Calendula', planet=planet, recurring=True)).to_dict())
+        scheduler.schedule(ScheduledBroadcast('Arnica', run_at=datetime.now() + timedelta(seconds=1)))
+        time.sleep(2)
+        print(scheduler.stats())
+        scheduler.stop()
+        dao.close()
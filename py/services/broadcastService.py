@@ -8,10 +8,14 @@ import time
 
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from domains.aetherOneDomains import Analysis, BroadCastData
+from domains.aetherOneDomains import Analysis, BroadCastData, ScheduledBroadcast
 from services.hotbitsService import HotbitsService
-from services.analyzeService import checkGeneralVitality
+from services.analyzeService import checkGeneralVitalityBatch
 from services.broadcaster import DigitalBroadcaster
+from services.metrics import BROADCAST_CYCLE_SECONDS
+from services.logService import get_logger, fields, sampled
+
+log = get_logger('broadcast')
 
 
 class BroadcastTask:
@@ -29,15 +33,17 @@ class BroadcastTask:
 
     # Check if the task is valid
     def is_valid(self, hotbits_service: HotbitsService) -> bool:
-        gv = checkGeneralVitality(hotbits_service)
+        # without an analysis the current GV is compared against a second GV, both are drawn in one batch
+        gv, *reference = checkGeneralVitalityBatch(hotbits_service, 1 if self.analysis is not None else 2)
         if self.broadcastData.entering_with_general_vitality is None:
             self.broadcastData.entering_with_general_vitality = gv
         self.broadcastData.leaving_with_general_vitality = gv
         if self.analysis is not None:
-            print(f"Signature: ${self.broadcastData.signature} Target GV: ${self.analysis.target_gv}, Current GV: ${gv}")
+            log.debug("GV check", extra=fields(signature=self.broadcastData.signature,
+                                               target_gv=self.analysis.target_gv, gv=gv))
         else:
-            print(f"Signature: ${self.broadcastData.signature} Current GV: ${gv}")
-            return gv < checkGeneralVitality(hotbits_service)
+            log.debug("GV check", extra=fields(signature=self.broadcastData.signature, reference_gv=reference[0], gv=gv))
+            return gv < reference[0]
         if gv < self.analysis.target_gv:
             return False
         return True
@@ -49,15 +55,26 @@ class BroadcastService:
         self.hotbits_service = hotbits_service
         self.main = main
         self.task_queue = queue.Queue()
-        self.worker_thread = threading.Thread(target=self._process_queue)
+        self.gpio_broadcaster = None  # only used by the worker thread
+        self.gpio_lock = threading.Lock()  # guards gpio_settings_changed
+        self.gpio_settings_changed = False
+        self.worker_thread = threading.Thread(target=self._process_queue, name='BroadcastService', daemon=True)
         self.worker_thread.start()
         self.current_task = None
         self.stop_requested = False
+        self.last_cycle_draws = 0  # hotbits consumed by the last broadcast cycle
 
     def add_task(self, task: BroadcastTask):
         self.task_queue.put(task)
         self.main.emitMessage("broadcast_info", f"broadcasting for {task.broadcastData.signature} started")
 
+    def add_scheduled_task(self, job: ScheduledBroadcast):
+        """Queues a broadcast of the scheduler, once its planetary hour (or time) has come."""
+        analysis = self.main.aetherOneDB.get_analysis(int(job.analysis_id)) if job.analysis_id else None
+        broadcastData = BroadCastData(False, job.intention or '', job.signature, 0, 0, job.analysis_id, None, None,
+                                      job.session_id, None)
+        self.add_task(BroadcastTask(broadcastData, analysis))
+
     def _process_queue(self):
         while True:
 
@@ -69,21 +86,31 @@ class BroadcastService:
                     continue
                 task = self.task_queue.get(timeout=1)
                 self.current_task = task
+                draws_before = self.hotbits_service.draw_count
+                cycle_start = time.perf_counter()
                 task.broadcastData.repeat += 1
-                if self.main.aetherOneDB.get_setting('useGPIOforBroadcasting'):
-                    print(f"Using GPIO for broadcasting signature: {task.broadcastData.signature}")
-                    from services.broadcasterGPIO import GPIOBroadcaster
-                    broadcaster = GPIOBroadcaster(self.main.aetherOneDB)
-                    broadcaster.broadcast(task.broadcastData.signature, 10, self.main.aetherOneDB.get_setting('gpioSleep'))
+                mode = 'gpio' if self.main.aetherOneDB.get_setting('useGPIOforBroadcasting') else 'digital'
+                if mode == 'gpio':
+                    log.debug("Using GPIO for broadcasting signature %s", task.broadcastData.signature)
+                    stats = self.get_gpio_broadcaster().broadcast(task.broadcastData.signature, 10,
+                                                                  should_stop=lambda: self.stop_requested)
+                    log.info("GPIO timing", extra=sampled('broadcast.gpio', steps=stats['steps'],
+                                                          max_lateness_ms=round(stats['max_lateness'] * 1000, 2)))
 
                 else:
                     broadcaster = DigitalBroadcaster(task.broadcastData.signature, self.PROJECT_ROOT, duration=10)
                     broadcaster.start_broadcasting()
                     if self.stop_requested:
-                        print("Broadcasting stopped by user.")
+                        log.info("Broadcasting stopped by user")
                         self.main.emitMessage("broadcast_info","broadcasting stopped by user")
                         return
-                if task.is_valid(self.hotbits_service):
+                valid = task.is_valid(self.hotbits_service)
+                BROADCAST_CYCLE_SECONDS.observe(time.perf_counter() - cycle_start, mode=mode)
+                self.last_cycle_draws = self.hotbits_service.draw_count - draws_before
+                log.info("Broadcast cycle finished", extra=sampled(
+                    'broadcast.cycle', signature=task.broadcastData.signature, repeat=task.broadcastData.repeat,
+                    valid=valid, draws=self.last_cycle_draws, queued=self.task_queue.qsize()))
+                if valid:
                     self.main.emitMessage("broadcast_info",task.broadcastData.signature)
                     self.task_queue.task_done()
                 else:
@@ -94,8 +121,30 @@ class BroadcastService:
             except queue.Empty:
                 continue
 
+    def get_gpio_broadcaster(self):
+        """
+        The GPIO broadcaster is created once and kept open for all following tasks. Changed settings are applied
+        here, between two broadcasts.
+        """
+        with self.gpio_lock:
+            changed, self.gpio_settings_changed = self.gpio_settings_changed, False
+        if self.gpio_broadcaster is None:
+            from services.broadcasterGPIO import GPIOBroadcaster
+            self.gpio_broadcaster = GPIOBroadcaster(self.main.aetherOneDB)
+        elif changed:
+            self.gpio_broadcaster.configure(self.main.aetherOneDB)
+        return self.gpio_broadcaster
+
+    def reload_gpio_settings(self):
+        """
+        Re-reads the GPIO pins and interval after the settings were changed, on the next GPIO broadcast. Does not
+        wait for a running broadcast.
+        """
+        with self.gpio_lock:
+            self.gpio_settings_changed = True
+
     def stop(self):
-        print("Stopping broadcasts")
+        log.info("Stopping broadcasts")
         self.task_queue.queue.clear()
         self.current_task = None
         self.stop_requested = True
@@ -10,6 +10,9 @@ from PIL import Image, ImageDraw
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from services.hotbitsService import generate_random_integer
+from services.logService import get_logger
+
+log = get_logger('broadcaster')
 
 
 class DigitalBroadcaster:
@@ -64,8 +67,8 @@ class DigitalBroadcaster:
 
     def start_broadcasting(self):
         """ Launches parallel workers to broadcast sigil parts. """
-        print(f"Starting Digital Broadcaster with {self.num_workers} processes...")
-        print(f"Sigilized Intent: {' '.join(self.parsed_signature)}")
+        log.debug("Starting digital broadcaster with %d processes, sigilized intent %s", self.num_workers,
+                  ' '.join(self.parsed_signature))
 
         processes = []
         p = multiprocessing.Process(target=self._resonance_check_worker)
@@ -82,7 +85,7 @@ class DigitalBroadcaster:
         for p in processes:
             p.join()
 
-        print("Broadcasting complete! Moving to coagulation...")
+        log.debug("Broadcasting complete, moving to coagulation")
         self.coagulate_intent()
 
     def coagulate_intent(self):
@@ -90,7 +93,7 @@ class DigitalBroadcaster:
         random.seed(generate_random_integer(32,1))
         final_state = hashlib.sha256((self.signature + str(random.randint(0, 1000000))).encode()).hexdigest()
 
-        print(f"Finalized Quantum-Coagulated Intent: {final_state[:16]}")
+        log.debug("Finalized quantum-coagulated intent %s", final_state[:16])
         self._create_sigil_image(self.signature, random.randint(0, 1000000))
         self._create_coagulation_tone(final_state[:16], random.randint(0, 1000000))
 
@@ -138,7 +141,7 @@ class DigitalBroadcaster:
         file_name = f"sigil_{time.strftime('%Y%m%d_%H%M%S')}.png"
         output_file = os.path.join(self.output_path, file_name)
         img.save(output_file)
-        print(f"Multiline sigil saved as {file_name} for {len(lines)} lines.")
+        log.debug("Multiline sigil saved as %s for %d lines", file_name, len(lines))
 
     def _create_coagulation_tone(self, intent, quantum_value):
         """ Generates a dynamic frequency tone based on intent & QRNG entropy. """
@@ -155,7 +158,7 @@ class DigitalBroadcaster:
         file_name = f"coagulation_tone_{time.strftime('%Y%m%d_%H%M%S')}.wav"
         output_file = os.path.join(self.output_path, file_name)
         write(output_file, rate, wave)
-        print(f"Coagulated intent saved as {file_name} (Freq: {base_freq} Hz, Mod: {mod_freq} Hz)")
+        log.debug("Coagulated intent saved as %s (freq %s Hz, mod %s Hz)", file_name, base_freq, mod_freq)
 
 # Example Usage:
 if __name__ == "__main__":
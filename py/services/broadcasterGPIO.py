@@ -1,64 +1,171 @@
 import time
 import sys
 import os
+from functools import lru_cache
 
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.databaseService import CaseDAO
 from gpiozero import LED
-from gpiozero import Device
-from gpiozero.pins.lgpio import LGPIOFactory
 
-Device.pin_factory = LGPIOFactory()
+# Each colour (setting name) lights up for two of the ten ASCII digits
+GPIO_DIGIT_MAP = {
+    "gpioRED": [2, 6],
+    "gpioBLUE": [0, 3],
+    "gpioGREEN": [1, 4],
+    "gpioLASER": [9, 7],
+    "gpioWHITE": [8, 5]
+}
+
+
+def create_pin_factory(mock: bool = False):
+    """
+    Returns the gpiozero pin factory used for the LEDs.
+    The mock factory is used when requested (or GPIOZERO_PIN_FACTORY=mock) and as fallback if lgpio is missing,
+    so the broadcaster also runs on Linux CI machines without GPIO hardware.
+    """
+    if mock or os.environ.get('GPIOZERO_PIN_FACTORY') == 'mock':
+        from gpiozero.pins.mock import MockFactory
+        return MockFactory()
+    try:
+        from gpiozero.pins.lgpio import LGPIOFactory
+        return LGPIOFactory()
+    except Exception as e:
+        print(f"[WARNING] lgpio not available ({e}), using mock GPIO pins")
+        from gpiozero.pins.mock import MockFactory
+        return MockFactory()
+
+
+@lru_cache(maxsize=256)
+def compile_schedule(signature: str, digit_masks: tuple) -> tuple:
+    """
+    Precompiles a signature into a pin-state timeline.
+    Every ASCII digit of every character becomes one step, the step is a bitmask of the pins that are on.
+    :param digit_masks: bitmask for each digit 0-9
+    """
+    return tuple(digit_masks[int(digit)] for char in signature for digit in str(ord(char)))
+
 
 class GPIOBroadcaster:
+    """
+    Long-lived GPIO broadcaster, the LEDs stay open between broadcasts and are only released on close().
+    """
+
+    def __init__(self, aetherOneDB: CaseDAO, pin_factory=None):
+        self.pin_factory = pin_factory if pin_factory is not None else create_pin_factory()
+        self.leds: [LED] = []
+        self.pins: [int] = []
+        self.digit_masks = tuple([0] * 10)
+        self.interval = 0.2
+        self.configure(aetherOneDB)
 
-    def __init__(self, aetherOneDB: CaseDAO):
-        self.led_map = {}
-
-        for name, numbers in {
-            "gpioRED": [2, 6],
-            "gpioBLUE": [0, 3],
-            "gpioGREEN": [1, 4],
-            "gpioLASER": [9, 7],
-            "gpioWHITE": [8, 5]
-        }.items():
-            pin_str = aetherOneDB.get_setting(name)
+    def configure(self, aetherOneDB: CaseDAO):
+        """
+        Reads the GPIO settings once and (re)opens the LEDs.
+        """
+        self.close()
+        settings = aetherOneDB.loadSettings()
+        digit_masks = [0] * 10
+
+        for name, numbers in GPIO_DIGIT_MAP.items():
+            pin_str = settings.get(name)
             if pin_str is None:
                 print(f"[ERROR] Setting '{name}' is missing!")
                 continue
             try:
                 pin = int(pin_str)
-                self.led_map[pin] = {
-                    "led": LED(pin),
-                    "numbers": numbers
-                }
             except ValueError:
                 print(f"[ERROR] Setting '{name}' is not a valid GPIO number: {pin_str}")
+                continue
+            bit = 1 << len(self.leds)
+            self.leds.append(LED(pin, pin_factory=self.pin_factory))
+            self.pins.append(pin)
+            for number in numbers:
+                digit_masks[number] |= bit
 
-        print(f"GPIOZero LEDs mapped: {list(self.led_map.keys())}")
+        self.digit_masks = tuple(digit_masks)
+        self.interval = float(settings.get('gpioSleep', 0.2))
+        print(f"GPIOZero LEDs mapped: {self.pins}")
 
-    def broadcast(self, signature: str, duration: float, interval: float = 0.2):
-        end_time = time.time() + duration
+    def _apply(self, mask: int, previous: int):
+        """Switches only the LEDs whose state differs from the previous step."""
+        changed = mask ^ previous
+        for index, led in enumerate(self.leds):
+            if changed >> index & 1:
+                if mask >> index & 1:
+                    led.on()
+                else:
+                    led.off()
+
+    def broadcast(self, signature: str, duration: float, interval: float | None = None, should_stop=None) -> dict:
+        """
+        Plays the precompiled schedule against the monotonic clock.
+        Each step has an absolute deadline, so sleeping too long in one step is compensated in the next one
+        and the timing does not drift over the whole duration.
+        :return: timing statistics (steps played, mean and max lateness in seconds)
+        """
+        interval = float(interval if interval is not None else self.interval)
+        schedule = compile_schedule(signature, self.digit_masks)
         print(f"Broadcasting '{signature}' for {duration} seconds...")
+        if not schedule or not self.leds or interval <= 0:
+            return {'steps': 0, 'mean_lateness': 0.0, 'max_lateness': 0.0}
+
+        total_steps = max(1, int(duration / interval))
+        start = time.monotonic()
+        previous = 0
+        lateness_sum = 0.0
+        lateness_max = 0.0
+        step = 0
 
-        while time.time() < end_time:
-            for char in signature:
-                ascii_value = str(ord(char))
-                for digit in ascii_value:
-                    num = int(digit)
-                    for pin, obj in self.led_map.items():
-                        if num in obj["numbers"]:
-                            obj["led"].on()
-                        else:
-                            obj["led"].off()
-                    time.sleep(float(interval))
+        while step < total_steps:
+            if should_stop is not None and should_stop():
+                break
+            deadline = start + step * interval
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            lateness = time.monotonic() - deadline
+            lateness_sum += lateness
+            lateness_max = max(lateness_max, lateness)
 
+            mask = schedule[step % len(schedule)]
+            self._apply(mask, previous)
+            previous = mask
+            step += 1
+
+        # hold the last state for its full interval, then switch everything off
+        remaining = start + step * interval - time.monotonic()
+        if remaining > 0 and not (should_stop is not None and should_stop()):
+            time.sleep(remaining)
         self.cleanup()
 
+        return {
+            'steps': step,
+            'mean_lateness': lateness_sum / step if step else 0.0,
+            'max_lateness': lateness_max
+        }
+
     def cleanup(self):
-        for obj in self.led_map.values():
-            obj["led"].off()
-            obj["led"].close()  # <-- releases the pin
-        print("GPIOZero LEDs turned off and released.")
+        for led in self.leds:
+            led.off()
+
+    def close(self):
+        for led in self.leds:
+            led.off()
+            led.close()  # <-- releases the pin
+        if self.leds:
+            print("GPIOZero LEDs turned off and released.")
+        self.leds = []
+        self.pins = []
+
+
+# Timing benchmark on mock pins, runs without hardware
+if __name__ == "__main__":
+    class _Settings:
+        def loadSettings(self):
+            return {"gpioRED": 26, "gpioBLUE": 19, "gpioGREEN": 13, "gpioLASER": 6, "gpioWHITE": 12, "gpioSleep": 0.01}
 
+    broadcaster = GPIOBroadcaster(_Settings(), create_pin_factory(mock=True))
+    stats = broadcaster.broadcast("Healing Energy for John Doe", 2)
+    print(f"steps {stats['steps']} | mean lateness {stats['mean_lateness'] * 1000:.3f} ms | max lateness {stats['max_lateness'] * 1000:.3f} ms")
+    broadcaster.close()
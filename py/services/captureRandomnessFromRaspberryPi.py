@@ -1,17 +1,55 @@
 import os, sys, time
-import struct, random
+import random
+
+import numpy as np
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.logService import get_logger
+
+log = get_logger('raspberryPi')
+DEV_RANDOM = "/dev/random"
+MAX_PASSES = 16  # reads of generate_numbers to replace duplicates
+
+
+def read_random_bytes(size: int, random_source=None) -> bytes:
+    """
+    Reads size bytes of randomness in as few system calls as possible, forward from the current position of
+    random_source (a binary file). Without random_source os.getrandom is used, it blocks like /dev/random until
+    the kernel's generator is initialized.
+    """
+    chunks, remaining = [], size
+    while remaining > 0:
+        # large requests may return less if interrupted
+        chunk = random_source.read(remaining) if random_source is not None else os.getrandom(remaining)
+        if not chunk:
+            raise OSError("The random source returned no more data")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_random_integers(count: int, random_source=None) -> np.ndarray:
+    """count unsigned 32 bit integers (big endian, like the hotbits files) as a view of one bulk read"""
+    return np.frombuffer(read_random_bytes(4 * count, random_source), dtype='>u4')
+
+
+def open_random_source(path: str = DEV_RANDOM):
+    """None (os.getrandom) for /dev/random where available, else the opened file"""
+    if path == DEV_RANDOM and hasattr(os, 'getrandom'):
+        return None
+    return open(path, "rb", buffering=0)
 
 
 class RandomNumberGenerator:
-    def __init__(self, total_numbers=10000):
+    def __init__(self, total_numbers=10000, path: str = DEV_RANDOM):
         """
         Initialize the generator.
         :param total_numbers: Number of random integers to generate
+        :param path: Source of the random bytes
         """
         self.total_numbers = total_numbers
-        self.numbers = set()  # Use a set to avoid duplicates
+        self.path = path
+        self.numbers = np.empty(0, dtype=np.uint32)
 
     def generate_random_integer(self,bit_count=32):
         """
@@ -46,26 +84,46 @@ class RandomNumberGenerator:
 
     def generate_numbers(self):
         """
-        Retrieves randomness from /dev/random and generates integers.
-        Stores the generated numbers in an array without duplicates.
+        Retrieves randomness from /dev/random and generates 32 bit integers, without duplicates.
+        The bytes are read in bulk and viewed as integers, duplicates are dropped (keeping the first one)
+        and replaced by reading on, twice as many as missing from the second read on, at most MAX_PASSES times.
+        Raises RuntimeError if a read adds no new integer.
         """
-        self.numbers = set()  # Clear the set before generating
+        numbers = np.empty(0, dtype=np.uint32)
         try:
-            with open("/dev/random", "rb") as random_source:
-                while len(self.numbers) < self.total_numbers:
-                    # Read 4 bytes of randomness to generate a 32-bit integer
-                    random_bytes = random_source.read(4)
-                    random_int = struct.unpack("I", random_bytes)[0]  # Convert to unsigned integer
-                    self.numbers.add(random_int)
-        except Exception as e:
-            print(f"Error while generating numbers: {e}")
+            random_source = open_random_source(self.path)
+        except OSError as e:
+            log.error("Error while generating numbers: %s", e)
+            self.numbers = numbers
+            return
+        try:
+            for attempt in range(MAX_PASSES):
+                missing = self.total_numbers - numbers.size
+                if missing <= 0:
+                    break
+                before = numbers.size
+                count = missing if attempt == 0 else 2 * missing
+                numbers = np.concatenate([numbers, read_random_integers(count, random_source).astype(np.uint32)])
+                _, first = np.unique(numbers, return_index=True)
+                numbers = numbers[np.sort(first)][:self.total_numbers]
+                if numbers.size == before:
+                    raise RuntimeError(f"{self.path} returned no new integers")
+            else:
+                if numbers.size < self.total_numbers:
+                    raise RuntimeError(f"{self.path} returned too many duplicates")
+        except OSError as e:
+            log.error("Error while generating numbers: %s", e)
+        finally:
+            if random_source is not None:
+                random_source.close()
+            self.numbers = numbers
 
     def get_numbers(self):
         """
         Returns the generated array of numbers.
         :return: List of integers
         """
-        return list(self.numbers)
+        return self.numbers.tolist()
 
 
 # Example usage:
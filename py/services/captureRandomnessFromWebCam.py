@@ -4,14 +4,18 @@ import json
 import time, os, sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.logService import get_logger, sampled
+
+log = get_logger('webcam')
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 
 
 class WebCamCollector:
-    def __init__(self, main, countHotbits):
+    def __init__(self, main, countHotbits, health=None):
         self.stopCollectingHotbits: bool = False
         self.main = main
         self.countHotbits = countHotbits
+        self.health = health  # HotbitsHealth, every frame is tested before its bits are used
 
     def bits_to_integer(self, bits):
         """Convert a list of bits into an integer."""
@@ -19,14 +23,10 @@ class WebCamCollector:
         return int(bit_string, 2)
 
     def pixel_to_bit(self, img1, img2):
-        """Compare two images pixel by pixel to generate bits."""
-        bits = []
-        for (pixel1, pixel2) in zip(img1.reshape(-1, 3), img2.reshape(-1, 3)):
-            if sum(pixel1) > sum(pixel2):
-                bits.append(1)
-            else:
-                bits.append(0)
-        return bits
+        """Compare two images pixel by pixel to generate bits (uint8 array, 1 where img1 is brighter)."""
+        sums1 = img1.reshape(-1, 3).sum(axis=1, dtype=np.int32)
+        sums2 = img2.reshape(-1, 3).sum(axis=1, dtype=np.int32)
+        return (sums1 > sums2).astype(np.uint8)
 
     def capture_image(self, cap):
         """Capture an image using the provided VideoCapture object."""
@@ -35,15 +35,15 @@ class WebCamCollector:
             raise Exception("Failed to capture image")
         return frame
 
-    def sufficient_difference(self, img1, img2, threshold=500):
+    def sufficient_difference(self, img1, img2, threshold=500, bits=None):
         """Check if there is sufficient difference between two images."""
         diff = np.abs(img1.astype(np.int32) - img2.astype(np.int32))
         total_diff = np.sum(diff)
 
         # Check if the generated bits are all zeros
-        bits = self.pixel_to_bit(img1, img2)
-        if bits[:9] == [0] * 9:
-            print("Detected a series of 0s. Skipping one image and retrying...")
+        bits = self.pixel_to_bit(img1, img2) if bits is None else bits
+        if not bits[:9].any():
+            log.info("Detected a series of 0s, skipping one image and retrying", extra=sampled('webcam.zeros'))
             return False
 
         return total_diff > threshold
@@ -66,8 +66,9 @@ class WebCamCollector:
         return True
 
     def generate_hotbits(self, hotbitsPath: str, amount: int):
-        print("generate_hotbits with webCam")
-        bit_array = []
+        log.info("Generating %d hotbits files with the webcam", amount)
+        bit_array = np.empty(0, dtype=np.uint8)
+        pending = []  # integers of the last frame which did not fit into the previous file
         max_bits = 32  # Maximum number of bits for an integer
 
         cap = cv2.VideoCapture(0)
@@ -89,33 +90,40 @@ class WebCamCollector:
                     if self.stopCollectingHotbits:
                         break
 
-                    img1 = self.capture_image(cap)
-                    img2 = self.capture_image(cap)
-
-                    # Resize images to ensure they are the same dimensions
-                    height, width = min(img1.shape[:2], img2.shape[:2])
-                    img1 = cv2.resize(img1, (width, height))
-                    img2 = cv2.resize(img2, (width, height))
-
-                    # Wait until there is sufficient difference between images
-                    if not self.sufficient_difference(img1, img2):
-                        print("Insufficient difference between images. Retrying...")
-                        continue
-
-                    bits = self.pixel_to_bit(img1, img2)
-                    bit_array.extend(bits)
-
-                    while len(bit_array) >= max_bits:
-                        integer = self.bits_to_integer(bit_array[:max_bits])
-                        bit_array = bit_array[max_bits:]
-
+                    if not pending:
+                        img1 = self.capture_image(cap)
+                        img2 = self.capture_image(cap)
+
+                        # Resize images to ensure they are the same dimensions
+                        height, width = min(img1.shape[:2], img2.shape[:2])
+                        img1 = cv2.resize(img1, (width, height))
+                        img2 = cv2.resize(img2, (width, height))
+
+                        # Wait until there is sufficient difference between images
+                        bits = self.pixel_to_bit(img1, img2)
+                        if not self.sufficient_difference(img1, img2, bits=bits):
+                            log.info("Insufficient difference between images, retrying", extra=sampled('webcam.difference'))
+                            continue
+                        # a frozen, saturated or biased camera fails the health tests, the frame is dropped
+                        if self.health is not None and not self.health.check('webCam', bits):
+                            continue
+
+                        bit_array = np.concatenate([bit_array, bits])
+                        usable = bit_array.size - bit_array.size % max_bits
+                        pending = np.packbits(bit_array[:usable]).view('>u4').astype(np.int64).tolist()
+                        bit_array = bit_array[usable:]
+
+                    for position, integer in enumerate(pending):
                         # Ensure the integer is unique
                         if integer not in unique_integers:
                             integer_list.append(integer)
                             unique_integers.add(integer)
 
                         if len(integer_list) >= 10000:
+                            pending = pending[position + 1:]
                             break
+                    else:
+                        pending = []
 
                 # Save the integers to a JSON file
                 timestamp = int(time.time() * 1000)
@@ -125,7 +133,7 @@ class WebCamCollector:
 
 
                 self.main.emitMessage('server_update', str(self.countHotbits()))
-                print(f"Hotbits saved to {filename}")
+                log.info("Hotbits saved to %s", filename)
         finally:
             cap.release()
             stopCollectingHotbits = False
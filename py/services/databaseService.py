@@ -1,28 +1,71 @@
 import os
 import sqlite3
 import sys
+import threading
+from contextlib import contextmanager
 from typing import List
 from datetime import datetime
 import json
 
-from flask import jsonify
+import numpy as np
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from domains.aetherOneDomains import Case, Session, MapDesign, Feature, Analysis, Catalog, Rate, AnalysisRate, BroadCastData
+from domains.aetherOneDomains import Case, Session, MapDesign, Feature, Analysis, Catalog, Rate, AnalysisRate, BroadCastData, \
+    ScheduledBroadcast
+from services.metrics import timed_methods, DAO_QUERY_SECONDS
+from services.rateCatalog import ColumnarCatalog
+from services.logService import get_logger, fields
 
+log = get_logger('database')
 
+
+@timed_methods(DAO_QUERY_SECONDS, ('insert_', 'get_', 'list_', 'update_', 'delete_', 'loadSettings', 'sqlSelect'))
 class CaseDAO:
     def __init__(self, db_filename):
         self.conn = sqlite3.connect(db_filename, isolation_level=None, timeout=10, check_same_thread=False)
+        # the settings live next to the database, so a separate data folder (tests, benchmarks) has its own settings
+        self.settings_path = os.path.join(os.path.dirname(os.path.abspath(db_filename)), "settings.json")
         self.conn.execute('PRAGMA journal_mode = WAL;')
         self.conn.execute('PRAGMA foreign_keys = ON;')
+        # all threads share the connection, a write must not run inside the transaction of another thread
+        self.write_lock = threading.RLock()
+        self.catalog_columns = {}  # catalog id -> ColumnarCatalog, dropped when rates of the catalog change
+        self.catalog_revision = 0  # counts the changes of rates, other processes compare it to drop their cache
         self.create_table()
 
     def close(self):
         self.conn.close()
 
+    def _fetch_one(self, row_factory, query: str, parameters: tuple = ()):
+        """The first row of the query built by row_factory (one of the from_row class methods), or None."""
+        cursor = self.conn.cursor()
+        cursor.row_factory = row_factory
+        return cursor.execute(query, parameters).fetchone()
+
+    def _fetch_all(self, row_factory, query: str, parameters: tuple = ()) -> list:
+        cursor = self.conn.cursor()
+        cursor.row_factory = row_factory
+        return cursor.execute(query, parameters).fetchall()
+
+    def _write(self, query: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        """One statement in autocommit mode, the cursor keeps the lastrowid."""
+        with self.write_lock:
+            return self.conn.execute(query, parameters)
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN ... COMMIT, or ROLLBACK on an error, without writes of other threads in between."""
+        with self.write_lock:
+            self.conn.execute('BEGIN')
+            try:
+                yield
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+
     def create_table(self):
         catalog_query = '''
         CREATE TABLE IF NOT EXISTS catalog (
@@ -78,6 +121,21 @@ class CaseDAO:
             FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE
         )
         '''
+        scheduled_broadcast_query = '''
+        CREATE TABLE IF NOT EXISTS scheduled_broadcast (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            signature TEXT,
+            intention TEXT,
+            planet TEXT,
+            unit TEXT,
+            run_at DATETIME,
+            recurring BOOLEAN,
+            analysis_id INTEGER,
+            session_id INTEGER,
+            next_run DATETIME,
+            created DATETIME
+        )
+        '''
         ## Here we need a sophisticated rate database
         analysis_object_query = '''
         CREATE TABLE IF NOT EXISTS analysis (
@@ -105,6 +163,19 @@ class CaseDAO:
             note TEXT
         )
         '''
+        # the hotbits drawn by an analysis, to replay it bit for bit (see services/entropyStream.py)
+        entropy_stream_query = '''
+        CREATE TABLE IF NOT EXISTS entropy_stream (
+            id TEXT PRIMARY KEY,
+            analysis_id INTEGER,
+            parameters TEXT,
+            draws INTEGER,
+            dtype TEXT,
+            data BLOB,
+            created DATETIME,
+            FOREIGN KEY (analysis_id) REFERENCES analysis (id) ON DELETE CASCADE
+        )
+        '''
         map_design_query = '''
         CREATE TABLE IF NOT EXISTS map_design (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -131,8 +202,10 @@ class CaseDAO:
         self.conn.execute(case_query)
         self.conn.execute(session_query)
         self.conn.execute(broadcast_query)
+        self.conn.execute(scheduled_broadcast_query)
         self.conn.execute(analysis_object_query)
         self.conn.execute(rate_for_analysis_query)
+        self.conn.execute(entropy_stream_query)
         self.conn.execute(map_design_query)
         self.conn.execute(feature_query)
         self.conn.commit()
@@ -142,97 +215,86 @@ class CaseDAO:
         INSERT INTO catalog (name, description, author, importdate)
         VALUES (?, ?, ?, datetime('now'))
         '''
-        self.conn.execute(query, (catalog.name, catalog.description, catalog.author))
-        self.conn.commit()
+        self._write(query, (catalog.name, catalog.description, catalog.author))
 
     def get_catalog(self, catalog_id: int) -> Catalog | None:
-        row = self.conn.execute('SELECT * FROM catalog WHERE id = ?', (catalog_id,)).fetchone()
-        if row:
-            catalog = Catalog(row[1], row[2], row[3], datetime.fromisoformat(row[4]))
-            catalog.id = row[0]
-            return catalog
-        return None
+        return self._fetch_one(Catalog.from_row, 'SELECT * FROM catalog WHERE id = ?', (catalog_id,))
 
     def get_catalog_by_name(self, name: str) -> Catalog | None:
-        row = self.conn.execute('SELECT * FROM catalog WHERE name = ?', (name,)).fetchone()
-        if row:
-            catalog = Catalog(row[1], row[2], row[3], datetime.fromisoformat(row[4]))
-            catalog.id = row[0]
-            return catalog
-        return None
+        return self._fetch_one(Catalog.from_row, 'SELECT * FROM catalog WHERE name = ?', (name,))
 
     def delete_catalog(self, catalog_id: int):
         query = 'DELETE FROM catalog WHERE id = ?'
-        self.conn.execute(query, (catalog_id,))
-        self.conn.commit()
+        self._write(query, (catalog_id,))
+        self.catalog_columns.pop(catalog_id, None)
+        self.catalog_revision += 1
 
     def list_catalogs(self) -> List[Catalog]:
-        cursor = self.conn.execute('SELECT * FROM catalog')
-        catalogs = []
-        for row in cursor:
-            catalog = Catalog(row[1], row[2], row[3], datetime.fromisoformat(row[4]))
-            catalog.id = row[0]
-            catalogs.append(catalog)
-        return catalogs
+        return self._fetch_all(Catalog.from_row, 'SELECT * FROM catalog')
 
     def insert_rate(self, rate: Rate):
         query = '''
         INSERT INTO rate (signature, description, catalog_id)
         VALUES (?, ?, ?)
         '''
-        self.conn.execute(query, (rate.signature, rate.description, rate.catalogID))
-        self.conn.commit()
+        self._write(query, (rate.signature, rate.description, rate.catalogID))
+        self.catalog_columns.pop(rate.catalogID, None)
+        self.catalog_revision += 1
 
     def get_rate(self, rate_id: int) -> Rate | None:
-        row = self.conn.execute('SELECT * FROM rate WHERE id = ?', (rate_id,)).fetchone()
-        if row:
-            rate = Rate(row[1], row[2], row[3])
-            rate.id = row[0]
-            return rate
-        return None
+        return self._fetch_one(Rate.from_row, 'SELECT * FROM rate WHERE id = ?', (rate_id,))
 
     def delete_rate(self, rate_id: int):
         query = 'DELETE FROM rate WHERE id = ?'
-        self.conn.execute(query, (rate_id,))
-        self.conn.commit()
+        self._write(query, (rate_id,))
+        self.catalog_columns.clear()
+        self.catalog_revision += 1
 
     def list_rates_from_catalog(self, catalog_id: int) -> List[Rate]:
-        cursor = self.conn.execute('SELECT * FROM rate WHERE catalog_id = ?', (catalog_id,))
-        rates = []
-        for row in cursor:
-            rate = Rate(row[1], row[2], row[3])
-            rate.id = row[0]
-            rates.append(rate)
-        return rates
+        return self._fetch_all(Rate.from_row, 'SELECT * FROM rate WHERE catalog_id = ?', (catalog_id,))
+
+    def get_catalog_columns(self, catalog_id: int) -> ColumnarCatalog:
+        """
+        Ids and signatures of the rates of a catalog for the analysis, kept in memory until a rate of the
+        catalog is inserted or deleted. Descriptions are loaded on demand.
+        """
+        catalog = self.catalog_columns.get(catalog_id)
+        if catalog is None:
+            rows = self.conn.execute('SELECT id, signature FROM rate WHERE catalog_id = ?', (catalog_id,)).fetchall()
+            catalog = ColumnarCatalog.from_rows(catalog_id, rows, self.get_rate_descriptions)
+            self.catalog_columns[catalog_id] = catalog
+        return catalog
+
+    def get_rate_descriptions(self, rate_ids: list) -> dict:
+        descriptions = {}
+        for start in range(0, len(rate_ids), 500):  # stay below the SQLite limit of bound parameters
+            chunk = rate_ids[start:start + 500]
+            query = f"SELECT id, description FROM rate WHERE id IN ({','.join('?' * len(chunk))})"
+            descriptions.update(self.conn.execute(query, chunk).fetchall())
+        return descriptions
 
     def insert_case(self, case: Case):
 
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT id FROM cases WHERE name = ?', (case.name,))
-        row = cursor.fetchone()
-        if row:
-            return row[0]
+        with self._transaction():
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT id FROM cases WHERE name = ?', (case.name,))
+            row = cursor.fetchone()
+            if row:
+                return row[0]
 
-        query = '''
-        INSERT INTO cases (name, email, color, description, created, last_change)
-        VALUES (?, ?, ?, ?, datetime('now'), datetime('now'))
-        '''
-        cursor = self.conn.cursor() 
-        cursor.execute(query, (case.name, case.email, case.color, case.description))
-        self.conn.commit()
+            query = '''
+            INSERT INTO cases (name, email, color, description, created, last_change)
+            VALUES (?, ?, ?, ?, datetime('now'), datetime('now'))
+            '''
+            cursor = self.conn.cursor()
+            cursor.execute(query, (case.name, case.email, case.color, case.description))
 
         # Get the last inserted ID
         last_id = cursor.lastrowid
         return last_id
 
     def get_case(self, case_id: int) -> Case | None:
-        row = self.conn.execute('SELECT * FROM cases WHERE id = ?', (case_id,)).fetchone()
-        if row:
-            caseObj = Case(row[1], row[2], row[3], row[4],
-                           datetime.fromisoformat(row[5]), datetime.fromisoformat(row[6]))
-            caseObj.id = row[0]
-            return caseObj
-        return None
+        return self._fetch_one(Case.from_row, 'SELECT * FROM cases WHERE id = ?', (case_id,))
 
     def update_case(self, case: Case):
         query = '''
@@ -240,109 +302,55 @@ class CaseDAO:
         SET name = ?, email = ?, color = ?, description = ?, last_change = datetime('now')
         WHERE id = ?
         '''
-        self.conn.execute(query, (case.name, case.email, case.color, case.description, case.id))
-        self.conn.commit()
+        self._write(query, (case.name, case.email, case.color, case.description, case.id))
 
     def delete_case(self, case_id: int):
         query = 'DELETE FROM cases WHERE id = ?'
-        self.conn.execute(query, (case_id,))
-        self.conn.commit()
+        self._write(query, (case_id,))
 
     def list_cases(self) -> List[Case]:
-        query = 'SELECT * FROM cases'
-        cursor = self.conn.execute(query)
-        cases = []
-        for row in cursor:
-            caseObj = Case(row[1], row[2], row[3], row[4], datetime.fromisoformat(row[5]),
-                           datetime.fromisoformat(row[6]))
-            caseObj.id = row[0]
-            cases.append(caseObj)
-        return cases
+        return self._fetch_all(Case.from_row, 'SELECT * FROM cases')
 
     def insert_session(self, session: Session):
         query = '''
         INSERT INTO sessions (intention, description, created, case_id)
         VALUES (?, ?, datetime('now'), ?)
         '''
-        cursor = self.conn.cursor()
-        cursor.execute(query, (session.intention, session.description, session.caseID))
+        cursor = self._write(query, (session.intention, session.description, session.caseID))
         session.id = cursor.lastrowid
-        self.conn.commit()
 
     def get_session(self, session_id: int) -> Session:
         query = 'SELECT * FROM sessions WHERE id = ?'
-        cursor = self.conn.execute(query, (session_id,))
-        row = cursor.fetchone()
-        if row:
-            sessionObj = Session(row[1], row[2], row[4])
-            sessionObj.created = datetime.fromisoformat(row[3])
-            sessionObj.id = row[0]
-            return sessionObj
-        return None
+        return self._fetch_one(Session.from_row, query, (session_id,))
 
     def get_last_session(self, case_id: int) -> Session:
         query = 'SELECT * FROM sessions WHERE case_id = ? ORDER BY created DESC, id DESC LIMIT 1'
-        cursor = self.conn.execute(query, (case_id,))
-        row = cursor.fetchone()
-        if row:
-            sessionObj = Session(row[1], row[2], row[4])
-            sessionObj.created = datetime.fromisoformat(row[3])
-            sessionObj.id = row[0]
-            return sessionObj
-        return None
+        return self._fetch_one(Session.from_row, query, (case_id,))
 
     def delete_session(self, session_id: int):
         query = 'DELETE FROM sessions WHERE id = ?'
-        self.conn.execute(query, (session_id,))
-        self.conn.commit()
+        self._write(query, (session_id,))
 
     def list_sessions(self, case_id: int) -> List[Session]:
         query = 'SELECT * FROM sessions WHERE case_id = ? ORDER BY id DESC'
-        cursor = self.conn.execute(query, (case_id,))
-        sessions = []
-        for row in cursor:
-            sessionObj = Session(row[1], row[2], case_id)
-            sessionObj.id = row[0]
-            sessionObj.created = datetime.fromisoformat(row[3])
-            sessions.append(sessionObj)
-        return sessions
+        return self._fetch_all(Session.from_row, query, (case_id,))
 
     def insert_analysis(self, analysis: Analysis):
         query = '''
         INSERT INTO analysis (note, target_gv, session_id, catalogId, created)
         VALUES (?, ?, ?, ?, datetime('now'))
         '''
-        cursor = self.conn.cursor()
-        cursor.execute(query, (analysis.note, analysis.target_gv, analysis.sessionID, analysis.catalogId))
+        cursor = self._write(query, (analysis.note, analysis.target_gv, analysis.sessionID, analysis.catalogId))
         analysis.id = cursor.lastrowid
-        self.conn.commit()
         return analysis
 
     def get_analysis(self, analysis_id: int) -> Analysis | None:
         query = 'SELECT * FROM analysis WHERE id = ?'
-        cursor = self.conn.execute(query, (analysis_id,))
-        row = cursor.fetchone()
-        if row:
-            analysis = Analysis(row[1], row[3])
-            analysis.id = row[0]
-            analysis.target_gv = row[2]
-            analysis.catalogId = row[4]
-            analysis.created = datetime.fromisoformat(row[5])
-            return analysis
-        return None
+        return self._fetch_one(Analysis.from_row, query, (analysis_id,))
 
     def get_last_analysis(self, session_id: int) -> Analysis | None:
         query = 'SELECT * FROM analysis WHERE session_id = ? ORDER BY created DESC, id DESC LIMIT 1'
-        cursor = self.conn.execute(query, (session_id,))
-        row = cursor.fetchone()
-        if row:
-            analysis = Analysis(row[1], row[3])
-            analysis.id = row[0]
-            analysis.target_gv = row[2]
-            analysis.catalogId = row[4]
-            analysis.created = datetime.fromisoformat(row[5])
-            return analysis
-        return None
+        return self._fetch_one(Analysis.from_row, query, (session_id,))
 
     def update_analysis(self, analysis: Analysis):
         query = '''
@@ -350,26 +358,15 @@ class CaseDAO:
         SET note = ?, target_gv = ?
         WHERE id = ?
         '''
-        self.conn.execute(query, (analysis.note, analysis.target_gv, analysis.id))
-        self.conn.commit()
+        self._write(query, (analysis.note, analysis.target_gv, analysis.id))
 
     def delete_analysis(self, analysis_id: int):
         query = 'DELETE FROM analysis WHERE id = ?'
-        self.conn.execute(query, (analysis_id,))
-        self.conn.commit()
+        self._write(query, (analysis_id,))
 
     def list_analysis(self, session_id: int) -> List[Analysis]:
         query = 'SELECT * FROM analysis WHERE session_id = ?'
-        cursor = self.conn.execute(query, (session_id,))
-        analysisList = []
-        for row in cursor:
-            analysis = Analysis(row[1], row[3])
-            analysis.id = row[0]
-            analysis.target_gv = row[2]
-            analysis.catalogId = row[4]
-            analysis.created = datetime.fromisoformat(row[5])
-            analysisList.append(analysis)
-        return analysisList
+        return self._fetch_all(Analysis.from_row, query, (session_id,))
 
     def insert_rates_for_analysis(self, rates: List[AnalysisRate]):
         query = '''
@@ -377,39 +374,102 @@ class CaseDAO:
         potencyType, potency, note) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
         '''
         rate_tuples = [rate.to_tuple() for rate in rates]
-        self.conn.executemany(query, rate_tuples)
-        self.conn.commit()
+        # the connection is in autocommit mode, without a transaction every row would be one of its own
+        with self._transaction():
+            self.conn.executemany(query, rate_tuples)
 
     def list_rates_for_analysis(self, analysis_id: int) -> List[AnalysisRate]:
         query = 'SELECT * FROM rate_analysis WHERE analysis_id = ?'
-        cursor = self.conn.execute(query, (analysis_id,))
-        rates = []
-        for row in cursor:
-            rate = AnalysisRate(row[1], row[2], row[3], row[4], row[5], row[6], row[7], row[8], row[9], row[10])
-            rate.id = row[0]
-            rates.append(rate)
-        return rates
+        return self._fetch_all(AnalysisRate.from_row, query, (analysis_id,))
     
+    def insert_entropy_streams(self, streams: list):
+        """
+        streams of (stream id, analysis id, recorded hotbits, parameters dict), the hotbits are stored as 32 bit
+        integers if they fit. Only the newest entropyStreamsKept streams are kept.
+        """
+        query = '''
+        INSERT INTO entropy_stream (id, analysis_id, parameters, draws, dtype, data, created)
+        VALUES (?, ?, ?, ?, ?, ?, datetime('now'))
+        '''
+        rows = []
+        for stream_id, analysis_id, values, parameters in streams:
+            values = np.asarray(values, dtype=np.int64)
+            dtype = '<u4' if values.size == 0 or (values.min() >= 0 and values.max() < 2 ** 32) else '<i8'
+            rows.append((stream_id, analysis_id, json.dumps(parameters), values.size, dtype,
+                         values.astype(dtype).tobytes()))
+        kept = int(self.get_setting('entropyStreamsKept') or 0)
+        with self._transaction():
+            self.conn.executemany(query, rows)
+            if kept > 0:
+                self.conn.execute('DELETE FROM entropy_stream WHERE rowid NOT IN '
+                                  '(SELECT rowid FROM entropy_stream ORDER BY created DESC, rowid DESC LIMIT ?)',
+                                  (kept,))
+
+    def get_entropy_stream(self, stream_id: str) -> dict | None:
+        return self._fetch_one(self._entropy_stream_row, 'SELECT * FROM entropy_stream WHERE id = ?', (stream_id,))
+
+    def get_entropy_stream_for_analysis(self, analysis_id: int) -> dict | None:
+        query = 'SELECT * FROM entropy_stream WHERE analysis_id = ? ORDER BY created DESC, rowid DESC LIMIT 1'
+        return self._fetch_one(self._entropy_stream_row, query, (analysis_id,))
+
+    @staticmethod
+    def _entropy_stream_row(cursor, row) -> dict:
+        stream_id, analysis_id, parameters, draws, dtype, data, created = row
+        return {'id': stream_id, 'analysis_id': analysis_id, 'parameters': json.loads(parameters), 'draws': draws,
+                'values': np.frombuffer(data, dtype=dtype).astype(np.int64), 'created': created}
+
     def insert_broadcast(self, broadcast: BroadCastData):
-        print(broadcast)
+        log.debug("Storing broadcast", extra=fields(signature=broadcast.signature, repeat=broadcast.repeat,
+                                                     analysis_id=broadcast.analysis_id))
         query = '''
         INSERT INTO broadcast (clear, intention, signature, delay, repeat, analysis_id, entering_with_general_vitality,
         leaving_with_general_vitality, session_id, created)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
         '''
-        self.conn.execute(query, (broadcast.clear, broadcast.intention, broadcast.signature, broadcast.delay,
-                                  broadcast.repeat, broadcast.analysis_id, broadcast.entering_with_general_vitality,
-                                  broadcast.leaving_with_general_vitality, broadcast.sessionID))
-        self.conn.commit()
+        self._write(query, (broadcast.clear, broadcast.intention, broadcast.signature, broadcast.delay,
+                             broadcast.repeat, broadcast.analysis_id, broadcast.entering_with_general_vitality,
+                             broadcast.leaving_with_general_vitality, broadcast.sessionID))
+
+    def insert_scheduled_broadcast(self, job: ScheduledBroadcast) -> int:
+        query = '''
+        INSERT INTO scheduled_broadcast (signature, intention, planet, unit, run_at, recurring, analysis_id, session_id,
+        next_run, created)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        cursor = self._write(query, (job.signature, job.intention, job.planet, job.unit,
+                                     job.run_at.isoformat() if job.run_at else None, job.recurring, job.analysis_id,
+                                     job.session_id, job.next_run.isoformat() if job.next_run else None,
+                                     job.created.isoformat()))
+        return cursor.lastrowid
+
+    def update_scheduled_broadcast_next_run(self, job_id: int, next_run: datetime):
+        query = 'UPDATE scheduled_broadcast SET next_run = ? WHERE id = ?'
+        self._write(query, (next_run.isoformat() if next_run else None, job_id))
+
+    def delete_scheduled_broadcast(self, job_id: int):
+        query = 'DELETE FROM scheduled_broadcast WHERE id = ?'
+        self._write(query, (job_id,))
+
+    def list_scheduled_broadcasts(self) -> List[ScheduledBroadcast]:
+        query = 'SELECT * FROM scheduled_broadcast ORDER BY id'
+        cursor = self.conn.execute(query)
+        jobs = []
+        for row in cursor:
+            job = ScheduledBroadcast(row[1], row[2], row[3], row[4],
+                                     datetime.fromisoformat(row[5]) if row[5] else None, bool(row[6]), row[7], row[8])
+            job.id = row[0]
+            job.next_run = datetime.fromisoformat(row[9]) if row[9] else None
+            job.created = datetime.fromisoformat(row[10])
+            jobs.append(job)
+        return jobs
 
     def insert_map_design(self, map_design: MapDesign):
         query = '''
         INSERT INTO map_design (uuid, coordinates_x, coordinates_y, zoom, feature_list)
         VALUES (?, ?, ?, ?, ?)
         '''
-        self.conn.execute(query, (map_design.uuid, map_design.coordinates_x, map_design.coordinates_y,
-                                  map_design.zoom, map_design.feature_list))
-        self.conn.commit()
+        self._write(query, (map_design.uuid, map_design.coordinates_x, map_design.coordinates_y,
+                             map_design.zoom, map_design.feature_list))
 
     def get_map_design(self, map_design_id: int) -> MapDesign:
         query = 'SELECT * FROM map_design WHERE id = ?'
@@ -425,14 +485,12 @@ class CaseDAO:
         SET uuid = ?, coordinates_x = ?, coordinates_y = ?, zoom = ?, feature_list = ?
         WHERE id = ?
         '''
-        self.conn.execute(query, (map_design.uuid, map_design.coordinates_x, map_design.coordinates_y,
-                                  map_design.zoom, map_design.feature_list, map_design_id))
-        self.conn.commit()
+        self._write(query, (map_design.uuid, map_design.coordinates_x, map_design.coordinates_y,
+                             map_design.zoom, map_design.feature_list, map_design_id))
 
     def delete_map_design(self, map_design_id: int):
         query = 'DELETE FROM map_design WHERE id = ?'
-        self.conn.execute(query, (map_design_id,))
-        self.conn.commit()
+        self._write(query, (map_design_id,))
 
     def list_map_designs(self) -> List[MapDesign]:
         query = 'SELECT * FROM map_design'
@@ -447,9 +505,8 @@ class CaseDAO:
         INSERT INTO feature (territory_name, simple_feature_data, simple_feature_type, note, url, last_update)
         VALUES (?, ?, ?, ?, ?, ?)
         '''
-        self.conn.execute(query, (feature.territory_name, feature.simple_feature_data, feature.simple_feature_type,
-                                  feature.note, feature.url, feature.last_update.isoformat()))
-        self.conn.commit()
+        self._write(query, (feature.territory_name, feature.simple_feature_data, feature.simple_feature_type,
+                             feature.note, feature.url, feature.last_update.isoformat()))
 
     def get_feature(self, feature_id: int) -> Feature:
         query = 'SELECT * FROM feature WHERE id = ?'
@@ -465,14 +522,12 @@ class CaseDAO:
         SET territory_name = ?, simple_feature_data = ?, simple_feature_type = ?, note = ?, url = ?, last_update = ?
         WHERE id = ?
         '''
-        self.conn.execute(query, (feature.territory_name, feature.simple_feature_data, feature.simple_feature_type,
-                                  feature.note, feature.url, feature.last_update.isoformat(), feature_id))
-        self.conn.commit()
+        self._write(query, (feature.territory_name, feature.simple_feature_data, feature.simple_feature_type,
+                             feature.note, feature.url, feature.last_update.isoformat(), feature_id))
 
     def delete_feature(self, feature_id: int):
         query = 'DELETE FROM feature WHERE id = ?'
-        self.conn.execute(query, (feature_id,))
-        self.conn.commit()
+        self._write(query, (feature_id,))
 
     def list_features(self) -> List[Feature]:
         query = 'SELECT * FROM feature'
@@ -504,6 +559,10 @@ class CaseDAO:
         self.ensure_entry(settings,'hotbits_use_time_based_trng', False)
         self.ensure_entry(settings,'hotbits_collectAutomatically', False)
         self.ensure_entry(settings,'hotbits_mix_TRNG', False)
+        self.ensure_entry(settings,'hotbits_mix_extractor', 'sha256')  # or 'xor'
+        self.ensure_entry(settings,'hotbits_Arduino_port', '/dev/ttyACM0')
+        self.ensure_entry(settings,'hotbits_ESP_port', '/dev/ttyUSB0')
+        self.ensure_entry(settings,'hotbits_health_min_entropy', 0.5)  # assumed entropy per raw bit of the health tests
         self.ensure_entry(settings,'analysisAdvanced', False)
         self.ensure_entry(settings,'analysisAlwaysCheckGV', True)
         self.ensure_entry(settings,'openAiKey', None)
@@ -519,6 +578,24 @@ class CaseDAO:
         self.ensure_entry(settings,'gpioWHITE', 12)
         self.ensure_entry(settings,'useGPIOforBroadcasting', False)
         self.ensure_entry(settings,'gpioSleep', 0.2)
+        self.ensure_entry(settings,'rateCardWorkers', 2)
+        self.ensure_entry(settings,'planetaryCalendarSpan', 5)
+        self.ensure_entry(settings,'serverMode', 'production')
+        self.ensure_entry(settings,'serverWorkers', 64)
+        self.ensure_entry(settings,'serverMaxConnections', 256)
+        self.ensure_entry(settings,'serverKeepAliveTimeout', 5)
+        self.ensure_entry(settings,'serverShutdownGrace', 10)
+        self.ensure_entry(settings,'logLevel', 'INFO')
+        self.ensure_entry(settings,'logFileMaxBytes', 5 * 1024 * 1024)
+        self.ensure_entry(settings,'logFileBackups', 5)
+        self.ensure_entry(settings,'logSampleInterval', 10)
+        self.ensure_entry(settings,'adminToken', '')
+        self.ensure_entry(settings,'systemInfoRefreshSeconds', 30)
+        self.ensure_entry(settings,'responseCompression', True)
+        self.ensure_entry(settings,'responseCompressionMinSize', 1024)
+        self.ensure_entry(settings,'analysisWorkers', 0)  # 0: one worker process per core
+        self.ensure_entry(settings,'recordEntropyStreams', True)  # store the hotbits of each analysis for replays
+        self.ensure_entry(settings,'entropyStreamsKept', 500)  # the older recorded streams are deleted
 
     def getHotbitsSourcePriority(self):
         settings = self.loadSettings()
@@ -545,7 +622,7 @@ class CaseDAO:
             dictionary[key] = default_value
 
     def loadSettings(self) -> json:
-        json_file_path = os.path.join(PROJECT_ROOT, "data", "settings.json")
+        json_file_path = self.settings_path
         if os.path.isfile(json_file_path):
             with open(json_file_path, 'r') as f:
                 settings = json.load(f)
@@ -556,10 +633,10 @@ class CaseDAO:
                 settings = {'created': datetime.now().isoformat()}
                 self.ensure_settings_defaults(settings)
                 json.dump(settings, f)
-            return jsonify(settings)
+            return settings
 
     def saveSettings(self, settings):
-        json_file_path = os.path.join(PROJECT_ROOT, "data", "settings.json")
+        json_file_path = self.settings_path
         self.ensure_settings_defaults(settings)
         with open(json_file_path, 'w') as f:
             json.dump(settings, f, indent=4)
@@ -574,24 +651,7 @@ class CaseDAO:
         self.conn.close()
 
     def list_all_sessions(self) -> List[Session]:
-        cursor = self.conn.execute('SELECT * FROM sessions ORDER BY created DESC')
-        sessions = []
-        for row in cursor:
-            session = Session(row[1], row[2], row[4])  # intention, description, caseID
-            session.id = row[0]
-            session.created = datetime.fromisoformat(row[3])
-            sessions.append(session)
-        return sessions
-
-    def list_all_sessions(self) -> List[Session]:
-        cursor = self.conn.execute('SELECT * FROM sessions ORDER BY created DESC')
-        sessions = []
-        for row in cursor:
-            session = Session(row[1], row[2], row[4])  # intention, description, caseID
-            session.id = row[0]
-            session.created = datetime.fromisoformat(row[3])
-            sessions.append(session)
-        return sessions
+        return self._fetch_all(Session.from_row, 'SELECT * FROM sessions ORDER BY created DESC')
 
 # DAO Service to be imported into another class
 def get_case_dao(db_filename: str) -> CaseDAO:
@@ -0,0 +1,84 @@
+# Entropy of a single analysis, independent of the shared hotbits pool and of the global random state.
+# Every value drawn is recorded, so the analysis can be replayed bit for bit from the stored stream.
+import os
+import sys
+import uuid
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.hotbitsService import ints_from_hotbits
+from services.logService import get_logger, sampled
+
+log = get_logger('entropy')
+
+
+class EntropyExhausted(RuntimeError):
+    """A strict stream was asked for more values than it has."""
+
+
+class EntropyStream:
+    """
+    Hotbits with the drawing methods of HotbitsService (getInt, getInts, takeHotbits), so it can be passed to
+    analyze() instead of the service. The values come from a block given in advance (hotbits) or are taken from
+    source (a HotbitsService) on demand. Nothing is shared with other streams and the global random state is
+    never used, streams can be drawn from in parallel threads or processes.
+
+    If the block is used up, the remaining values come from a NumPy generator seeded with the last hotbits of
+    the block; a strict stream (a replay) raises EntropyExhausted instead.
+    """
+
+    def __init__(self, hotbits=None, source=None, stream_id: str | None = None, strict: bool = False):
+        self.id = stream_id or uuid.uuid4().hex
+        self.hotbits = np.asarray(hotbits if hotbits is not None else [], dtype=np.int64)
+        self.source = source
+        self.strict = strict
+        self.position = 0
+        self.draw_count = 0
+        self.fallback = None
+        self.drawn = []  # the blocks returned by takeHotbits, in order
+
+    @classmethod
+    def replay(cls, recorded, stream_id: str | None = None):
+        """A stream returning exactly the recorded values, drawing more than were recorded is an error."""
+        return cls(recorded, stream_id=stream_id, strict=True)
+
+    def remaining(self) -> int:
+        return self.hotbits.size - self.position
+
+    def takeHotbits(self, count: int) -> np.ndarray:
+        block = self.hotbits[self.position:self.position + count]
+        self.position += block.size
+        if block.size < count:
+            block = np.concatenate([block, self._more(count - block.size)])
+        self.draw_count += count
+        self.drawn.append(block)
+        return block
+
+    def _more(self, count: int) -> np.ndarray:
+        if self.source is not None:
+            return np.asarray(self.source.takeHotbits(count), dtype=np.int64)
+        if self.strict:
+            raise EntropyExhausted(f"Entropy stream {self.id} has only {self.hotbits.size} recorded values")
+        if self.fallback is None:
+            log.warning("Entropy stream of %d hotbits used up, continuing pseudo random", self.hotbits.size,
+                        extra=sampled('entropy.exhausted'))
+            self.fallback = np.random.default_rng(self.hotbits[-8:].tolist() or None)
+        return self.fallback.integers(0, 2 ** 32, count, dtype=np.int64)
+
+    def getInts(self, min: int = 0, max: int = 1, count: int = 1) -> np.ndarray:
+        return ints_from_hotbits(self.takeHotbits, min, max, count)
+
+    def getInt(self, min: int = 0, max: int = 1) -> int:
+        return int(self.getInts(min, max, 1)[0])
+
+    def recorded(self) -> np.ndarray:
+        """All values drawn so far, replay(recorded()) draws the same values again."""
+        return np.concatenate(self.drawn) if self.drawn else np.empty(0, dtype=np.int64)
+
+
+if __name__ == "__main__":
+    stream = EntropyStream(np.random.default_rng(1).integers(0, 2 ** 32, 10))
+    print(stream.getInts(0, 10, 8), stream.getInt(1, 6), stream.getInt(1, 6), stream.remaining())
+    replay = EntropyStream.replay(stream.recorded())
+    print(replay.getInts(0, 10, 8), replay.getInt(1, 6), replay.getInt(1, 6))
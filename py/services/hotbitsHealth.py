@@ -0,0 +1,259 @@
+# Continuous health tests of incoming hotbits (NIST SP 800-90B, 4.4), run by the collectors on every batch of raw
+# bits before it becomes a hotbits file. Failing batches are quarantined, the quality of every source is published.
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from scipy.special import bdtrc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.logService import get_logger, sampled
+
+log = get_logger('hotbitsHealth')
+
+# false positive probability of the repetition count and adaptive proportion tests: 2^-30 per sample
+FALSE_POSITIVE_EXPONENT = 30
+APT_WINDOW = 1024
+ROLLING_BITS = 65536  # the rolling estimates follow about the last ROLLING_BITS bits
+SNAPSHOT_INTERVAL = 1.0
+QUARANTINE_KEPT = 20  # newest quarantined files kept for inspection
+# assumed entropy per raw bit of sources known to be weak, the others use the min_entropy of HotbitsHealth
+SOURCE_MIN_ENTROPY = {'timeLoop': 0.1}
+
+
+def repetition_count_cutoff(min_entropy: float, exponent: int = FALSE_POSITIVE_EXPONENT) -> int:
+    """C = 1 + ceil(exponent / H), a run of C equal samples is a failure"""
+    return 1 + math.ceil(exponent / min_entropy)
+
+
+def adaptive_proportion_cutoff(min_entropy: float, window: int = APT_WINDOW,
+                               exponent: int = FALSE_POSITIVE_EXPONENT) -> int:
+    """The smallest C with P(X >= C) <= 2^-exponent for X ~ Binomial(window, 2^-H)"""
+    tail = bdtrc(np.arange(window), window, 2.0 ** -min_entropy)  # P(X > k)
+    below = np.flatnonzero(tail <= 2.0 ** -exponent)
+    return int(below[0]) + 1 if below.size else window + 1
+
+
+class HealthTests:
+    """
+    The health tests of one source, fed with batches of bits (arrays of 0 and 1). The state of the repetition
+    count and adaptive proportion tests is carried from batch to batch, so the result does not depend on how
+    the stream is cut. The work per bit is constant, each batch is processed with a few NumPy operations.
+
+    min_entropy is the entropy per bit the source is assumed to deliver. Besides the two tests of SP 800-90B, a
+    batch fails when the rolling min-entropy estimate (from the bias and from the probability of a repeated bit,
+    which catches alternating patterns) drops below it by more than the sampling error of ROLLING_BITS bits.
+    """
+
+    def __init__(self, source: str, min_entropy: float = 0.5, window: int = APT_WINDOW):
+        self.source = source
+        self.min_entropy = min_entropy
+        self.window = window
+        self.rct_cutoff = repetition_count_cutoff(min_entropy)
+        self.apt_cutoff = adaptive_proportion_cutoff(min_entropy, window)
+        most_likely = 2.0 ** -min_entropy
+        sampling_error = 3 * math.sqrt(most_likely * (1 - most_likely) / ROLLING_BITS)
+        self.entropy_alarm = -math.log2(min(1.0, most_likely + sampling_error))
+        # repetition count test
+        self.last_bit = -1
+        self.run = 0
+        # adaptive proportion test, the current window
+        self.reference = -1
+        self.matches = 0
+        self.position = 0
+        # rolling estimates
+        self.ones = 0.5
+        self.repeats = 0.5
+        # statistics
+        self.bits = 0
+        self.batches = 0
+        self.quarantined = 0
+        self.rct_failures = 0
+        self.apt_failures = 0
+        self.entropy_failures = 0
+        self.longest_run = 0
+        self.last_failure = None
+
+    def _repetition_count(self, bits: np.ndarray) -> int:
+        starts = np.concatenate([[0], np.flatnonzero(bits[1:] != bits[:-1]) + 1])
+        lengths = np.diff(np.append(starts, bits.size))
+        carried = self.run if bits[0] == self.last_bit else 0
+        lengths[0] += carried
+        failed = lengths >= self.rct_cutoff
+        if carried >= self.rct_cutoff:
+            failed[0] = False  # this run has already failed in the previous batch
+        self.last_bit, self.run = int(bits[-1]), int(lengths[-1])
+        self.longest_run = max(self.longest_run, int(lengths.max()))
+        return int(np.count_nonzero(failed))
+
+    def _adaptive_proportion(self, bits: np.ndarray) -> int:
+        failures, start = 0, 0
+        if self.position > 0:
+            # the rest of the window started in the previous batch
+            start = min(self.window - self.position, bits.size)
+            self.matches += int(np.count_nonzero(bits[:start] == self.reference))
+            self.position += start
+            if self.position == self.window:
+                failures += self.matches >= self.apt_cutoff
+                self.position = 0
+        full = (bits.size - start) // self.window
+        if full > 0:
+            windows = bits[start:start + full * self.window].reshape(full, self.window)
+            failures += int(np.count_nonzero((windows == windows[:, :1]).sum(axis=1) >= self.apt_cutoff))
+            start += full * self.window
+        if start < bits.size:
+            self.reference = int(bits[start])
+            self.matches = int(np.count_nonzero(bits[start:] == self.reference))
+            self.position = bits.size - start
+        return failures
+
+    def min_entropy_estimate(self) -> float:
+        most_likely = max(self.ones, 1 - self.ones, self.repeats, 1 - self.repeats)
+        return -math.log2(most_likely) if most_likely < 1 else 0.0
+
+    def feed(self, bits) -> dict:
+        """Tests the next batch, returns the failures found in it."""
+        bits = np.asarray(bits, dtype=np.uint8).ravel()
+        if bits.size == 0:
+            return {}
+        # the first bit repeats the last one of the previous batch or not
+        repeated = np.count_nonzero(bits[1:] == bits[:-1]) + (bits[0] == self.last_bit)
+        failures = {'repetition_count': self._repetition_count(bits),
+                    'adaptive_proportion': self._adaptive_proportion(bits)}
+        decay = math.exp(-bits.size / ROLLING_BITS)
+        self.ones = self.ones * decay + np.count_nonzero(bits) / bits.size * (1 - decay)
+        self.repeats = self.repeats * decay + repeated / bits.size * (1 - decay)
+        self.bits += bits.size
+        self.batches += 1
+        # the rolling estimates need about ROLLING_BITS bits before they mean anything
+        if self.bits >= ROLLING_BITS and self.min_entropy_estimate() < self.entropy_alarm:
+            failures['min_entropy'] = 1
+        failures = {name: count for name, count in failures.items() if count}
+        self.rct_failures += failures.get('repetition_count', 0)
+        self.apt_failures += failures.get('adaptive_proportion', 0)
+        self.entropy_failures += failures.get('min_entropy', 0)
+        if failures:
+            self.quarantined += 1
+            self.last_failure = time.time()
+        return failures
+
+    def snapshot(self) -> dict:
+        p = min(max(self.ones, 1e-12), 1 - 1e-12)
+        return {
+            'source': self.source,
+            'bits': self.bits,
+            'batches': self.batches,
+            'quarantined': self.quarantined,
+            'repetition_count_failures': self.rct_failures,
+            'adaptive_proportion_failures': self.apt_failures,
+            'min_entropy_failures': self.entropy_failures,
+            'bias': self.ones - 0.5,
+            'entropy': -(p * math.log2(p) + (1 - p) * math.log2(1 - p)),
+            'min_entropy': self.min_entropy_estimate(),
+            'assumed_min_entropy': self.min_entropy,
+            'min_entropy_alarm': self.entropy_alarm,
+            'longest_run': self.longest_run,
+            'cutoffs': {'repetition_count': self.rct_cutoff, 'adaptive_proportion': self.apt_cutoff,
+                        'window': self.window},
+            'last_failure': self.last_failure,
+            'updated': time.time()
+        }
+
+
+class HotbitsHealth:
+    """
+    Health tests of all sources of a hotbits folder. check(source, bits) runs the tests on a batch and returns
+    whether the batch may be used. Quarantined batches of hotbits files are written to <folder>/quarantine, the
+    snapshots of the sources to <folder>/health, so report() also shows sources collected by other processes
+    (the hotbits process started by main.py).
+    """
+
+    def __init__(self, folder: str | None = None, min_entropy: float = 0.5, source_min_entropy: dict | None = None):
+        self.folder = folder
+        self.min_entropy = min_entropy
+        self.source_min_entropy = SOURCE_MIN_ENTROPY if source_min_entropy is None else source_min_entropy
+        self.sources = {}  # source -> HealthTests
+        self.saved = {}  # source -> time of the last snapshot file
+        self.lock = threading.Lock()
+
+    def assumed_min_entropy(self, source: str) -> float:
+        """The entropy per raw bit source is assumed to deliver."""
+        return self.source_min_entropy.get(source, self.min_entropy)
+
+    def tests(self, source: str) -> HealthTests:
+        with self.lock:
+            if source not in self.sources:
+                self.sources[source] = HealthTests(source, self.assumed_min_entropy(source))
+            return self.sources[source]
+
+    def check(self, source: str, bits) -> bool:
+        tests = self.tests(source)
+        with self.lock:
+            failures = tests.feed(bits)
+        if failures:
+            log.warning("Hotbits batch of %s failed the health tests %s", source, failures,
+                        extra=sampled(f'health.{source}'))
+        self._save(tests, force=bool(failures))
+        return not failures
+
+    def quarantine(self, source: str, data: dict) -> str | None:
+        """Keeps a failed hotbits file for inspection instead of adding it to the pool."""
+        if self.folder is None:
+            return None
+        folder = os.path.join(self.folder, 'quarantine')
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{source}_{int(time.time() * 1000)}.json")
+        with open(path, 'w') as f:
+            json.dump(dict(data, health=self.tests(source).snapshot()), f)
+        # a broken source must not fill the disk
+        kept = sorted((os.path.join(folder, name) for name in os.listdir(folder)), key=os.path.getmtime)
+        for old in kept[:max(0, len(kept) - QUARANTINE_KEPT)]:
+            os.remove(old)
+        return path
+
+    def _save(self, tests: HealthTests, force: bool = False):
+        if self.folder is None:
+            return
+        now = time.time()
+        if not force and now - self.saved.get(tests.source, 0) < SNAPSHOT_INTERVAL:
+            return
+        self.saved[tests.source] = now
+        folder = os.path.join(self.folder, 'health')
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{tests.source}.json")
+        with open(path + '.tmp', 'w') as f:
+            json.dump(tests.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def report(self) -> dict:
+        """source -> snapshot, of this process and of the snapshot files of other processes"""
+        report = {}
+        folder = os.path.join(self.folder, 'health') if self.folder is not None else None
+        if folder is not None and os.path.isdir(folder):
+            for name in os.listdir(folder):
+                if name.endswith('.json'):
+                    try:
+                        with open(os.path.join(folder, name), 'r') as f:
+                            report[name[:-5]] = json.load(f)
+                    except (OSError, ValueError):
+                        continue  # written right now
+        with self.lock:
+            for source, tests in self.sources.items():
+                report[source] = tests.snapshot()
+        return report
+
+
+if __name__ == "__main__":
+    health = HotbitsHealth()
+    rng = np.random.default_rng(1)
+    for _ in range(10):
+        health.check('random', rng.integers(0, 2, 300000))
+    health.check('frozen', np.zeros(300000, dtype=np.uint8))
+    health.check('biased', (rng.random(300000) < 0.8).astype(np.uint8))
+    for source, snapshot in health.report().items():
+        print(source, snapshot['quarantined'], '/', snapshot['batches'], round(snapshot['min_entropy'], 3),
+              snapshot['cutoffs'])
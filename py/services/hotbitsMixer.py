@@ -0,0 +1,360 @@
+# Mixing of several hotbits sources: every producer (webcam, time loop, /dev/random, Arduino / ESP on a serial port)
+# delivers raw bits, which are health tested and debiased per source and then condensed by an extractor into one
+# pool. The pool is written as ordinary hotbits files, so HotbitsService reads them like any other.
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.logService import get_logger, fields
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+log = get_logger('hotbitsMixer')
+
+EXTRACTORS = ('sha256', 'xor')
+SHA256_OUTPUT_BITS = 256  # every output block needs input credited with at least as many bits of entropy
+XOR_BLOCK_BYTES = 32
+XOR_MIN_ENTROPY = 0.5  # xor does not add up entropy, weaker sources are left out
+DEFAULT_MIN_ENTROPY = 0.5  # assumed entropy per bit without a HotbitsHealth
+FILE_INTEGERS = 10000
+MAX_FILES = 1000
+
+
+def von_neumann(bits) -> np.ndarray:
+    """Von Neumann debiasing: of every pair of bits 01 gives 0, 10 gives 1, 00 and 11 are dropped."""
+    bits = np.asarray(bits, dtype=np.uint8)
+    pairs = bits[:bits.size // 2 * 2].reshape(-1, 2)
+    return pairs[pairs[:, 0] != pairs[:, 1], 0]
+
+
+class HotbitsProducer:
+    """A source of raw bits. read() blocks until a batch is available and returns it (may be empty)."""
+    name = ''
+
+    def open(self):
+        """Raises OSError if the source is not available."""
+
+    def read(self) -> np.ndarray:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class TimeLoopProducer(HotbitsProducer):
+    name = 'timeLoop'
+
+    def __init__(self, integers: int = 8):
+        self.integers = integers
+
+    def read(self) -> np.ndarray:
+        from services.hotbitsService import generate_random_integer
+        from services.randomnessTestService import bits_from_integers
+        return bits_from_integers([generate_random_integer() for _ in range(self.integers)])
+
+
+class DevRandomProducer(HotbitsProducer):
+    name = 'devRandom'
+
+    def __init__(self, path: str = '/dev/random', chunk: int = 4096):
+        self.path = path
+        self.chunk = chunk
+        self.fd = None
+
+    def open(self):
+        self.fd = os.open(self.path, os.O_RDONLY)
+
+    def read(self) -> np.ndarray:
+        return np.unpackbits(np.frombuffer(os.read(self.fd, self.chunk), dtype=np.uint8))
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SerialProducer(HotbitsProducer):
+    """
+    Raw random bytes sent by a microcontroller (Arduino, ESP32) over a serial port. Without pyserial the port is
+    read as a plain file, which also works with local stand-ins like a pseudo terminal or a named pipe.
+    """
+
+    def __init__(self, name: str, port: str, baudrate: int = 115200, chunk: int = 256):
+        self.name = name
+        self.port = port
+        self.baudrate = baudrate
+        self.chunk = chunk
+        self.connection = None
+
+    def open(self):
+        if serial is not None and not os.path.isfile(self.port):
+            try:
+                self.connection = serial.Serial(self.port, self.baudrate, timeout=1)
+            except serial.SerialException as e:
+                raise OSError(str(e))
+        else:
+            self.connection = open(self.port, 'rb', buffering=0)
+
+    def read(self) -> np.ndarray:
+        return np.unpackbits(np.frombuffer(self.connection.read(self.chunk) or b'', dtype=np.uint8))
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class WebCamProducer(HotbitsProducer):
+    """One bit per pixel of two consecutive frames, see WebCamCollector."""
+    name = 'webCam'
+
+    def __init__(self, camera: int = 0):
+        from services.captureRandomnessFromWebCam import WebCamCollector
+        self.camera = camera
+        self.collector = WebCamCollector(None, None)
+        self.capture = None
+
+    def open(self):
+        import cv2
+        self.capture = cv2.VideoCapture(self.camera)
+        if not self.capture.isOpened():
+            raise OSError("Failed to open the camera")
+
+    def read(self) -> np.ndarray:
+        import cv2
+        img1 = self.collector.capture_image(self.capture)
+        img2 = self.collector.capture_image(self.capture)
+        height, width = min(img1.shape[:2], img2.shape[:2])
+        img1 = cv2.resize(img1, (width, height))
+        img2 = cv2.resize(img2, (width, height))
+        bits = self.collector.pixel_to_bit(img1, img2)
+        if not self.collector.sufficient_difference(img1, img2, bits=bits):
+            return np.empty(0, dtype=np.uint8)
+        return bits
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+def producers_from_settings(aetherOneDB) -> list:
+    """The producers of the sources enabled in the settings, in the order of getHotbitsSourcePriority."""
+    producers = []
+    for source in aetherOneDB.getHotbitsSourcePriority():
+        if source == 'WebCam':
+            producers.append(WebCamProducer())
+        elif source == 'Arduino':
+            producers.append(SerialProducer('arduino', aetherOneDB.get_setting('hotbits_Arduino_port') or '/dev/ttyACM0'))
+        elif source == 'ESP':
+            producers.append(SerialProducer('esp', aetherOneDB.get_setting('hotbits_ESP_port') or '/dev/ttyUSB0'))
+        elif source == 'RPi':
+            producers.append(DevRandomProducer())
+        elif source == 'TimeBaseTRNG':
+            producers.append(TimeLoopProducer())
+    return producers
+
+
+class HotbitsMixer:
+    """
+    Conditioning of the raw bits of several producers into one pool of hotbits files in folder.
+
+    Per source the raw bits are tested by health (a HotbitsHealth, failing batches are dropped) and debiased
+    with von_neumann. Debiasing does not remove correlation, so a debiased bit is credited with the min-entropy
+    assumed for a raw bit of its source (HotbitsHealth.assumed_min_entropy). The extractor condenses the debiased
+    bytes of all sources: sha256 hashes input taken evenly from the sources with data, credited with at least
+    256 bits (64 bytes at 0.5 bits per bit, 320 bytes of the time loop), into 32 bytes. xor combines 32 bytes of
+    every source with enough data (a single source passes through), the output entropy is at least that of the
+    best source in the block, so sources assumed below XOR_MIN_ENTROPY are not used. Throughput and contribution
+    are counted per source.
+    """
+
+    def __init__(self, folder: str, producers: list, health=None, extractor: str = 'sha256',
+                 file_integers: int = FILE_INTEGERS, max_files: int = MAX_FILES):
+        if extractor not in EXTRACTORS:
+            raise ValueError(f"extractor must be one of {EXTRACTORS}")
+        self.folder = folder
+        self.producers = {producer.name: producer for producer in producers}
+        self.health = health
+        self.extractor = extractor
+        self.file_integers = file_integers
+        self.max_files = max_files
+        self.lock = threading.Lock()
+        self.running = False
+        self.threads = []
+        self.started = None
+        self.buffers = {name: bytearray() for name in self.producers}
+        self.remainders = {name: np.empty(0, dtype=np.uint8) for name in self.producers}  # bits short of a byte
+        self.min_entropy = {name: health.assumed_min_entropy(name) if health is not None else DEFAULT_MIN_ENTROPY
+                            for name in self.producers}
+        self.sources = {name: {'raw_bits': 0, 'debiased_bits': 0, 'quarantined_batches': 0, 'contributed_bytes': 0,
+                               'assumed_min_entropy': self.min_entropy[name], 'error': None} for name in self.producers}
+        if extractor == 'xor':
+            for name, min_entropy in self.min_entropy.items():
+                if min_entropy < XOR_MIN_ENTROPY:
+                    self.sources[name]['error'] = (f"assumed min-entropy {min_entropy} per bit is too low for the "
+                                                   f"xor extractor")
+                    del self.producers[name]
+        self.pool = bytearray()
+        self.pool_contributions = {name: 0 for name in self.producers}
+        self.counter = 0
+        self.output_bytes = 0
+        self.files = 0
+
+    def feed(self, source: str, raw_bits) -> None:
+        """Health tests, debiases and buffers a batch of raw bits of source, then runs the extractor."""
+        raw_bits = np.asarray(raw_bits, dtype=np.uint8)
+        if raw_bits.size == 0 or source not in self.producers:
+            return
+        stats = self.sources[source]
+        stats['raw_bits'] += raw_bits.size
+        if self.health is not None and not self.health.check(source, raw_bits):
+            stats['quarantined_batches'] += 1
+            return
+        debiased = np.concatenate([self.remainders[source], von_neumann(raw_bits)])
+        usable = debiased.size // 8 * 8
+        with self.lock:
+            stats['debiased_bits'] += debiased.size - self.remainders[source].size
+            self.remainders[source] = debiased[usable:]
+            self.buffers[source] += np.packbits(debiased[:usable]).tobytes()
+            self._extract()
+        self._write_files()
+
+    def _credit(self, name: str) -> float:
+        """Entropy credited to a buffered byte of source name."""
+        return 8 * self.min_entropy[name]
+
+    def _take(self, entropy: float) -> dict:
+        # bytes credited with entropy bits spread evenly over the sources with data, the sources with the least
+        # buffered entropy first so the others fill up the rest
+        taken, remaining = {}, entropy
+        active = sorted((name for name, buffer in self.buffers.items() if buffer),
+                        key=lambda n: len(self.buffers[n]) * self._credit(n))
+        for position, name in enumerate(active):
+            share = remaining / (len(active) - position)
+            count = min(math.ceil(share / self._credit(name) - 1e-9), len(self.buffers[name]))
+            taken[name] = bytes(self.buffers[name][:count])
+            del self.buffers[name][:count]
+            remaining -= count * self._credit(name)
+        return taken
+
+    def _extract(self):
+        while True:
+            if self.extractor == 'sha256':
+                if sum(len(buffer) * self._credit(name) for name, buffer in self.buffers.items()) < SHA256_OUTPUT_BITS:
+                    return
+                taken = self._take(SHA256_OUTPUT_BITS)
+                self.counter += 1
+                output = hashlib.sha256(self.counter.to_bytes(8, 'big') + b''.join(taken.values())).digest()
+            else:
+                ready = [name for name, buffer in self.buffers.items() if len(buffer) >= XOR_BLOCK_BYTES]
+                if not ready:
+                    return
+                taken = {}
+                for name in ready:
+                    taken[name] = bytes(self.buffers[name][:XOR_BLOCK_BYTES])
+                    del self.buffers[name][:XOR_BLOCK_BYTES]
+                blocks = np.frombuffer(b''.join(taken.values()), dtype=np.uint8).reshape(len(ready), -1)
+                output = np.bitwise_xor.reduce(blocks, axis=0).tobytes()
+            for name, data in taken.items():
+                self.sources[name]['contributed_bytes'] += len(data)
+                self.pool_contributions[name] += len(data)
+            self.pool += output
+            self.output_bytes += len(output)
+
+    def _write_files(self):
+        file_bytes = 4 * self.file_integers
+        while True:
+            with self.lock:
+                if len(self.pool) < file_bytes:
+                    return
+                integers = np.frombuffer(bytes(self.pool[:file_bytes]), dtype='>u4').astype(np.int64).tolist()
+                del self.pool[:file_bytes]
+                contributions, self.pool_contributions = self.pool_contributions, {name: 0 for name in self.producers}
+                self.files += 1
+            timestamp = int(time.time() * 1000)
+            while os.path.exists(os.path.join(self.folder, f"hotbits_{timestamp}.json")):
+                timestamp += 1
+            path = os.path.join(self.folder, f"hotbits_{timestamp}.json")
+            with open(path + '.tmp', 'w') as f:
+                json.dump({"integerList": integers, "source": "mixed", "extractor": self.extractor,
+                           "contributions": contributions}, f)
+            os.replace(path + '.tmp', path)  # HotbitsService only sees complete files
+            log.info("Mixed hotbits saved", extra=fields(file=os.path.basename(path), contributions=contributions))
+
+    def _count_files(self) -> int:
+        return len([name for name in os.listdir(self.folder) if name.endswith('.json')])
+
+    def _produce(self, producer: HotbitsProducer):
+        try:
+            producer.open()
+        except OSError as e:
+            log.warning("Hotbits source %s is not available: %s", producer.name, e)
+            self.sources[producer.name]['error'] = str(e)
+            return
+        try:
+            while self.running:
+                if self._count_files() >= self.max_files:
+                    time.sleep(1)
+                    continue
+                self.feed(producer.name, producer.read())
+        except Exception as e:
+            log.exception("Hotbits source %s failed", producer.name)
+            self.sources[producer.name]['error'] = str(e)
+        finally:
+            producer.close()
+
+    def start(self):
+        """Starts one thread per producer."""
+        if self.running:
+            return
+        self.running = True
+        self.started = time.time()
+        self.threads = [threading.Thread(target=self._produce, args=(producer,), name=f"HotbitsMixer-{name}",
+                                         daemon=True) for name, producer in self.producers.items()]
+        for thread in self.threads:
+            thread.start()
+        log.info("Mixing hotbits of %s with %s", ', '.join(self.producers), self.extractor)
+
+    def stop(self, timeout: float = 2.0):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def report(self) -> dict:
+        seconds = time.time() - self.started if self.started else 0
+        with self.lock:
+            contributed = sum(stats['contributed_bytes'] for stats in self.sources.values())
+            sources = {}
+            for name, stats in self.sources.items():
+                sources[name] = dict(stats,
+                                     raw_bits_per_second=stats['raw_bits'] / seconds if seconds else None,
+                                     buffered_bytes=len(self.buffers[name]),
+                                     contribution=stats['contributed_bytes'] / contributed if contributed else 0.0)
+            return {'running': self.running, 'extractor': self.extractor, 'seconds': seconds,
+                    'output_bytes': self.output_bytes, 'pool_bytes': len(self.pool), 'files': self.files,
+                    'sources': sources}
+
+
+if __name__ == "__main__":
+    import tempfile
+    from services.hotbitsHealth import HotbitsHealth
+
+    folder = tempfile.mkdtemp()
+    rng = np.random.default_rng(1)
+    mixer = HotbitsMixer(folder, [DevRandomProducer(), TimeLoopProducer()], HotbitsHealth(folder), file_integers=1000)
+    mixer.feed('timeLoop', rng.integers(0, 2, 100000))  # stand-in, the real time loop is slow
+    mixer.start()
+    time.sleep(2)
+    mixer.stop()
+    print(json.dumps(mixer.report(), indent=2))
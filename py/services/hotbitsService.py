@@ -1,14 +1,26 @@
 import sys, os, random, json
 import platform as sys_platform
 import threading, time
+import numpy as np
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from enum import Enum
 from services.captureRandomnessFromWebCam import WebCamCollector
-from services.captureRandomnessFromRaspberryPi import RandomNumberGenerator
+from services.captureRandomnessFromRaspberryPi import read_random_integers
 from services.databaseService import CaseDAO
+from services.hotbitsHealth import HotbitsHealth
+from services.hotbitsMixer import HotbitsMixer, producers_from_settings
+from services.randomnessTestService import bits_from_integers
+from services.logService import get_logger, sampled
+
+log = get_logger('hotbits')
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+DEV_RANDOM_POOL = 65536  # integers read from /dev/random per refill of the pool
+
+
+class HotbitsExhausted(RuntimeError):
+    """A strict takeHotbits could not get enough real hotbits, the pool is empty and cannot be refilled."""
 
 
 class HotbitsSource(Enum):
@@ -51,6 +63,32 @@ def generate_random_integer(bit_count: int = 32, maxCount: int = 50):
     return random_integer
 
 
+def ints_from_hotbits(takeHotbits, min: int, max: int, count: int) -> np.ndarray:
+    """
+    count integers between min and max (both inclusive) from 32 bit hotbits, uniform like random.randint.
+    A hotbit maps to min + hotbit % range; hotbits of the incomplete last block of 2^32 % range values are
+    rejected and replaced by further ones from takeHotbits, so there is no modulo bias.
+    """
+    span = max - min + 1
+    limit = 2 ** 32 - 2 ** 32 % span
+    values = takeHotbits(count) & 0xFFFFFFFF
+    rejected = np.flatnonzero(values >= limit)
+    while rejected.size > 0:
+        values[rejected] = takeHotbits(rejected.size) & 0xFFFFFFFF
+        rejected = rejected[values[rejected] >= limit]
+    return min + values % span
+
+
+class TimeLoopHotbits:
+    """
+    Hotbits of the time loop generated on demand, the source of EntropyStreams in worker processes when there
+    are no hotbits files (simulation mode), so the slow loop runs in parallel.
+    """
+
+    def takeHotbits(self, count: int) -> np.ndarray:
+        return np.array([generate_random_integer() for _ in range(count)], dtype=np.int64)
+
+
 class HotbitsService:
 
     def __init__(self, hotbitsSource: HotbitsSource, folder_path: str, aetherOneDB: CaseDAO, main, raspberryPi: bool = False, useArduino: bool = False, useESP: bool = False):
@@ -59,8 +97,18 @@ class HotbitsService:
         self.running = False
         self.aetherOneDB = aetherOneDB
         self.hotbits: [int] = []
+        self.draw_count = 0  # number of hotbits consumed, for measuring the entropy cost of operations
+        self.lent = 0  # hotbits of strict blocks not settled with returnHotbits yet
+        # only growing, for the metrics: draw_count goes down when hotbits are returned
+        self.taken_total = 0
+        self.returned_total = 0
+        self.lock = threading.RLock()  # the pool is shared by concurrent requests
+        self.fallback = random.Random()  # pseudo random numbers if there are no hotbits, not the global state
         self.folder_path = folder_path
-        self.webCamCollector = WebCamCollector(main, self.countHotbits)
+        min_entropy = aetherOneDB.get_setting('hotbits_health_min_entropy') if aetherOneDB is not None else None
+        self.health = HotbitsHealth(folder_path, min_entropy or 0.5)
+        self.webCamCollector = WebCamCollector(main, self.countHotbits, self.health)
+        self.mixer = None  # HotbitsMixer, if hotbits_mix_TRNG is enabled
         if raspberryPi:
             self.source = HotbitsSource.RASPBERRY_PI
         # always start collecting some hotbits
@@ -85,6 +133,9 @@ class HotbitsService:
             timeLoopedHotbits = []
             for i in range(10000):
                 timeLoopedHotbits.append(generate_random_integer())
+            if not self.health.check('timeLoop', bits_from_integers(timeLoopedHotbits)):
+                self.health.quarantine('timeLoop', {"integerList": timeLoopedHotbits, "source": "timeLoop"})
+                continue
             # Save the integers to a JSON file
             timestamp = int(time.time() * 1000)
             filename = f"{self.folder_path}/hotbits_{timestamp}.json"
@@ -97,12 +148,37 @@ class HotbitsService:
     def stopCollectingHotbits(self):
         self.webCamCollector.stopCollectingHotbits = True
         self.running = False
+        self.stopMixing()
+
+    def startMixing(self) -> HotbitsMixer:
+        """
+        Collects from all sources enabled in the settings at once and mixes them into the hotbits folder.
+        Raises ValueError if no source is enabled or usable with the extractor.
+        """
+        with self.lock:
+            if self.mixer is not None and self.mixer.running:
+                return self.mixer
+            producers = producers_from_settings(self.aetherOneDB)
+            if not producers:
+                raise ValueError("No hotbits source is enabled")
+            mixer = HotbitsMixer(self.folder_path, producers, self.health,
+                                 self.aetherOneDB.get_setting('hotbits_mix_extractor') or 'sha256')
+            if not mixer.producers:
+                raise ValueError(f"No enabled hotbits source is usable with the {mixer.extractor} extractor")
+            self.mixer = mixer
+            self.mixer.start()
+            return self.mixer
+
+    def stopMixing(self):
+        if self.mixer is not None:
+            self.mixer.stop()
 
     def collectWebCamHotBits(self):
         self.main.emitMessage('server_update', 'running webCam')
         if self.webCamCollector.checkIfWebCamIsAvailable():
             self.running = True
-            thread = threading.Thread(target=self.webCamCollector.generate_hotbits, args=[self.folder_path, 100])
+            thread = threading.Thread(target=self.webCamCollector.generate_hotbits, args=[self.folder_path, 100],
+                                      name='HotbitsWebCam')
             thread.daemon = True
             thread.start()
             return True
@@ -110,42 +186,49 @@ class HotbitsService:
             return False
 
     def collectHotBits(self):
+        if self.aetherOneDB is not None and self.aetherOneDB.get_setting('hotbits_mix_TRNG'):
+            self.startMixing()
+            return
         if self.source == HotbitsSource.RASPBERRY_PI:
             self.raspberryPi = True
-            print("Raspberry Pi source enabled.")
+            log.info("Raspberry Pi source enabled")
         elif self.source == HotbitsSource.WEBCAM:
             self.running = True
             self.webCamCollector.generate_hotbits(self.folder_path, 10000)
         elif self.source == HotbitsSource.ARDUINO:
             self.useArduino = True
-            print("Arduino source enabled.")
+            log.info("Arduino source enabled")
         elif self.source == HotbitsSource.ESP:
             self.useESP = True
-            print("ESP source enabled.")
+            log.info("ESP source enabled")
         else:
-            print("Unknown Hotbits source selected. No changes made.")
+            log.warning("Unknown hotbits source %s selected, no changes made", self.source)
         self.running = False
 
     def getHotbits(self):
         if self.source == HotbitsSource.RASPBERRY_PI:
-            rng = RandomNumberGenerator()
-            rng.generate_numbers()
-            return rng.get_numbers()
+            # one bulk read refills the pool, the callers hold self.lock
+            numbers = read_random_integers(DEV_RANDOM_POOL)
+            if not self.health.check('devRandom', bits_from_integers(numbers)):
+                self.health.quarantine('devRandom', {"integerList": numbers.tolist(), "source": "devRandom"})
+                return []
+            return numbers.astype(np.int64).tolist()
         else:
             if self.countHotbits() < 10 and self.running is False:
                 # TODO make this as a SETTING
                 if self.aetherOneDB.get_setting('hotbits_use_WebCam'):
-                    thread = threading.Thread(target=self.collectHotBits)
+                    thread = threading.Thread(target=self.collectHotBits, name='HotbitsCollector')
                     thread.daemon = True
                     thread.start()
-                    print("collect webcam hotbits")
+                    log.info("Collecting webcam hotbits")
                     #asyncio.run(self.collectHotBits())
             if self.countHotbits() < 1:
                 # SIMULATION MODE
                 timeLoopedHotbits: [int] = []
                 for i in range(250):
                     timeLoopedHotbits.append(generate_random_integer())
-                print("time loop generated random number ...")
+                log.info("No hotbits files, generated %d integers with the time loop", len(timeLoopedHotbits),
+                         extra=sampled('hotbits.timeLoop'))
                 return timeLoopedHotbits
             """Load integers from a random JSON file in a folder into an array."""
             json_files = [f for f in os.listdir(self.folder_path) if f.endswith('.json')]
@@ -158,18 +241,80 @@ class HotbitsService:
             if "integerList" not in data:
                 raise KeyError("The JSON file does not contain 'integerList'")
             os.remove(json_file_path)  # Delete the hotbits file after loading
-            print(f"Loaded integers from {random_file}")
+            log.debug("Loaded integers from %s", random_file)
             return data["integerList"]
 
     def getInt(self, min: int = 0, max: int = 1):
-        if len(self.hotbits) < 1:
-            self.hotbits = self.getHotbits()
-        # BUGFIX: IndexError: pop from empty list
-        if len(self.hotbits) < 1:
-            print("Hotbits list is empty, generating a pseudo random number.")
-            return random.randint(min, max)
-        random.seed(self.hotbits.pop(0))
-        return random.randint(min, max)
+        with self.lock:
+            if len(self.hotbits) < 1:
+                self.hotbits = self.getHotbits()
+            # BUGFIX: IndexError: pop from empty list
+            if len(self.hotbits) < 1:
+                log.warning("Hotbits list is empty, generating a pseudo random number", extra=sampled('hotbits.empty'))
+                return self.fallback.randint(min, max)
+            self.draw_count += 1
+            self.taken_total += 1
+            hotbit = self.hotbits.pop(0)
+        # the same number as seeding the global random module with the hotbit, without changing its state
+        return random.Random(hotbit).randint(min, max)
+
+    def takeHotbits(self, count: int, strict: bool = False) -> np.ndarray:
+        """
+        Takes a block of raw hotbits from the pool in one go, refilling the pool as often as needed.
+        If the pool cannot be refilled the rest are pseudo random numbers, or with strict HotbitsExhausted is
+        raised and the pool is left as it was. A strict block is settled with returnHotbits, which puts the
+        unused hotbits back.
+        """
+        chunks = []
+        needed = count
+        with self.lock:
+            while needed > 0:
+                if len(self.hotbits) < 1:
+                    self.hotbits = self.getHotbits()
+                if len(self.hotbits) < 1:
+                    if strict:
+                        self.hotbits = np.concatenate(chunks).tolist() if chunks else []
+                        raise HotbitsExhausted(f"{needed} of {count} hotbits are missing, the pool is empty")
+                    log.warning("Hotbits list is empty, generating %d pseudo random numbers", needed,
+                                extra=sampled('hotbits.empty'))
+                    chunks.append(np.array([self.fallback.getrandbits(32) for _ in range(needed)], dtype=np.int64))
+                    break
+                block = self.hotbits[:needed]
+                del self.hotbits[:needed]
+                chunks.append(np.asarray(block, dtype=np.int64))
+                needed -= len(block)
+            taken = count - needed  # only real hotbits, not the pseudo random fallback
+            self.draw_count += taken
+            self.taken_total += taken
+            if strict:
+                self.lent += taken
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def returnHotbits(self, block, used: int) -> None:
+        """
+        Settles a block of takeHotbits(strict=True) of which the first used hotbits were used, the others are put
+        back in front of the pool. Raises ValueError for a block larger than all strict blocks not settled yet,
+        it cannot have come from the pool.
+        """
+        with self.lock:
+            if len(block) > self.lent:
+                raise ValueError(f"a block of {len(block)} hotbits, only {self.lent} were taken strictly")
+            unused = np.asarray(block[used:], dtype=np.int64)
+            self.hotbits[:0] = unused.tolist()
+            self.lent -= len(block)
+            self.draw_count -= unused.size
+            self.returned_total += unused.size
+
+    def isSimulated(self) -> bool:
+        """True if the pool is refilled by the time loop, there is neither a hotbits source nor hotbits files."""
+        return self.source != HotbitsSource.RASPBERRY_PI and len(self.hotbits) == 0 and self.countHotbits() < 1
+
+    def getInts(self, min: int = 0, max: int = 1, count: int = 1) -> np.ndarray:
+        """
+        Vectorized counterpart of getInt, returns count integers between min and max (both inclusive).
+        The distribution is the same (uniform), not the value per hotbit, see ints_from_hotbits.
+        """
+        return ints_from_hotbits(self.takeHotbits, min, max, count)
 
 if __name__ == "__main__":
     for i in range(50):
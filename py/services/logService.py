@@ -0,0 +1,145 @@
+# Structured logging: the calling thread only puts the record into a queue, a background listener writes it to
+# the console (read line by line by the desktop launcher) and to a rotating JSON lines file
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOGGER_NAME = 'aetherone'
+CONSOLE_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+_listener = None
+_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger below the aetherone logger, e.g. get_logger('hotbits') -> aetherone.hotbits"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def fields(**values) -> dict:
+    """
+    Structured fields of a record, usage: log.info("Broadcast cycle", extra=fields(signature=s, draws=12))
+    """
+    return {'fields': values}
+
+
+def sampled(key: str, **values) -> dict:
+    """
+    Like fields, but the record is only written once per sample interval for this key, meant for messages
+    logged in every iteration of a loop. The written record carries the number of suppressed records.
+    """
+    return {'sample': key, 'fields': values}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets the first record of a sample key pass and then at most one per interval seconds.
+    Runs in the calling thread before the record is queued, so suppressed records cost almost nothing.
+    """
+
+    def __init__(self, interval: float = 10.0):
+        super().__init__()
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.state = {}  # sample key -> [time of the last written record, suppressed since then]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, 'sample', None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            state = self.state.get(key)
+            if state is not None and now - state[0] < self.interval:
+                state[1] += 1
+                return False
+            suppressed = state[1] if state is not None else 0
+            self.state[key] = [now, 0]
+        if suppressed:
+            record.fields = dict(getattr(record, 'fields', None) or {}, suppressed=suppressed)
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Text lines with the structured fields appended as key=value, or JSON lines with json_lines=True.
+    """
+
+    def __init__(self, json_lines: bool = False):
+        super().__init__(CONSOLE_FORMAT)
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        record_fields = getattr(record, 'fields', None) or {}
+        if self.json_lines:
+            entry = {'time': self.formatTime(record), 'level': record.levelname, 'logger': record.name,
+                     'thread': record.threadName, 'message': record.getMessage()}
+            entry.update(record_fields)
+            if record.exc_info:
+                entry['exception'] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+        line = super().format(record)
+        if record_fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in record_fields.items())
+        return line
+
+
+def setup_logging(log_folder: str | None = None, level: str = 'INFO', file_name: str = 'aetherone.log',
+                  max_bytes: int = 5 * 1024 * 1024, backup_count: int = 5, sample_interval: float = 10.0):
+    """
+    Configures the aetherone logger, calling it again replaces the previous configuration.
+    Without log_folder only the console is used.
+    """
+    global _listener
+    handlers = [logging.StreamHandler(sys.stdout)]
+    handlers[0].setFormatter(StructuredFormatter())
+    if log_folder:
+        os.makedirs(log_folder, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(os.path.join(log_folder, file_name), maxBytes=max_bytes,
+                                                            backupCount=backup_count, encoding='utf-8')
+        file_handler.setFormatter(StructuredFormatter(json_lines=True))
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()  # unbounded, putting a record never blocks
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_interval))
+
+    level_number = logging.getLevelName(str(level).upper())
+    logger = logging.getLogger(LOGGER_NAME)
+    with _lock:
+        shutdown_logging()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(queue_handler)
+        logger.setLevel(level_number if isinstance(level_number, int) else logging.INFO)
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(log_queue, *handlers)
+        _listener.start()
+    return logger
+
+
+def shutdown_logging():
+    """Writes the queued records and closes the log files."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+if __name__ == "__main__":
+    setup_logging(level='DEBUG')
+    log = get_logger('example')
+    log.info("Broadcast cycle finished", extra=fields(signature='Arnica', draws=12))
+    for i in range(1000):
+        log.info("Insufficient difference between images", extra=sampled('example.loop'))
@@ -0,0 +1,260 @@
+# Minimal Prometheus instrumentation (counters, gauges, histograms and the text exposition format),
+# implemented locally so no client library or external service is needed
+import functools
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}  # label values -> value
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def samples(self) -> list:
+        with self.lock:
+            items = list(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+
+class CallbackMetric(_Metric):
+    """
+    Gauge or counter whose value is read from a function when the metrics are rendered, e.g. a queue size.
+    With labelnames the function returns {tuple of label values: value}.
+    """
+
+    def __init__(self, name: str, documentation: str, function, type_name: str = 'gauge', labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self.type_name = type_name
+
+    def samples(self) -> list:
+        try:
+            value = self.function()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        if self.labelnames:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(sample)}"
+                    for key, sample in value.items()]
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the duration of the block."""
+        return _Timer(self, labels)
+
+    def samples(self) -> list:
+        with self.lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self.values.items()]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self.lock:
+            # registering twice (e.g. a second app instance in the tests) returns the existing metric
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, function, type_name: str = 'gauge',
+                 labelnames: tuple = ()) -> CallbackMetric:
+        """Registers (or replaces) a metric read from function() on every scrape."""
+        metric = CallbackMetric(name, documentation, function, type_name, labelnames)
+        with self.lock:
+            self.metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.header()
+            lines += metric.samples()
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram('aetherone_http_request_duration_seconds',
+                                          'Latency of HTTP requests by route', ('method', 'route', 'status'))
+HTTP_IN_FLIGHT = REGISTRY.gauge('aetherone_http_requests_in_flight', 'HTTP requests being handled', ('route',))
+DAO_QUERY_SECONDS = REGISTRY.histogram('aetherone_dao_query_duration_seconds', 'Duration of CaseDAO calls',
+                                       ('method',), (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+BROADCAST_CYCLE_SECONDS = REGISTRY.histogram('aetherone_broadcast_cycle_duration_seconds',
+                                             'Duration of one broadcast cycle including the GV check', ('mode',),
+                                             (1, 2.5, 5, 10, 12.5, 15, 20, 30, 60))
+SOCKETIO_EMITS = REGISTRY.counter('aetherone_socketio_emits_total', 'Socket.IO messages emitted', ('event',))
+
+
+def timed_methods(histogram: Histogram, prefixes: tuple):
+    """
+    Class decorator, every method starting with one of the prefixes is timed into the histogram (label 'method').
+    """
+    def decorate(cls):
+        for name, function in list(vars(cls).items()):
+            if callable(function) and name.startswith(prefixes):
+                setattr(cls, name, _timed(histogram, name, function))
+        return cls
+    return decorate
+
+
+def _timed(histogram: Histogram, name: str, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start, method=name)
+    return wrapper
+
+
+def instrument_flask(app):
+    """
+    Request timing middleware: in-flight gauge and latency histogram per route rule (not per URL, which would
+    create one series for every id).
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g.metrics_status = 500
+        HTTP_IN_FLIGHT.inc(route=g.metrics_route)
+
+    @app.after_request
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _stop_timer(exception):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        route = g.pop('metrics_route', 'unmatched')
+        HTTP_IN_FLIGHT.dec(route=route)
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route,
+                                     status=g.pop('metrics_status', 500))
@@ -1,8 +1,10 @@
 import sys,os
+import threading
+import numpy as np
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from datetime import datetime, timedelta
-from domains.planetaryDomains import PlanetaryInfo, PlanetaryCalendar, Season, Month, Day
+from datetime import datetime, date, timedelta
+from domains.planetaryDomains import PlanetaryInfo, PlanetaryCalendar, Season, Month, Day, PlanetaryDay
 
 # Define planetary rulerships
 zodiac_monthly = [
@@ -39,100 +41,218 @@ seasonal_rulerships = {
 
 planetary_hours = ["Sun", "Venus", "Mercury", "Moon", "Saturn", "Jupiter", "Mars"]
 
-class PlanetaryRulershipCalendarAPI:
+weekday_names = list(daily_rulerships)  # Monday first, like date.weekday()
+season_names = list(seasonal_rulerships)
+# Chaldean position of the ruler of the first hour of each weekday
+first_hour_index = np.array([planetary_hours.index(daily_rulerships[day]) for day in weekday_names], dtype=np.int8)
 
-    def __init__(self):
-        pass
 
-    def get_season(self, date):
+def season_bounds(year: int) -> list:
+    """
+    Start and end date of all seasons touching the year, in chronological order.
+    Winter wraps across years, so the winter starting in the previous December is included.
+    """
+    bounds = []
+    for season_year in (year - 1, year):
+        for index, (_, _, (start_month, start_day), (end_month, end_day)) in enumerate(seasonal_rulerships.values()):
+            start = date(season_year, start_month, start_day)
+            end = date(season_year + (1 if (end_month, end_day) < (start_month, start_day) else 0), end_month, end_day)
+            bounds.append((start, end, index))
+    return sorted(bounds)
 
-        season_data = Season()
 
-        for season, (element, planets, (start_month, start_day), (end_month, end_day)) in seasonal_rulerships.items():
-            
-            start = datetime(date.year, start_month, start_day)
-            end = datetime(date.year, end_month, end_day)
-            if start <= date <= end:
-                total_days = (end - start).days
-                season_data.season = season
-                season_data.element = element
-                season_data.dominantPlanets = planets
-                season_data.start = start.strftime("%Y-%m-%d")
-                season_data.end = end.strftime("%Y-%m-%d")
-                season_data.duration_days = total_days
-                season_data.progress = round(((date - start).days / total_days) * 100, 1)
-                print(season_data)
-                break
+class PlanetaryYear:
+    """
+    Compact precomputed table of one year, one entry per day in NumPy arrays.
+    """
+
+    def __init__(self, year: int):
+        self.year = year
+        self.first_ordinal = date(year, 1, 1).toordinal()
+        ordinals = np.arange(self.first_ordinal, date(year + 1, 1, 1).toordinal(), dtype=np.int32)
+        days = np.arange(f"{year:04d}-01-01", f"{year + 1:04d}-01-01", dtype="datetime64[D]")
+
+        self.weekday = ((ordinals - 1) % 7).astype(np.int8)  # ordinal 1 (0001-01-01) is a Monday
+        self.month = (days.astype("datetime64[M]").astype(np.int64) % 12).astype(np.int8)
+        self.first_hour = first_hour_index[self.weekday]
+
+        bounds = season_bounds(year)
+        starts = np.array([start.toordinal() for start, _, _ in bounds], dtype=np.int32)
+        ends = np.array([end.toordinal() for _, end, _ in bounds], dtype=np.int32)
+        slot = np.searchsorted(starts, ordinals, side="right") - 1
+        self.season = np.array([index for _, _, index in bounds], dtype=np.int8)[slot]
+        self.season_start = starts[slot]
+        self.season_end = ends[slot]
+        self.season_progress = np.round((ordinals - self.season_start) / (self.season_end - self.season_start) * 100, 1)
+
+    def __len__(self):
+        return len(self.weekday)
+
+    def hours(self, index: int) -> list:
+        first = int(self.first_hour[index])
+        return [planetary_hours[(first + hour) % 7] for hour in range(24)]
+
+    def day(self, index: int, with_hours: bool = True) -> PlanetaryDay:
+        weekday = weekday_names[self.weekday[index]]
+        month, zodiac, month_planet = zodiac_monthly[self.month[index]]
+        season = season_names[self.season[index]]
+        day_data = PlanetaryDay()
+        day_data.date = date.fromordinal(self.first_ordinal + index).isoformat()
+        day_data.day = weekday
+        day_data.planet = daily_rulerships[weekday]
+        day_data.month = month
+        day_data.zodiac = zodiac
+        day_data.monthPlanet = month_planet
+        day_data.season = season
+        day_data.element = seasonal_rulerships[season][0]
+        day_data.seasonProgress = float(self.season_progress[index])
+        if with_hours:
+            day_data.hours = self.hours(index)
+        return day_data
+
+    def season_data(self, index: int) -> Season:
+        season = season_names[self.season[index]]
+        element, planets, _, _ = seasonal_rulerships[season]
+        season_data = Season()
+        season_data.season = season
+        season_data.element = element
+        season_data.dominantPlanets = planets
+        season_data.start = date.fromordinal(int(self.season_start[index])).isoformat()
+        season_data.end = date.fromordinal(int(self.season_end[index])).isoformat()
+        season_data.duration_days = int(self.season_end[index] - self.season_start[index])
+        season_data.progress = float(self.season_progress[index])
         return season_data
 
 
+class PlanetaryRulershipCalendarAPI:
+
+    def __init__(self, first_year: int | None = None, last_year: int | None = None):
+        """
+        Precomputes the tables of all years between first_year and last_year (default: 5 years around today),
+        years outside of this span are computed on first use and kept as well.
+        """
+        this_year = datetime.now().year
+        self.first_year = first_year if first_year is not None else this_year - 5
+        self.last_year = last_year if last_year is not None else this_year + 5
+        self.years = {}
+        self.calendars = {}
+        self.lock = threading.Lock()
+        for year in range(self.first_year, self.last_year + 1):
+            self.table(year)
+
+    def table(self, year: int) -> PlanetaryYear:
+        table = self.years.get(year)
+        if table is None:
+            with self.lock:
+                table = self.years.get(year)
+                if table is None:
+                    table = PlanetaryYear(year)
+                    self.years[year] = table
+        return table
+
+    def get_season(self, date):
+        return self.table(date.year).season_data(date.timetuple().tm_yday - 1)
+
     def planetary_info(self)->PlanetaryInfo:
         now = datetime.now()
-        month_name = now.strftime("%B")
-        day_name = now.strftime("%A")
-        zodiac = next((z for z in zodiac_monthly if z[0] == month_name), None)
-        weekday = now.weekday()
+        table = self.table(now.year)
+        index = now.timetuple().tm_yday - 1
+        day_data = table.day(index, with_hours=False)
 
         data = PlanetaryInfo()
-        data.season = self.get_season(now)
-        data.month.month = month_name
-        data.month.days_count = (datetime(now.year, now.month % 12 + 1, 1) - datetime(now.year, now.month, 1)).days
-        data.month.zodiac = zodiac[1]
-        data.month.planet = zodiac[2]
-        data.day.day = day_name
-        data.day.planet = daily_rulerships[day_name]
+        data.season = table.season_data(index)
+        data.month.month = day_data.month
+        data.month.days_count = int(np.count_nonzero(table.month == table.month[index]))
+        data.month.zodiac = day_data.zodiac
+        data.month.planet = day_data.monthPlanet
+        data.day.day = day_data.day
+        data.day.planet = day_data.planet
         data.hour.hour = now.hour
-
-        first_hour_ruler = daily_rulerships[list(daily_rulerships)[weekday]]
-        index = planetary_hours.index(first_hour_ruler)
-        data.hour.planet = planetary_hours[(index + now.hour) % 7]
+        data.hour.planet = planetary_hours[(int(table.first_hour[index]) + now.hour) % 7]
 
         return data
 
+    def days(self, from_date: date, to_date: date, with_hours: bool = True) -> list:
+        """
+        All days between from_date and to_date (both inclusive), served from the precomputed tables.
+        """
+        result = []
+        for year in range(from_date.year, to_date.year + 1):
+            table = self.table(year)
+            first = (from_date - date(year, 1, 1)).days if year == from_date.year else 0
+            last = (to_date - date(year, 1, 1)).days if year == to_date.year else len(table) - 1
+            result.extend(table.day(index, with_hours) for index in range(first, last + 1))
+        return result
+
+    def hours(self, from_time: datetime, to_time: datetime) -> list:
+        """
+        All planetary hours between from_time and to_time, as (start of the hour, planet) tuples.
+        """
+        result = []
+        hour = from_time.replace(minute=0, second=0, microsecond=0)
+        while hour <= to_time:
+            table = self.table(hour.year)
+            first = int(table.first_hour[hour.timetuple().tm_yday - 1])
+            result.append((hour, planetary_hours[(first + hour.hour) % 7]))
+            hour += timedelta(hours=1)
+        return result
+
+    def next_slot(self, planet: str, after: datetime, unit: str = 'hour') -> datetime | None:
+        """
+        Start of the first hour (or day) ruled by the planet which has not ended yet at the given time.
+        The start may lie before the given time, if the planet rules the current hour or day.
+        """
+        if planet not in planetary_hours:
+            return None
+        if unit == 'day':
+            day = after.replace(hour=0, minute=0, second=0, microsecond=0)
+            for _ in range(7):
+                if daily_rulerships[weekday_names[day.weekday()]] == planet:
+                    return day
+                day += timedelta(days=1)
+            return None
+        hour = after.replace(minute=0, second=0, microsecond=0)
+        for _ in range(48):  # every planet rules at least three hours of each day
+            table = self.table(hour.year)
+            first = int(table.first_hour[hour.timetuple().tm_yday - 1])
+            if planetary_hours[(first + hour.hour) % 7] == planet:
+                return hour
+            hour += timedelta(hours=1)
+        return None
+
     def generate_calendar(self, year):
-        calendar_data = PlanetaryCalendar()
+        calendar_data = self.calendars.get(year)
+        if calendar_data is not None:
+            return calendar_data
 
+        calendar_data = PlanetaryCalendar()
         for season, (element, planets, (start_month, start_day), (end_month, end_day)) in seasonal_rulerships.items():
-            start_date = datetime(year, start_month, start_day)
-            end_date = datetime(year, end_month, end_day)
-            total_days = (end_date - start_date).days
+            start_date = date(year, start_month, start_day)
+            end_date = date(year + (1 if (end_month, end_day) < (start_month, start_day) else 0), end_month, end_day)
             season_data = Season()
             season_data.season = season
             season_data.element = element
             season_data.dominantPlanets = planets
-            season_data.start = start_date.strftime("%Y-%m-%d")
-            season_data.end = end_date.strftime("%Y-%m-%d")
-            season_data.duration_days = total_days
+            season_data.start = start_date.isoformat()
+            season_data.end = end_date.isoformat()
+            season_data.duration_days = (end_date - start_date).days
             calendar_data.seasons.append(season_data)
 
-
-        i = 0
-        for month, zodiac, ruling_planet in zodiac_monthly:
-            first_day = datetime(year, i + 1, 1)
-
-            if i == 11:  # December case: wrap around to next year
-                last_day = datetime(year + 1, 1, 1) - timedelta(days=1)
-            else:
-                last_day = datetime(year, i + 2, 1) - timedelta(days=1)
-
-            days_in_month = (last_day - first_day).days + 1
-
+        table = self.table(year)
+        for month_index, (month, zodiac, ruling_planet) in enumerate(zodiac_monthly):
             month_data = Month()
             month_data.month = month
-            month_data.days_count = days_in_month
             month_data.zodiac = zodiac
             month_data.planet = ruling_planet
-
-            for day in range(1, days_in_month + 1):
-                date = datetime(year, first_day.month, day)
-                weekday = date.strftime("%A")
+            for index in np.flatnonzero(table.month == month_index):
+                planetary_day = table.day(int(index), with_hours=False)
                 day_data = Day()
-                day_data.date = date.strftime("%Y-%m-%d")
-                day_data.day = weekday
-                day_data.planet = daily_rulerships[weekday]
+                day_data.date = planetary_day.date
+                day_data.day = planetary_day.day
+                day_data.planet = planetary_day.planet
                 month_data.days_array.append(day_data)
-
+            month_data.days_count = len(month_data.days_array)
             calendar_data.months.append(month_data)
-            i += 1  
 
-        return calendar_data
\ No newline at end of file
+        self.calendars[year] = calendar_data
+        return calendar_data
@@ -0,0 +1,137 @@
+# Threaded WSGI server for production use, with a bounded worker pool instead of one new thread per connection
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SERVER_MODES = ('production', 'development', 'eventlet')
+RESPONSE_TIMEOUT = 300  # seconds a single read or write of a request may block, a client gone for longer is dropped
+SERVICE_UNAVAILABLE = (b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nRetry-After: 1\r\n"
+                       b"Connection: close\r\n\r\n")
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    """
+    HTTP/1.1 handler, idle keep-alive connections are closed after the timeout of the server. The keep-alive
+    timeout only applies while waiting for the next request: while a request is handled the socket gets the
+    response timeout of the server, so a client reading a large streamed response slowly is not cut off.
+    WebSocket connections are long-lived and get no timeout.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        self.timeout = self.server.keep_alive_timeout
+        super().setup()
+
+    def handle_one_request(self):
+        self.connection.settimeout(self.server.keep_alive_timeout)
+        return super().handle_one_request()
+
+    def run_wsgi(self):
+        websocket = self.headers.get('Upgrade', '').lower() == 'websocket'
+        self.connection.settimeout(None if websocket else self.server.response_timeout)
+        return super().run_wsgi()
+
+    def log_request(self, code="-", size="-"):
+        if self.server.log_requests:
+            super().log_request(code, size)
+
+
+class BoundedWSGIServer(ThreadedWSGIServer):
+    """
+    Connections are handled by a fixed number of daemon worker threads. Connections above max_connections
+    (handled plus waiting) are answered with 503 right away, so a burst cannot exhaust memory or threads.
+    Keep in mind that every open keep-alive or WebSocket connection occupies one worker.
+    """
+
+    def __init__(self, host: str, port: int, app, max_workers: int = 64, max_connections: int = 256,
+                 keep_alive_timeout: float = 5, log_requests: bool = False,
+                 response_timeout: float | None = RESPONSE_TIMEOUT):
+        self.max_workers = max(1, max_workers)
+        self.max_connections = max(self.max_workers, max_connections)
+        self.keep_alive_timeout = keep_alive_timeout
+        self.response_timeout = response_timeout
+        self.log_requests = log_requests
+        self.request_queue_size = min(self.max_connections, 1024)  # listen backlog
+        self.connections = queue.Queue()
+        self.active = 0
+        self.rejected = 0
+        self.active_lock = threading.Condition()
+        super().__init__(host, port, app, handler=KeepAliveRequestHandler)
+        for number in range(self.max_workers):
+            threading.Thread(target=self._worker, name=f"http-{number}", daemon=True).start()
+
+    def process_request(self, request, client_address):
+        with self.active_lock:
+            accepted = self.active < self.max_connections
+            if accepted:
+                self.active += 1
+            else:
+                self.rejected += 1
+        if not accepted:
+            try:
+                request.sendall(SERVICE_UNAVAILABLE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self.connections.put((request, client_address))
+
+    def _worker(self):
+        while True:
+            request, client_address = self.connections.get()
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self.active_lock:
+                    self.active -= 1
+                    self.active_lock.notify_all()
+
+    def stats(self) -> dict:
+        with self.active_lock:
+            return {'workers': self.max_workers, 'max_connections': self.max_connections,
+                    'active_connections': self.active, 'waiting_connections': self.connections.qsize(),
+                    'rejected_connections': self.rejected}
+
+    def drain(self, grace_seconds: float) -> bool:
+        """
+        Waits until the open connections are finished, at most grace_seconds. Returns True if all finished.
+        """
+        deadline = time.monotonic() + grace_seconds
+        with self.active_lock:
+            while self.active > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.active_lock.wait(remaining)
+        return True
+
+
+def serve(server: BoundedWSGIServer, grace_seconds: float = 10, on_shutdown=None):
+    """
+    Serves until SIGINT or SIGTERM, then stops accepting connections, lets running requests finish
+    (at most grace_seconds) and calls on_shutdown.
+    """
+    def request_shutdown(signum, frame):
+        print(f"\nSignal {signum} received, shutting down gracefully ...")
+        # shutdown() waits for serve_forever to return, which runs in this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, request_shutdown)
+        signal.signal(signal.SIGTERM, request_shutdown)
+
+    server.serve_forever()  # closes the listening socket when it returns
+    if not server.drain(grace_seconds):
+        print(f"{server.stats()['active_connections']} connections still open after {grace_seconds} seconds, closing")
+    if on_shutdown is not None:
+        on_shutdown()
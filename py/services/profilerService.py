@@ -0,0 +1,177 @@
+# Profiling of the running server: a sampling profiler over all threads and cProfile captures of single requests
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.logService import get_logger
+
+log = get_logger('profiler')
+
+MAX_PROFILE_SECONDS = 300
+MAX_STACK_DEPTH = 128
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads every interval seconds with sys._current_frames(). Nothing is hooked
+    into the profiled threads, the overhead is one stack walk per thread and sample in the profiler thread.
+    The result are collapsed stacks ("thread;outer;...;inner count" per line), the input format of
+    flamegraph.pl, speedscope and most other flamegraph viewers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stacks = Counter()
+        self.samples = 0
+        self.interval = 0.01
+        self.started = None
+        self.stopped = None
+
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds: float = 30, interval: float = 0.01) -> bool:
+        """Starts a new profile, the previous one is discarded. Returns False if a profile is still running."""
+        with self.lock:
+            if self.running():
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.interval = max(0.001, interval)
+            self.started = time.time()
+            self.stopped = None
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, args=(min(seconds, MAX_PROFILE_SECONDS),),
+                                           name='SamplingProfiler', daemon=True)
+            self.thread.start()
+        log.info("Sampling profiler started for %s seconds, interval %s s", seconds, self.interval)
+        return True
+
+    def stop(self, timeout: float = 5):
+        self.stop_event.set()
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self, seconds: float):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while not self.stop_event.is_set() and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sampled = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                sampled.append(';'.join(reversed(stack)))
+            with self.lock:
+                self.stacks.update(sampled)
+                self.samples += 1
+            self.stop_event.wait(self.interval)
+        self.stopped = time.time()
+        log.info("Sampling profiler stopped after %d samples", self.samples)
+
+    def collapsed(self) -> str:
+        with self.lock:
+            items = sorted(self.stacks.items())
+        return ''.join(f"{stack} {count}\n" for stack, count in items)
+
+    def status(self) -> dict:
+        with self.lock:
+            threads = Counter()
+            for stack, count in self.stacks.items():
+                threads[stack.split(';', 1)[0]] += count
+            return {'running': self.running(), 'samples': self.samples, 'interval': self.interval,
+                    'started': self.started, 'stopped': self.stopped, 'stacks': len(self.stacks),
+                    'threads': dict(threads)}
+
+
+class RequestProfiles:
+    """
+    cProfile captures of single requests, the last max_entries are kept in memory.
+    """
+
+    def __init__(self, max_entries: int = 20):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # id -> {'path', 'method', 'created', 'duration', 'stats'}
+        self.ids = itertools.count(1)
+
+    @staticmethod
+    def begin() -> cProfile.Profile:
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile: cProfile.Profile, method: str, path: str, duration: float) -> int:
+        profile.disable()
+        profile.create_stats()
+        with self.lock:
+            profile_id = next(self.ids)
+            self.entries[profile_id] = {'method': method, 'path': path, 'created': time.time(),
+                                        'duration': round(duration, 6), 'stats': profile.stats}
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return profile_id
+
+    def list(self) -> list:
+        with self.lock:
+            return [{'id': profile_id, 'method': entry['method'], 'path': entry['path'],
+                     'created': entry['created'], 'duration': entry['duration']}
+                    for profile_id, entry in reversed(self.entries.items())]
+
+    def get(self, profile_id: int):
+        with self.lock:
+            return self.entries.get(profile_id)
+
+    def as_text(self, profile_id: int, sort: str = 'cumulative', limit: int = 50) -> str | None:
+        entry = self.get(profile_id)
+        if entry is None:
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(_StatsHolder(entry['stats']), stream=output)
+        stats.sort_stats(sort).print_stats(limit)
+        return f"{entry['method']} {entry['path']} {entry['duration'] * 1000:.2f} ms\n{output.getvalue()}"
+
+    def as_pstats(self, profile_id: int) -> bytes | None:
+        """The binary format of pstats.dump_stats, for snakeviz or python -m pstats."""
+        entry = self.get(profile_id)
+        return marshal.dumps(entry['stats']) if entry is not None else None
+
+
+class _StatsHolder:
+    """pstats.Stats accepts any object with create_stats() and a stats dict."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+if __name__ == "__main__":
+    profiler = SamplingProfiler()
+    profiler.start(1, 0.005)
+    sum(i * i for i in range(3000000))
+    profiler.stop()
+    print(profiler.status())
+    print(profiler.collapsed()[:1000])
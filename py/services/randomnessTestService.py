@@ -1,52 +1,104 @@
+import argparse
+import json
 import math
+import os
+import sys
+import time
+
 import numpy as np
-import random,sys,os
-import matplotlib.pyplot as plt
+from scipy import fft
+from scipy.special import gammaincc
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+
+# significance level of the NIST SP 800-22 tests
+ALPHA = 0.01
+
 
+def bits_from_integers(integers, bit_count: int = 32) -> np.ndarray:
+    """
+    The bits of the integers (e.g. the integerList of a hotbits file) as uint8 array, the lowest bit_count bits
+    of each integer, most significant bit first.
+    """
+    if not 1 <= bit_count <= 64:
+        raise ValueError("bit_count must be between 1 and 64")
+    values = np.asarray(integers, dtype=np.int64).astype('>u8')
+    bits = np.unpackbits(values.view(np.uint8)).reshape(-1, 64)
+    return bits[:, 64 - bit_count:].ravel()
 
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from collections import Counter
-from hotbitsService import generate_random_integer
 
 class RandomnessTests:
-    def __init__(self):
-        pass
+    """
+    Randomness tests of bit streams (lists or arrays of 0 and 1), vectorized with NumPy. Besides the original
+    tests there are the frequency (monobit), block frequency, runs and approximate entropy tests of
+    NIST SP 800-22, each returning the statistic, the p-value and whether the stream passed at ALPHA.
+    """
+
+    def __init__(self, alpha: float = ALPHA):
+        self.alpha = alpha
 
     def chi_square_test(self, bit_stream):
         """
         Perform the Chi-Square Test to compare observed and expected frequencies.
         A truly random sequence will have an observed frequency close to the expected frequency.
-        good video tutorial: https://www.youtube.com/watch?v=qYOMO83Z1WU 
+        good video tutorial: https://www.youtube.com/watch?v=qYOMO83Z1WU
         """
+        bits = np.asarray(bit_stream)
         # Expected frequencies for a 50-50 bit distribution
-        expected_frequency = len(bit_stream) / 2
-
-        # Count observed frequencies
-        observed_frequency = [bit_stream.count(0), bit_stream.count(1)]
-
-        # Chi-square calculation
-        chi_square = sum((observed - expected_frequency) ** 2 / expected_frequency for observed in observed_frequency)
-        return chi_square
+        expected_frequency = bits.size / 2
+        ones = np.count_nonzero(bits)
+        observed_frequency = np.array([bits.size - ones, ones])
+        return float(((observed_frequency - expected_frequency) ** 2 / expected_frequency).sum())
 
     def entropy(self, bit_stream):
         """
         Calculate Shannon entropy to measure the unpredictability of a bitstream.
         Higher entropy suggests better randomness.
         """
-        counts = Counter(bit_stream)
-        total = len(bit_stream)
-        return -sum(count / total * math.log2(count / total) for count in counts.values())
+        values = np.asarray(bit_stream)
+        if values.dtype.kind in 'iub' and values.size > 0 and values.min() >= 0 and values.max() < 1 << 16:
+            counts = np.bincount(values)
+            counts = counts[counts > 0]
+        else:
+            _, counts = np.unique(values, return_counts=True)
+        p = counts / counts.sum()
+        return float(-(p * np.log2(p)).sum()) if counts.size > 1 else 0.0
+
+    def _autocorrelation_sums(self, bits: np.ndarray) -> np.ndarray:
+        """sum(y[i] * y[i + lag]) for every lag of y = 2 * bits - 1, from one FFT instead of a loop per lag"""
+        y = 2.0 * bits - 1.0
+        size = fft.next_fast_len(2 * y.size - 1, real=True)  # zero padded, no wrap around
+        spectrum = fft.rfft(y, size)
+        return np.rint(fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, size)[:y.size])
 
     def autocorrelation_test(self, bit_stream):
         """
         Perform an autocorrelation test to check for patterns in the bitstream.
         For truly random sequences, the correlation should be close to zero.
+        Returns, for each lag from 1 to n/2, the number of bits equal to the bit lag positions later divided by n.
         """
-        correlations = []
-        for lag in range(1, len(bit_stream) // 2):
-            autocorrelation = sum(bit_stream[i] == bit_stream[i + lag] for i in range(len(bit_stream) - lag))
-            correlations.append(autocorrelation / len(bit_stream))
-        return correlations
+        bits = np.asarray(bit_stream, dtype=np.float64)
+        n = bits.size
+        lags = np.arange(1, n // 2)
+        sums = self._autocorrelation_sums(bits)
+        return (((n - lags) + sums[lags]) / 2 / n).tolist()
+
+    def autocorrelation_summary(self, bit_stream, max_lag: int | None = None) -> dict:
+        """
+        The most significant lag: z = sum(y[i] * y[i + lag]) / sqrt(n - lag) is standard normal for random bits,
+        the p-value of the largest |z| is corrected for the number of lags tested.
+        """
+        bits = np.asarray(bit_stream, dtype=np.float64)
+        n = bits.size
+        if n < 4:
+            return {'lags': 0, 'worst_lag': None, 'z': None, 'p_value': None, 'passed': None}
+        lags = np.arange(1, min(max_lag or n // 2, n - 1) + 1)
+        z = self._autocorrelation_sums(bits)[lags] / np.sqrt(n - lags)
+        worst = int(np.argmax(np.abs(z)))
+        p_single = math.erfc(abs(z[worst]) / math.sqrt(2))
+        p_value = -math.expm1(lags.size * math.log1p(-p_single)) if p_single < 1 else 1.0
+        return {'lags': int(lags.size), 'worst_lag': int(lags[worst]), 'z': float(z[worst]), 'p_value': p_value,
+                'passed': p_value >= self.alpha}
 
     def monte_carlo_simulation(self, bit_stream, bins=10):
         """
@@ -60,16 +112,107 @@ class RandomnessTests:
         expected_frequency = len(bit_stream) / bins
 
         # Calculate the Chi-Square statistic for the histogram
-        chi_square = sum((obs - expected_frequency) ** 2 / expected_frequency for obs in hist)
-        return chi_square
+        return float(((hist - expected_frequency) ** 2 / expected_frequency).sum())
 
     def check_unique(self, bit_stream):
         """
         Check if all integers in the bit stream are unique.
         For true randomness, each integer should appear only once.
         """
-        unique_bits = set(bit_stream)
-        return len(unique_bits) == len(bit_stream)
+        values = np.asarray(bit_stream)
+        return bool(np.unique(values).size == values.size)
+
+    def _result(self, statistic: float, p_value: float | None) -> dict:
+        return {'statistic': float(statistic), 'p_value': None if p_value is None else float(p_value),
+                'passed': None if p_value is None else bool(p_value >= self.alpha)}
+
+    def monobit_test(self, bit_stream) -> dict:
+        """Frequency (monobit) test: the proportion of ones should be close to 1/2."""
+        bits = np.asarray(bit_stream, dtype=np.int64)
+        s_obs = abs(2 * int(bits.sum()) - bits.size) / math.sqrt(bits.size)
+        return self._result(s_obs, math.erfc(s_obs / math.sqrt(2)))
+
+    def block_frequency_test(self, bit_stream, block_size: int = 128) -> dict:
+        """Frequency test within blocks: the proportion of ones in each block of block_size bits should be 1/2."""
+        bits = np.asarray(bit_stream, dtype=np.int64)
+        blocks = bits.size // block_size
+        if blocks < 1:
+            return self._result(0, None)
+        proportions = bits[:blocks * block_size].reshape(blocks, block_size).mean(axis=1)
+        chi_square = 4 * block_size * float(((proportions - 0.5) ** 2).sum())
+        return self._result(chi_square, gammaincc(blocks / 2, chi_square / 2))
+
+    def runs_test(self, bit_stream) -> dict:
+        """
+        Runs test: the number of uninterrupted runs of equal bits. Streams failing the monobit prerequisite get
+        a p-value of 0 like in the reference implementation.
+        """
+        bits = np.asarray(bit_stream, dtype=np.int64)
+        n = bits.size
+        pi = bits.mean()
+        if abs(pi - 0.5) >= 2 / math.sqrt(n):
+            return self._result(0, 0.0)
+        runs = 1 + int(np.count_nonzero(bits[1:] != bits[:-1]))
+        p_value = math.erfc(abs(runs - 2 * n * pi * (1 - pi)) / (2 * math.sqrt(2 * n) * pi * (1 - pi)))
+        return self._result(runs, p_value)
+
+    def _pattern_codes(self, bits: np.ndarray, m: int) -> np.ndarray:
+        # all overlapping m bit patterns as integers, the stream is wrapped around by m - 1 bits
+        n = bits.size
+        extended = np.concatenate([bits, bits[:m - 1]]).astype(np.int32)
+        codes = np.zeros(n, dtype=np.int32)
+        for j in range(m):
+            codes = (codes << 1) | extended[j:j + n]
+        return codes
+
+    def _phi(self, codes: np.ndarray, m: int) -> float:
+        counts = np.bincount(codes, minlength=1 << m)
+        frequencies = counts[counts > 0] / codes.size
+        return float((frequencies * np.log(frequencies)).sum())
+
+    def approximate_entropy_test(self, bit_stream, block_length: int | None = None) -> dict:
+        """
+        Approximate entropy test: compares the frequencies of overlapping patterns of block_length and
+        block_length + 1 bits. The default block length is the largest recommended one for the stream
+        (block_length < log2(n) - 5), at most 10.
+        """
+        bits = np.asarray(bit_stream, dtype=np.int64)
+        n = bits.size
+        m = block_length if block_length is not None else max(1, min(10, int(math.log2(max(n, 2))) - 6))
+        # the m bit patterns are the m + 1 bit patterns without their last bit
+        codes = self._pattern_codes(bits, m + 1)
+        approximate_entropy = self._phi(codes >> 1, m) - self._phi(codes, m + 1)
+        chi_square = 2 * n * (math.log(2) - approximate_entropy)
+        return self._result(chi_square, gammaincc(2 ** (m - 1), chi_square / 2))
+
+    def run_nist_tests(self, bit_stream) -> dict:
+        """The SP 800-22 tests and the autocorrelation summary of one stream, as JSON friendly dictionary."""
+        start = time.perf_counter()
+        bits = np.asarray(bit_stream, dtype=np.int64)
+        results = {
+            'bits': int(bits.size),
+            'ones': int(bits.sum()),
+            'entropy': self.entropy(bits),
+            'tests': {
+                'monobit': self.monobit_test(bits),
+                'block_frequency': self.block_frequency_test(bits),
+                'runs': self.runs_test(bits),
+                'approximate_entropy': self.approximate_entropy_test(bits),
+                'autocorrelation': self.autocorrelation_summary(bits)
+            }
+        }
+        results['passed'] = all(test['passed'] is not False for test in results['tests'].values())
+        results['seconds'] = round(time.perf_counter() - start, 6)
+        return results
+
+    def test_hotbits_file(self, path: str, bit_count: int = 32) -> dict:
+        """Tests the bits of the integerList of a hotbits file, without consuming the file."""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        results = self.run_nist_tests(bits_from_integers(data['integerList'], bit_count))
+        results['file'] = os.path.basename(path)
+        results['source'] = data.get('source')
+        return results
 
     def run_all_tests(self, bit_stream):
         """
@@ -91,31 +234,46 @@ class RandomnessTests:
         return results
 
 
-# Example usage:
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='NIST SP 800-22 style randomness tests of hotbits files')
+    parser.add_argument('files', nargs='*', help='hotbits files, by default all files of the hotbits folder')
+    parser.add_argument('--bits', type=int, default=32, choices=range(1, 65), metavar='1-64',
+                        help='bits per integer of the integerList')
+    parser.add_argument('--alpha', type=float, default=ALPHA, help='significance level')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    parser.add_argument('--image', help='store the bits of the first file as PNG image')
+    args = parser.parse_args(argv)
+
+    folder = os.path.join(PROJECT_ROOT, 'hotbits')
+    files = args.files or sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith('.json'))
+    if not files:
+        print(f"No hotbits files in {folder}")
+        return 1
+    tester = RandomnessTests(args.alpha)
+    results = [tester.test_hotbits_file(path, args.bits) for path in files]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['file']} ({result['source']}), {result['bits']} bits, entropy {result['entropy']:.6f}, "
+                  f"{'passed' if result['passed'] else 'FAILED'} in {result['seconds'] * 1000:.1f} ms")
+            for name, test in result['tests'].items():
+                p_value = 'n/a' if test['p_value'] is None else f"{test['p_value']:.6f}"
+                print(f"  {name:<20} p = {p_value:<10} {'' if test['passed'] is not False else 'FAILED'}")
+    if args.image:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        with open(files[0], 'r') as f:
+            bits = bits_from_integers(json.load(f)['integerList'], args.bits)
+        side = int(math.sqrt(bits.size))
+        plt.figure(figsize=(10, 10))
+        plt.imshow(bits[:side * side].reshape(side, side), cmap='gray', aspect='auto')
+        plt.axis('off')
+        plt.savefig(args.image, bbox_inches='tight', pad_inches=0)
+        plt.close()
+    return 0 if all(result['passed'] for result in results) else 2
 
-if __name__ == "__main__":
-    # Example random bitstream (you can replace this with your generated hotbits)
-    #bit_stream = [np.random.randint(0, 2) for _ in range(10000)]
-    bit_stream = []
-    for _ in range(10000):
-        random.seed(generate_random_integer(32,100))
-        bit_stream.append(random.randint(0, 1))
-
-    # Instantiate the RandomnessTests class
-    tester = RandomnessTests()
-
-    # Run all tests
-    results = tester.run_all_tests(bit_stream)
-    print(f"Chi-Square Test: {results['Chi-Square Test']} # Expected: Low p-value for randomness")
-    print(f"Entropy: {results['Entropy']} # Expected: High entropy for randomness") 
-    #print(f"Autocorrelation: {results['Autocorrelation']} # Expected: Low autocorrelation for randomness")
-    print(f"Monte Carlo Simulation: {results['Monte Carlo Simulation']}# Expected: Low Chi-Square for randomness")  
-    print(f"Uniqueness Check: {results['Uniqueness Check']} # Expected: True for randomness") 
-    # Make a PNG image of the bitstream
-    bit_array = np.array(bit_stream).reshape((100, 100))  # Reshape to 100x100 for visualization
-    plt.figure(figsize=(10, 10))
-    plt.imshow(bit_array, cmap='gray', aspect='auto')
-    plt.axis('off')
-    plt.savefig('bitstream.png', bbox_inches='tight', pad_inches=0)
-    plt.close()
 
+if __name__ == "__main__":
+    sys.exit(main())
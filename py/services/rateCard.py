@@ -1,17 +1,52 @@
-import matplotlib.pyplot as plt
-import numpy as np
+import math
+import re
+import threading
+import time
+from functools import lru_cache
 from io import BytesIO
-from PIL import Image, ImageFont, ImageDraw
+from xml.sax.saxutils import escape
+from PIL import Image, ImageFont, ImageDraw, ImageChops
 
 # Thanks to Benjamin Ludwig!!!
 
+CARD_WIDTH = 755
+CARD_HEIGHT = 805
+CENTER = (CARD_WIDTH / 2, 425)
+SCALE = 300 / 5.5  # pixels per chart unit, the chart spans -5.5 .. 5.5
+SUPERSAMPLING = 2  # the template is drawn larger and scaled down once for smooth lines
+
+# The card is encoded as palette image: the upper 4 bits of an index are the grey level of the dial,
+# the lower 4 bits the intensity of the red overlay. This keeps antialiasing and makes PNG encoding fast.
+GREY_LEVELS = [value & 0xF0 for value in range(256)]
+RED_LEVELS = [value >> 4 for value in range(256)]
+PALETTE = []
+for _grey in range(16):
+    for _red in range(16):
+        _level, _alpha = _grey * 17, _red / 15
+        PALETTE += [round(_level + (255 - _level) * _alpha), round(_level * (1 - _alpha)), round(_level * (1 - _alpha))]
+
+_template_lock = threading.Lock()
+_templates = {}
+
+
+@lru_cache(maxsize=8)
+def load_font(size: int):
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except IOError:
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:  # Pillow < 10.1 has no sized default font
+            return ImageFont.load_default()
+
+
 class RadionicChart:
     def __init__(self, rate_text, base='base10'):
         """
         Initialize the RadionicChart class.
         """
-        self.rate_text = rate_text
-        self.base = base
+        self.rate_text = rate_text if rate_text is not None else ''
+        self.base = base if base in ('base10', 'base44', 'base336') else 'base10'
         self.radius = 5
         self.inner_radius = self.radius * 2 / 3
         self.outer_radius = self.radius - 0.2
@@ -35,103 +70,142 @@ class RadionicChart:
             sub_angle_step = angle_step / 9
         return n_sectors, angle_step, sub_angle_step
 
-    def draw_chart(self, rates):
+    def _point(self, radius, degrees, factor=1):
         """
-        Draw the radionic chart with the provided rates.
+        Converts polar chart coordinates into image pixels.
+        """
+        angle = math.radians(degrees)
+        return ((CENTER[0] + radius * SCALE * math.cos(angle)) * factor,
+                (CENTER[1] - radius * SCALE * math.sin(angle)) * factor)
+
+    def _sector_lines(self):
         """
-        fig, ax = plt.subplots(figsize=(6, 6))
-        fig.patch.set_facecolor('white')
-        fig.suptitle(self.rate_text, fontsize=14)
-        plt.subplots_adjust(top=1.0)
+        Yields (degrees, is_main_line) for all sector and subsegment lines.
+        """
+        for i in range(self.n_sectors):
+            yield 90 - (i * self.angle_step), True
+            for j in range(1, round(self.angle_step / self.sub_angle_step)):
+                yield 90 - (i * self.angle_step + j * self.sub_angle_step), False
+
+    def _sector_labels(self):
+        for i in range(self.n_sectors):
+            yield str(i), 90 - (i * self.angle_step + self.angle_step / 2)
+
+    def _rate_lines(self, rates):
+        for sector, position in rates:
+            degrees = 90 - (sector * self.angle_step) - (position - 1) * self.sub_angle_step
+            yield self._point(self.inner_radius, degrees), self._point(self.outer_radius, degrees)
+
+    def _template(self) -> Image.Image:
+        """
+        The dial of a base is drawn only once and shared by all requests (read-only).
+        """
+        template = _templates.get(self.base)
+        if template is not None:
+            return template
+        with _template_lock:
+            template = _templates.get(self.base)
+            if template is None:
+                template = self._draw_template()
+                _templates[self.base] = template
+        return template
+
+    def _draw_template(self) -> Image.Image:
+        f = SUPERSAMPLING
+        img = Image.new("L", (CARD_WIDTH * f, CARD_HEIGHT * f), 255)
+        draw = ImageDraw.Draw(img)
+        center = (CENTER[0] * f, CENTER[1] * f)
 
-        # Draw circles
-        circle_outer = plt.Circle((0, 0), self.radius, color='black', fill=False, linewidth=2)
-        circle_inner = plt.Circle((0, 0), self.inner_radius, color='black', fill=False, linewidth=0.5)
-        ax.add_artist(circle_outer)
-        ax.add_artist(circle_inner)
+        for degrees, main_line in self._sector_lines():
+            draw.line([center, self._point(self.radius, degrees, f)],
+                      fill=0 if main_line else 190, width=f if main_line else 1)
 
-        # Draw sector lines and subsegments
-        self._draw_sectors(ax)
+        for radius, width in ((self.radius, 3 * f), (self.inner_radius, f)):
+            r = radius * SCALE * f
+            draw.ellipse([center[0] - r, center[1] - r, center[0] + r, center[1] + r], outline=0, width=width)
 
-        # Add rates
-        self._draw_rates(ax, rates)
+        img = img.resize((CARD_WIDTH, CARD_HEIGHT), Image.LANCZOS)
+        draw = ImageDraw.Draw(img)
 
-        # Set axis properties
-        ax.set_xlim(-self.radius - 0.5, self.radius + 0.5)
-        ax.set_ylim(-self.radius - 0.5, self.radius + 0.5)
-        ax.set_aspect('equal', adjustable='box')
-        plt.axis('off')
+        font = load_font(14)
+        for label, degrees in self._sector_labels():
+            draw.text(self._point(self.radius - 0.5, degrees), label, font=font, fill=0, anchor='mm')
 
-        # Render the chart to an Image object
-        return self._render_to_image(fig, rates)
+        font = load_font(20)
+        draw.text((10, 770), 'AetherOnePy', font=font, fill=211)
+        draw.text((560, 770), 'Radionics Rate Card', font=font, fill=211)
+        return img
 
-    def _draw_sectors(self, ax):
+    def draw_chart(self, rates):
         """
-        Draw sectors and subsegments for the chart.
+        Draw the radionic chart with the provided rates.
         """
-        for i in range(self.n_sectors):
-            angle = np.radians(90 - (i * self.angle_step))
-            x = self.radius * np.cos(angle)
-            y = self.radius * np.sin(angle)
-            plt.plot([0, x], [0, y], color='black', linewidth=0.5)
+        return self._draw_palette_image(rates).convert('RGB')
+
+    def _draw_palette_image(self, rates) -> Image.Image:
+        """
+        Only the rate lines and texts are drawn per request, on a copy of the cached dial.
+        The red parts go into a separate mask, which is merged with the dial into the palette indexes.
+        """
+        img = self._template().copy()
+        ImageDraw.Draw(img).text((CARD_WIDTH / 2, 30), self.rate_text, font=load_font(24), fill=0, anchor='mm')
 
-            for j in range(9):
-                angle = np.radians(90 - (i * self.angle_step + j * self.sub_angle_step))
-                x = self.radius * np.cos(angle)
-                y = self.radius * np.sin(angle)
-                plt.plot([0, x], [0, y], color='grey', linewidth=0.1)
+        mask = Image.new("L", img.size, 0)
+        draw = ImageDraw.Draw(mask)
+        for inner, outer in self._rate_lines(rates):
+            draw.line([inner, outer], fill=255, width=4)
+        rates_text = " - ".join(str(rate[0]) for rate in rates)
+        draw.text((CARD_WIDTH / 2, 80), rates_text, font=load_font(20), fill=255, anchor='mt')
 
-        for i in range(self.n_sectors):
-            angle = np.radians(90 - (i * self.angle_step + self.angle_step / 2))
-            x = (self.radius - 0.5) * np.cos(angle)
-            y = (self.radius - 0.5) * np.sin(angle)
-            plt.text(x, y, str(i), fontsize=8, ha='center', va='center', color='black')
+        card = ImageChops.add(img.point(GREY_LEVELS), mask.point(RED_LEVELS))
+        card.putpalette(PALETTE)
+        return card
 
-    def _draw_rates(self, ax, rates):
+    def draw_chart_svg(self, rates) -> str:
         """
-        Draw the rates on the chart.
+        Draw the radionic chart as SVG document.
         """
-        for sector, position in rates:
-            base_angle = 90 - (sector * self.angle_step)
-            angle = np.radians(base_angle - (position - 1) * self.sub_angle_step)
-            x_inner = self.inner_radius * np.cos(angle)
-            y_inner = self.inner_radius * np.sin(angle)
-            x_outer = self.outer_radius * np.cos(angle)
-            y_outer = self.outer_radius * np.sin(angle)
-            plt.plot([x_inner, x_outer], [y_inner, y_outer], color='red', linewidth=2)
-
-    def _render_to_image(self, fig, rates):
-        """
-        Render the chart to an in-memory Image object and return it.
-        """
-        # Save figure to a BytesIO buffer
-        buf = BytesIO()
-        fig.savefig(buf, format='png', dpi=300, bbox_inches='tight', pad_inches=0, transparent=False)
-        buf.seek(0)
-        plt.close(fig)
-
-        # Open the image from the buffer
-        img = Image.open(buf)
-
-        # Resize and add additional details
-        img_resized = img.resize((755, 755), Image.LANCZOS)
-        new_height = img_resized.height + 50
-        background_adjusted = Image.new("RGB", (img_resized.width, new_height), "white")
-        background_adjusted.paste(img_resized, (0, 50))
-        draw = ImageDraw.Draw(background_adjusted)
+        template = _svg_template(self.base)
+        lines = [
+            f'<line x1="{inner[0]:.2f}" y1="{inner[1]:.2f}" x2="{outer[0]:.2f}" y2="{outer[1]:.2f}" '
+            f'stroke="red" stroke-width="4"/>'
+            for inner, outer in self._rate_lines(rates)
+        ]
+        rates_text = " - ".join(str(rate[0]) for rate in rates)
+        lines.append(f'<text x="{CARD_WIDTH / 2}" y="30" font-size="24" text-anchor="middle" '
+                     f'dominant-baseline="middle">{escape(self.rate_text)}</text>')
+        lines.append(f'<text x="{CARD_WIDTH / 2}" y="96" font-size="20" text-anchor="middle" '
+                     f'fill="red">{escape(rates_text)}</text>')
+        return template.replace('</svg>', '\n'.join(lines) + '\n</svg>')
 
-        try:
-            font = ImageFont.truetype("arial.ttf", 20)
-        except IOError:
-            font = ImageFont.load_default()
+    def render(self, rates, image_format: str = 'png') -> (bytes, str):
+        """
+        Renders the card and returns the encoded bytes with its mimetype.
+        """
+        if image_format == 'svg':
+            return self.draw_chart_svg(rates).encode('utf-8'), 'image/svg+xml'
+        buffer = BytesIO()
+        if image_format == 'jpeg':
+            self.draw_chart(rates).save(buffer, format='JPEG', quality=90)
+            return buffer.getvalue(), 'image/jpeg'
+        # low compression, encoding time dominates the rendering time otherwise
+        self._draw_palette_image(rates).save(buffer, format='PNG', compress_level=1)
+        return buffer.getvalue(), 'image/png'
 
-        draw.text((10, 770), 'AetherOnePy', font=font, fill=(211, 211, 211))
-        draw.text((560, 770), 'Radionics Rate Card', font=font, fill=(211, 211, 211))
-        rates_text = " - ".join(str(rate[0]) for rate in rates)
-        text_width = font.getlength(rates_text)
-        draw.text(((755 / 2) - (text_width / 2), 80), rates_text, font=font, fill="red")
+    @staticmethod
+    def generate_rates(name: str, base: str = 'base10') -> str:
+        """
+        Generates the rate string for a name, the same way as the rate cards page of the UI does.
+        Pairs of the first 8 alphanumeric characters are combined into 4 values of the base.
+        """
+        alphabet = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        cleaned = re.sub(r'[^A-Za-z0-9]', '', name or '').upper()
+        base_value = {'base44': 44, 'base336': 336}.get(base, 10)
+
+        def char_value(index):
+            return alphabet.index(cleaned[index]) if index < len(cleaned) else 0
 
-        return background_adjusted
+        return ' '.join(str(char_value(i * 2) * base_value + char_value(i * 2 + 1)) for i in range(4))
 
     @staticmethod
     def parse_input(input_string):
@@ -143,19 +217,48 @@ class RadionicChart:
             for position, num in enumerate(input_string.split(), 1):
                 sector = float(num)
                 rates.append((sector, position))
-        except ValueError as e:
+        except (ValueError, AttributeError) as e:
             print(f"Input Error: {e}")
             return []
         return rates
 
 
+@lru_cache(maxsize=4)
+def _svg_template(base: str) -> str:
+    """
+    The static part of the SVG card for a base.
+    """
+    chart = RadionicChart('', base)
+    cx, cy = CENTER
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{CARD_WIDTH}" height="{CARD_HEIGHT}" '
+             f'viewBox="0 0 {CARD_WIDTH} {CARD_HEIGHT}" font-family="Arial, sans-serif">',
+             f'<rect width="{CARD_WIDTH}" height="{CARD_HEIGHT}" fill="white"/>']
+    for degrees, main_line in chart._sector_lines():
+        x, y = chart._point(chart.radius, degrees)
+        stroke = 'stroke="black" stroke-width="1"' if main_line else 'stroke="#bebebe" stroke-width="0.5"'
+        parts.append(f'<line x1="{cx:.2f}" y1="{cy:.2f}" x2="{x:.2f}" y2="{y:.2f}" {stroke}/>')
+    parts.append(f'<circle cx="{cx:.2f}" cy="{cy:.2f}" r="{chart.radius * SCALE:.2f}" fill="none" stroke="black" stroke-width="3"/>')
+    parts.append(f'<circle cx="{cx:.2f}" cy="{cy:.2f}" r="{chart.inner_radius * SCALE:.2f}" fill="none" stroke="black" stroke-width="1"/>')
+    for label, degrees in chart._sector_labels():
+        x, y = chart._point(chart.radius - 0.5, degrees)
+        parts.append(f'<text x="{x:.2f}" y="{y:.2f}" font-size="14" text-anchor="middle" dominant-baseline="middle">{label}</text>')
+    parts.append('<text x="10" y="790" font-size="20" fill="#d3d3d3">AetherOnePy</text>')
+    parts.append('<text x="560" y="790" font-size="20" fill="#d3d3d3">Radionics Rate Card</text>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
 # Example Usage
 if __name__ == "__main__":
     input_string = '10.34 5.75 1.5 4.65'
     rates = RadionicChart.parse_input(input_string)
 
     chart = RadionicChart('ChelidoniumBase10', 'base10')
-    image = chart.draw_chart(rates)
+    chart.render(rates)  # warm up the template cache
+    start = time.perf_counter()
+    for _ in range(100):
+        chart.render(rates)
+    print(f"PNG rate card: {(time.perf_counter() - start) * 10:.2f} ms per card")
 
     # Show the image (for testing)
-    image.show()
+    chart.draw_chart(rates).show()
@@ -0,0 +1,204 @@
+# Batch generation of rate cards, rendered on a process pool and streamed as ZIP or multi-page PDF
+import os
+import re
+import sys
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.rateCard import RadionicChart, CARD_WIDTH, CARD_HEIGHT
+
+MAX_CARDS = 100
+
+
+def render_card(rate_name: str, rates_string: str, base: str, image_format: str) -> bytes:
+    """
+    Renders one card, runs inside the worker processes (each keeps its own template cache).
+    """
+    rates = RadionicChart.parse_input(rates_string)
+    data, _ = RadionicChart(rate_name, base).render(rates, image_format)
+    return data
+
+
+def safe_filename(name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_\-\.]', '_', name or '').strip('.')[:100] or 'card'
+
+
+class _ChunkBuffer:
+    """
+    Write-only file object, zipfile falls back to streaming mode because it cannot tell() or seek().
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class PdfStreamWriter:
+    """
+    Minimal PDF writer with one JPEG image per page. Pages are written as soon as they are added,
+    the page tree and the cross-reference table follow at the end.
+    Object numbers: 1 catalog, 2 page tree, then image, content stream and page for every card.
+    """
+
+    def __init__(self, width: int = CARD_WIDTH, height: int = CARD_HEIGHT, dpi: int = 96):
+        self.width = width
+        self.height = height
+        self.page_width = width * 72 / dpi
+        self.page_height = height * 72 / dpi
+        self.offset = 0
+        self.offsets = {}
+        self.pages = []
+
+    def _write(self, data: bytes) -> bytes:
+        self.offset += len(data)
+        return data
+
+    def _object(self, number: int, body: bytes) -> bytes:
+        self.offsets[number] = self.offset
+        return self._write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+
+    def header(self) -> bytes:
+        return self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n') + self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+    def page(self, jpeg: bytes) -> bytes:
+        image, content, page = 3 + 3 * len(self.pages), 4 + 3 * len(self.pages), 5 + 3 * len(self.pages)
+        self.pages.append(page)
+        draw = b'q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q' % (self.page_width, self.page_height)
+        return (
+            self._object(image, b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB '
+                                b'/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>\nstream\n'
+                         % (self.width, self.height, len(jpeg)) + jpeg + b'\nendstream')
+            + self._object(content, b'<< /Length %d >>\nstream\n' % len(draw) + draw + b'\nendstream')
+            + self._object(page, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] '
+                                 b'/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>'
+                           % (self.page_width, self.page_height, image, content))
+        )
+
+    def finish(self) -> bytes:
+        kids = b' '.join(b'%d 0 R' % page for page in self.pages)
+        data = self._object(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.pages)))
+        xref_offset = self.offset
+        size = max(self.offsets) + 1
+        xref = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        xref += [b'%010d 00000 n \n' % self.offsets[number] for number in range(1, size)]
+        trailer = b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref_offset)
+        return data + self._write(b''.join(xref) + trailer)
+
+
+class _JobSlot:
+    """
+    A running batch. The slot is released once, when its stream ends or when the response is closed, whichever
+    comes first (a generator that was never started does not run its finally block).
+    """
+
+    def __init__(self, semaphore: threading.BoundedSemaphore):
+        self.semaphore = semaphore
+        self.lock = threading.Lock()
+        self.released = False
+
+    def release(self):
+        with self.lock:
+            if self.released:
+                return
+            self.released = True
+        self.semaphore.release()
+
+
+class RateCardBatchRenderer:
+    """
+    Renders many cards in parallel. The number of worker processes and the number of batches running at the same
+    time are bounded, further batch requests are rejected until a slot is free.
+    """
+
+    def __init__(self, max_workers: int = 2, max_jobs: int = 2):
+        self.max_workers = max(1, max_workers)
+        self.executor = None
+        self.executor_lock = threading.Lock()
+        self.job_slots = threading.BoundedSemaphore(max(1, max_jobs))
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # the pool is started on the first batch, not at server startup
+        with self.executor_lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self.executor
+
+    def try_acquire(self) -> _JobSlot | None:
+        """A slot for a batch, None if max_jobs batches are running."""
+        if not self.job_slots.acquire(blocking=False):
+            return None
+        return _JobSlot(self.job_slots)
+
+    def _rendered(self, cards: list, base: str, image_format: str):
+        """
+        Yields (index, card, image bytes) in order, each as soon as it is finished.
+        """
+        executor = self._get_executor()
+        futures = [executor.submit(render_card, card['name'], card['rates'], base, image_format) for card in cards]
+        try:
+            for index, (card, future) in enumerate(zip(cards, futures)):
+                yield index, card, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def stream_zip(self, cards: list, base: str, image_format: str = 'png', slot: _JobSlot | None = None):
+        """
+        Streams a ZIP archive, the slot acquired with try_acquire() is released when the stream ends.
+        """
+        try:
+            buffer = _ChunkBuffer()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+                for index, card, data in self._rendered(cards, base, image_format):
+                    archive.writestr(f"{index + 1:02d}_{safe_filename(card['name'])}.{image_format}", data)
+                    yield buffer.pop()
+            yield buffer.pop()
+        finally:
+            if slot is not None:
+                slot.release()
+
+    def stream_pdf(self, cards: list, base: str, slot: _JobSlot | None = None):
+        """
+        Streams a multi-page PDF, one card per page.
+        """
+        try:
+            pdf = PdfStreamWriter()
+            yield pdf.header()
+            for _, _, data in self._rendered(cards, base, 'jpeg'):
+                yield pdf.page(data)
+            yield pdf.finish()
+        finally:
+            if slot is not None:
+                slot.release()
+
+    def shutdown(self):
+        with self.executor_lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+
+# Example Usage
+if __name__ == "__main__":
+    renderer = RateCardBatchRenderer(max_workers=4)
+    names = ['Arnica', 'Sulfur', 'Zincum', 'Chelidonium']
+    cards = [{'name': name, 'rates': RadionicChart.generate_rates(name)} for name in names]
+    slot = renderer.try_acquire()
+    with open('rateCards.pdf', 'wb') as f:
+        for chunk in renderer.stream_pdf(cards, 'base10', slot):
+            f.write(chunk)
+    renderer.shutdown()
+    print("rateCards.pdf written")
@@ -0,0 +1,72 @@
+# Columnar in-memory view of rate catalogs: the analysis only needs the ids and signatures of the rates,
+# descriptions are loaded on demand for the few rates which end up in a result
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from domains.aetherOneDomains import Rate, AnalysisRate
+
+
+class ColumnarCatalog:
+    """
+    The rates of one or more catalogs as columns: NumPy arrays of the rate ids and catalog ids and a tuple of
+    interned signatures (equal signatures of different catalogs share one string). A rate is addressed by its
+    index. description_loader(ids) returns {rate id: description} for the given rate ids.
+    """
+
+    def __init__(self, ids, catalog_ids, signatures, description_loader=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.catalog_ids = np.asarray(catalog_ids, dtype=np.int64)
+        self.signatures = tuple(sys.intern(signature or '') for signature in signatures)
+        self.description_loader = description_loader
+        self.loaded_descriptions = {}  # rate id -> description
+
+    @classmethod
+    def from_rows(cls, catalog_id: int, rows, description_loader=None):
+        """rows of (rate id, signature), e.g. SELECT id, signature FROM rate"""
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        return cls(ids, np.full(len(rows), catalog_id, dtype=np.int64), [row[1] for row in rows], description_loader)
+
+    @classmethod
+    def from_rates(cls, rates: list):
+        """Columnar view of already loaded Rate objects, their descriptions are kept."""
+        catalog = cls([rate.id for rate in rates], [rate.catalogID for rate in rates],
+                      [rate.signature for rate in rates])
+        catalog.loaded_descriptions = {rate.id: rate.description for rate in rates}
+        return catalog
+
+    def __len__(self) -> int:
+        return self.ids.size
+
+    def descriptions(self, indices) -> list:
+        """Descriptions of the rates at the indices, missing ones are loaded in one call of the loader."""
+        ids = self.ids[indices].tolist()
+        missing = [rate_id for rate_id in ids if rate_id not in self.loaded_descriptions]
+        if missing and self.description_loader is not None:
+            self.loaded_descriptions.update(self.description_loader(missing))
+        return [self.loaded_descriptions.get(rate_id, '') for rate_id in ids]
+
+    def rate(self, index: int) -> Rate:
+        rate = Rate(self.signatures[index], self.descriptions([index])[0], int(self.catalog_ids[index]))
+        rate.id = int(self.ids[index])
+        return rate
+
+    def analysis_rates(self, indices, analysis_id: int, energetic_values) -> list:
+        """AnalysisRate objects for the selected indices only."""
+        indices = np.asarray(indices, dtype=np.int64)
+        analysis_rates = []
+        for index, description, value in zip(indices.tolist(), self.descriptions(indices), energetic_values):
+            analysis_rate = AnalysisRate(self.signatures[index], description, int(self.catalog_ids[index]),
+                                         analysis_id, int(value), 0, 0, "", 0, "")
+            analysis_rate.id = int(self.ids[index])
+            analysis_rates.append(analysis_rate)
+        return analysis_rates
+
+
+if __name__ == "__main__":
+    catalog = ColumnarCatalog.from_rows(1, [(1, 'Arnica'), (2, 'Sulfur'), (3, 'Zincum')],
+                                        lambda ids: {rate_id: f"Description {rate_id}" for rate_id in ids})
+    print(len(catalog), catalog.signatures, catalog.descriptions([0, 2]))
+    print(catalog.analysis_rates([2, 0], 7, [1000, 950]))
@@ -0,0 +1,150 @@
+# Response cache for endpoints whose result is a pure function of the request parameters
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+
+class ResponseCache:
+    """
+    Two-level LRU cache (memory, then disk) with strong ETags and conditional GET handling.
+    The ETag is derived from the normalized request parameters and the software version, so a client
+    revalidating with If-None-Match gets a 304 without the response being computed or even loaded.
+    """
+
+    def __init__(self, folder: str, version: str = '', max_memory_bytes: int = 32 * 1024 * 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.folder = folder
+        self.version = version
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()  # key -> (mimetype, data)
+        self.memory_bytes = 0
+        self.disk = OrderedDict()  # key -> file size
+        self.disk_bytes = 0
+        self.counters = {'requests': 0, 'not_modified': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        os.makedirs(self.folder, exist_ok=True)
+        self._load_disk_index()
+
+    def _load_disk_index(self):
+        files = [entry for entry in os.scandir(self.folder) if entry.is_file() and not entry.name.endswith('.tmp')]
+        for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+            self.disk[entry.name] = entry.stat().st_size
+            self.disk_bytes += entry.stat().st_size
+
+    def key(self, route: str, params: dict) -> str:
+        normalized = json.dumps({'route': route, 'version': self.version, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """
+        Returns (mimetype, data) or None, entries found on disk are promoted to memory.
+        """
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return entry
+            if key not in self.disk:
+                self.counters['misses'] += 1
+                return None
+            self.disk.move_to_end(key)
+        try:
+            path = os.path.join(self.folder, key)
+            with open(path, 'rb') as f:
+                mimetype, data = f.read().split(b'\n', 1)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self.lock:
+                self.disk_bytes -= self.disk.pop(key, 0)
+                self.counters['misses'] += 1
+            return None
+        entry = (mimetype.decode('ascii'), data)
+        with self.lock:
+            self.counters['disk_hits'] += 1
+            self._put_memory(key, entry)
+        return entry
+
+    def put(self, key: str, data: bytes, mimetype: str):
+        entry = (mimetype, data)
+        with self.lock:
+            self._put_memory(key, entry)
+        content = mimetype.encode('ascii') + b'\n' + data
+        path = os.path.join(self.folder, key)
+        try:
+            with open(path + '.tmp', 'wb') as f:
+                f.write(content)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"[WARNING] Response cache could not write {path}: {e}")
+            return
+        with self.lock:
+            self.disk_bytes += len(content) - self.disk.pop(key, 0)
+            self.disk[key] = len(content)
+            while self.disk_bytes > self.max_disk_bytes and len(self.disk) > 1:
+                old_key, size = self.disk.popitem(last=False)
+                self.disk_bytes -= size
+                try:
+                    os.remove(os.path.join(self.folder, old_key))
+                except OSError:
+                    pass
+
+    def _put_memory(self, key: str, entry: tuple):
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key)[1])
+        self.memory[key] = entry
+        self.memory_bytes += len(entry[1])
+        while self.memory_bytes > self.max_memory_bytes and len(self.memory) > 1:
+            _, (_, data) = self.memory.popitem(last=False)
+            self.memory_bytes -= len(data)
+
+    def respond(self, route: str, params: dict, producer, max_age: int = 31536000, immutable: bool = True) -> Response:
+        """
+        Answers the current request from the cache, producer() returns (data, mimetype) on a cache miss.
+        """
+        key = self.key(route, params)
+        with self.lock:
+            self.counters['requests'] += 1
+        if request.if_none_match.contains(key):
+            with self.lock:
+                self.counters['not_modified'] += 1
+            response = Response(status=304)
+        else:
+            entry = self.get(key)
+            if entry is None:
+                data, mimetype = producer()
+                self.put(key, data, mimetype)
+            else:
+                mimetype, data = entry
+            response = Response(data, mimetype=mimetype)
+        response.set_etag(key)
+        response.headers['Cache-Control'] = f"public, max-age={max_age}" + (", immutable" if immutable else "")
+        return response
+
+    def stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self.memory)
+            stats['memory_bytes'] = self.memory_bytes
+            stats['disk_entries'] = len(self.disk)
+            stats['disk_bytes'] = self.disk_bytes
+        served = stats['not_modified'] + stats['memory_hits'] + stats['disk_hits']
+        stats['hit_rate'] = served / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    def clear(self):
+        with self.lock:
+            for key in self.disk:
+                try:
+                    os.remove(os.path.join(self.folder, key))
+                except OSError:
+                    pass
+            self.memory.clear()
+            self.disk.clear()
+            self.memory_bytes = 0
+            self.disk_bytes = 0
@@ -0,0 +1,137 @@
+# JSON serialization of the API responses, orjson when it is installed and the standard library otherwise,
+# plus gzip / brotli compression of large responses for clients which accept it
+import dataclasses
+import gzip
+import json
+import os
+import sys
+from datetime import date, datetime
+
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/csv'}
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+def _slot_names(cls) -> tuple:
+    names = []
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get('__slots__', ())
+        names.extend([slots] if isinstance(slots, str) else slots)
+    return tuple(name for name in names if not name.startswith('__'))
+
+
+def _default(obj):
+    """
+    Objects the JSON libraries do not know. Domain objects are written from their attributes directly, without
+    building the dict of to_dict() first (their to_dict() returns exactly these attributes).
+    """
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        # like orjson, fields starting with an underscore (e.g. the raw dates of the domain classes) are skipped
+        return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)
+                if not field.name.startswith('_')}
+    if hasattr(obj, 'tolist'):  # numpy arrays and scalars
+        return obj.tolist()
+    if hasattr(obj, '__dict__'):
+        return obj.__dict__
+    slots = _slot_names(type(obj))
+    if slots:
+        return {name: getattr(obj, name, None) for name in slots}
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """UTF-8 encoded JSON, dataclasses and datetimes are handled natively by orjson."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_response(obj, status: int = 200) -> Response:
+    return Response(dumps(obj), status=status, content_type='application/json; charset=utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using dumps / loads above, so jsonify and request.json use orjson as well."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def choose_encoding() -> str | None:
+    """The best compression the client of the current request accepts, None if none of them."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality('br') > 0:
+        return 'br'
+    if accepted.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data: bytes, encoding: str, level: int = 6) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def enable_compression(app, min_size: int = 1024, level: int = 6):
+    """
+    Compresses JSON and text responses of at least min_size bytes with brotli or gzip, if the client accepts it.
+    Strong ETags become weak, the compressed bytes differ from the ones the ETag was calculated for.
+    """
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 206, 304)
+                or response.status_code < 200 or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        encoding = choose_encoding()
+        if encoding is None:
+            return response
+        response.set_data(compress(data, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+if __name__ == "__main__":
+    from domains.aetherOneDomains import Case
+    case = Case('Example', 'mail@example.com', '#ff0000', 'Description', datetime.now(), datetime.now())
+    print(dumps([case, {'values': {1, 2}}]).decode('utf-8'))
+    print(json.dumps(case.to_dict()))
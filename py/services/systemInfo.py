@@ -0,0 +1,101 @@
+# System information for /ping and /systemInfo. The static facts are read once, the dynamic ones (free memory,
+# free disk, CPU load) at most every refresh_seconds, so the endpoints polled by the UI stay cheap.
+import json
+import os
+import platform as sys_platform
+import sys
+import threading
+import time
+
+import psutil
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.logService import get_logger
+
+log = get_logger('systemInfo')
+
+
+def detect_raspberry_pi() -> bool:
+    """Check if the computer is a Raspberry Pi."""
+    try:
+        if sys_platform.system() != "Linux":
+            return False
+
+        # Raspberry Pi specific device tree model
+        if os.path.exists('/sys/firmware/devicetree/base/model'):
+            with open('/sys/firmware/devicetree/base/model', 'r') as model_file:
+                model_info = model_file.read().strip('\x00\n ').lower()
+            log.debug("Device tree model %s", model_info)
+            if 'raspberry pi' in model_info:
+                return True
+
+        # CPU information of the Raspberry Pi hardware
+        with open('/proc/cpuinfo', 'r') as cpuinfo:
+            for line in cpuinfo:
+                if 'Hardware' in line and 'BCM' in line:
+                    return True
+                if 'Model' in line and 'Raspberry Pi' in line:
+                    return True
+    except Exception as e:
+        log.warning("Error while checking Raspberry Pi: %s", e)
+    return False
+
+
+class SystemInfo:
+
+    def __init__(self, raspberry_pi: bool, refresh_seconds: float = 30):
+        self.refresh_seconds = refresh_seconds
+        self.lock = threading.Lock()
+        self.static = {
+            'system': sys_platform.system(),
+            'release': sys_platform.release(),
+            'version': sys_platform.version(),
+            'architecture': sys_platform.architecture(),
+            'processor': sys_platform.processor(),
+            'cpu_count': psutil.cpu_count(logical=True),
+            'memory': psutil.virtual_memory().total,
+            'disk': self._disk_usage().total,
+            'raspberryPi': raspberry_pi,
+            'esp32available': False,
+            'arduinoavailable': False,
+        }
+        self.info = dict(self.static)
+        self.refreshed = None  # monotonic time of the last refresh of the dynamic values
+        psutil.cpu_percent(interval=None)  # the first call only starts the measurement
+
+    @staticmethod
+    def _disk_usage():
+        return psutil.disk_usage(os.path.abspath(os.sep))
+
+    def _dynamic(self) -> dict:
+        memory = psutil.virtual_memory()
+        disk = self._disk_usage()
+        return {
+            'memoryAvailable': memory.available,
+            'memoryPercent': memory.percent,
+            'diskFree': disk.free,
+            'cpuPercent': psutil.cpu_percent(interval=None),
+            'loadAverage': list(os.getloadavg()) if hasattr(os, 'getloadavg') else None,
+            'refreshed': time.time()
+        }
+
+    def snapshot(self) -> dict:
+        """
+        The static and dynamic values. A request arriving while another one refreshes gets the previous values
+        instead of waiting.
+        """
+        now = time.monotonic()
+        if self.refreshed is None or now - self.refreshed >= self.refresh_seconds:
+            if self.lock.acquire(blocking=self.refreshed is None):
+                try:
+                    if self.refreshed is None or now - self.refreshed >= self.refresh_seconds:
+                        self.info = {**self.static, **self._dynamic()}
+                        self.refreshed = time.monotonic()
+                finally:
+                    self.lock.release()
+        return self.info
+
+
+if __name__ == "__main__":
+    systemInfo = SystemInfo(detect_raspberry_pi(), refresh_seconds=1)
+    print(json.dumps(systemInfo.snapshot(), indent=2))
@@ -30,7 +30,8 @@ required_packages = [
     'psutil',
     'flasgger',
     'pywebview',
-    'screeninfo'
+    'screeninfo',
+    'orjson'
 ]
 
 
@@ -0,0 +1,127 @@
+import os, sys
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.stubHotbits import StubHotbitsService
+from domains.aetherOneDomains import Case, Catalog, Rate
+from services.analysisJobs import AnalysisJobRunner
+from services.analyzeService import replay_analysis
+from services.databaseService import CaseDAO
+
+
+class AnalysisJobsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.folder.name, 'hotbits'))
+        db_filename = os.path.join(self.folder.name, 'aetherone.db')
+        self.dao = CaseDAO(db_filename)
+        self.dao.insert_catalog(Catalog('Generated', '', ''))
+        self.dao.conn.executemany('INSERT INTO rate (signature, description, catalog_id) VALUES (?, ?, 1)',
+                                  [(f"Rate {n}", f"Description {n}") for n in range(300)])
+        self.case_ids = [self.dao.insert_case(Case(f"Case {n}", '', '#000000', '', datetime.now(), datetime.now()))
+                         for n in range(5)]
+        self.progress = []
+        self.hotbits = StubHotbitsService(os.path.join(self.folder.name, 'hotbits'), self.dao)
+        self.runner = AnalysisJobRunner(self.dao, db_filename, self.hotbits, self.progress.append, max_workers=2)
+
+    def tearDown(self):
+        self.runner.shutdown()
+        self.dao.close()
+        self.folder.cleanup()
+
+    def wait(self, job, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        while job.finished is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertIsNotNone(job.finished)
+
+    def test_cases_are_analyzed_on_the_pool(self):
+        analysis_ids = self.runner.analyses_for_cases(self.case_ids, 1, 'Weekly sweep')
+        job = self.runner.submit(analysis_ids)
+        self.wait(job)
+        self.assertEqual('finished', job.status)
+        self.assertEqual(5 * 24, job.rates)
+        for analysis_id in analysis_ids:
+            rates = self.dao.list_rates_for_analysis(analysis_id)
+            self.assertEqual(24, len(rates))
+            self.assertGreaterEqual(max(rate.energetic_value for rate in rates), 1000)
+        self.assertEqual(list(range(6)), sorted({update['done'] for update in self.progress}))
+        self.assertEqual('finished', self.progress[-1]['status'])
+
+    def test_workers_see_changed_catalogs(self):
+        analysis_ids = self.runner.analyses_for_cases(self.case_ids, 1, 'Before the import')
+        self.wait(self.runner.submit(analysis_ids))
+        for rate_id in range(1, 291):
+            self.dao.delete_rate(rate_id)
+        self.dao.insert_rate(Rate('Arnica', 'Bruises', 1))
+
+        analysis_ids = self.runner.analyses_for_cases(self.case_ids, 1, 'After the import')
+        job = self.runner.submit(analysis_ids)
+        self.wait(job)
+        self.assertEqual('finished', job.status)
+        for analysis_id in analysis_ids:
+            rates = self.dao.list_rates_for_analysis(analysis_id)
+            self.assertEqual(11, len(rates))
+            self.assertEqual({f"Rate {n}" for n in range(290, 300)} | {'Arnica'}, {rate.signature for rate in rates})
+            self.assertNotIn('', {rate.description for rate in rates})
+
+    def test_analyses_running_short_of_hotbits_get_more(self):
+        settings = self.dao.loadSettings()
+        settings['recordEntropyStreams'] = True
+        self.dao.saveSettings(settings)
+        analysis_ids = self.runner.analyses_for_cases(self.case_ids[:2], 1, 'Advanced sweep')
+        with mock.patch('services.analysisJobs.entropy_budget', return_value=1000):
+            job = self.runner.submit(analysis_ids, advanced=True, auto_check_gv=True)
+            self.wait(job)
+        self.assertEqual(('finished', {}), (job.status, job.failed))
+
+        catalogs = [self.dao.get_catalog_columns(1)]
+        drawn = 0
+        for analysis_id in analysis_ids:
+            stream = self.dao.get_entropy_stream_for_analysis(analysis_id)
+            drawn += stream['draws']
+            # no pseudo random fallback: the recorded hotbits replay the stored result
+            rates = self.dao.list_rates_for_analysis(analysis_id)
+            replayed = replay_analysis(analysis_id, catalogs, stream['values'], stream['parameters'])
+            self.assertEqual(sorted((rate.signature, rate.energetic_value, rate.gv) for rate in rates),
+                             sorted((rate.signature, rate.energetic_value, rate.gv) for rate in replayed))
+        # the hotbits not drawn went back to the pool
+        self.assertEqual(drawn, self.hotbits.draw_count)
+        self.assertEqual(0, self.hotbits.lent)
+
+    def test_analyses_fail_without_hotbits(self):
+        analysis_ids = self.runner.analyses_for_cases(self.case_ids[:2], 1, 'Empty pool')
+        self.hotbits.getHotbits = lambda: []
+        job = self.runner.submit(analysis_ids)
+        self.wait(job)
+        self.assertEqual('failed', job.status)
+        self.assertEqual(set(analysis_ids), set(job.failed))
+        self.assertEqual((0, 0, []), (self.hotbits.draw_count, self.hotbits.lent, self.hotbits.hotbits))
+
+        # three refills cover the blocks but not the analyses running short, the pool gets its hotbits back
+        refills = [list(range(100 * n, 100 * n + 100)) for n in range(3)]
+        self.hotbits.getHotbits = lambda: refills.pop(0) if refills else []
+        with mock.patch('services.analysisJobs.entropy_budget', return_value=150):
+            job = self.runner.submit(analysis_ids)
+            self.wait(job)
+        self.assertEqual(('failed', set(analysis_ids)), (job.status, set(job.failed)))
+        self.assertEqual((0, 0), (self.hotbits.draw_count, self.hotbits.lent))
+        self.assertEqual(list(range(300)), sorted(self.hotbits.hotbits))
+        self.assertEqual([], self.dao.list_rates_for_analysis(analysis_ids[0]))
+
+    def test_invalid_requests(self):
+        with self.assertRaises(ValueError):
+            self.runner.submit([])
+        with self.assertRaises(ValueError):
+            self.runner.submit([12345])
+        with self.assertRaises(ValueError):
+            self.runner.analyses_for_cases([12345], 1, 'Unknown case')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os, sys
+import socket
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REMOTE = {'REMOTE_ADDR': '10.0.0.5'}
+
+
+class AppEndpointsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        from main import AetherOnePy
+        self.folder = tempfile.TemporaryDirectory()
+        self.aetherOnePy = AetherOnePy('production', project_root=self.folder.name, collect_hotbits=False)
+        self.client = self.aetherOnePy.app.test_client()
+
+    def tearDown(self):
+        self.aetherOnePy.rateCardBatch.shutdown()
+        self.aetherOnePy.analysisJobs.shutdown()
+        self.aetherOnePy.aetherOneDB.close()
+        self.folder.cleanup()
+
+    def test_admin_token_is_not_readable_nor_writable_by_clients(self):
+        settings = self.client.get('/settings').get_json()
+        self.assertNotIn('adminToken', settings)
+
+        # without a token only this machine may set one
+        self.assertEqual(403, self.client.post('/settings', json=dict(settings, adminToken='mine'),
+                                               environ_base=REMOTE).status_code)
+        response = self.client.post('/settings', json=dict(settings, adminToken='secret'))
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn('adminToken', response.get_json())
+        self.assertEqual('secret', self.aetherOnePy.aetherOneDB.get_setting('adminToken'))
+
+        # the settings of the UI come without the token and keep it
+        self.assertEqual(200, self.client.post('/settings', json=dict(settings, analysisAlwaysCheckGV=True),
+                                               environ_base=REMOTE).status_code)
+        self.assertEqual('secret', self.aetherOnePy.aetherOneDB.get_setting('adminToken'))
+        self.assertNotIn('adminToken', self.client.get('/settings').get_json())
+
+        # changing it needs the current one, also from this machine
+        self.assertEqual(403, self.client.post('/settings', json=dict(settings, adminToken='')).status_code)
+        self.assertEqual(403, self.client.get('/admin/profiler', environ_base=REMOTE).status_code)
+        response = self.client.post('/settings', json=dict(settings, adminToken='other'),
+                                    headers={'X-Admin-Token': 'secret'}, environ_base=REMOTE)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('other', self.aetherOnePy.aetherOneDB.get_setting('adminToken'))
+
+    def test_ping_reports_readiness(self):
+        response = self.client.get('/ping')
+        self.assertEqual(503, response.status_code)
+        self.assertEqual({'ready': False}, response.get_json())
+
+        # the server is ready once its port accepts connections
+        with socket.create_server(('127.0.0.1', 0)) as listening:
+            self.aetherOnePy.mark_ready_when_listening(listening.getsockname()[1], timeout=5)
+        response = self.client.get('/ping')
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.get_json()['ready'])
+        self.assertGreaterEqual(response.get_json()['startupSeconds'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os, sys
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from domains.aetherOneDomains import ScheduledBroadcast
+from services.databaseService import CaseDAO
+from services.broadcastScheduler import BroadcastScheduler
+from services.planetaryInfluence import PlanetaryRulershipCalendarAPI
+
+
+class BroadcastSchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.dao = CaseDAO(os.path.join(self.folder.name, 'test.db'))
+        self.api = PlanetaryRulershipCalendarAPI(2025, 2027)
+        self.submitted = []
+        self.done = threading.Event()
+
+    def tearDown(self):
+        self.dao.close()
+        self.folder.cleanup()
+
+    def submit(self, job):
+        self.submitted.append(job.signature)
+        if len(self.submitted) == 2:
+            self.done.set()
+
+    def test_runs_due_jobs_in_order(self):
+        scheduler = BroadcastScheduler(self.dao, self.api, self.submit)
+        scheduler.start()
+        now = datetime.now()
+        scheduler.schedule(ScheduledBroadcast('second', run_at=now + timedelta(milliseconds=200)))
+        scheduler.schedule(ScheduledBroadcast('first', run_at=now + timedelta(milliseconds=100)))
+        scheduler.schedule(ScheduledBroadcast('later', run_at=now + timedelta(hours=2)))
+        self.assertTrue(self.done.wait(5))
+        scheduler.stop()
+        self.assertEqual(self.submitted, ['first', 'second'])
+        # one wake-up per job, plus at most one per insertion of an earlier job
+        self.assertLessEqual(scheduler.stats()['wakeups'], 4)
+        self.assertEqual([job.signature for job in self.dao.list_scheduled_broadcasts()], ['later'])
+
+    def test_next_planetary_slot_survives_restart(self):
+        scheduler = BroadcastScheduler(self.dao, self.api, self.submit)
+        job = ScheduledBroadcast('Calendula', planet='Venus', recurring=True)
+        # Monday: the first hour belongs to the Moon, the Venus hour follows five hours later
+        self.assertEqual(scheduler.next_run(job, datetime(2026, 1, 5, 0, 30)), datetime(2026, 1, 5, 5))
+        self.assertEqual(scheduler.next_run(job, datetime(2026, 1, 5, 5, 30)), datetime(2026, 1, 5, 5, 30))
+        scheduler.schedule(job)
+
+        # what a restarted scheduler loads, without starting a thread that could already run the due job
+        self.assertEqual([(loaded.id, loaded.planet, loaded.next_run) for loaded in self.dao.list_scheduled_broadcasts()],
+                         [(job.id, 'Venus', job.next_run)])
+
+if __name__ == "__main__":
+    unittest.main()
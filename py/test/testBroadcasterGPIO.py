@@ -0,0 +1,73 @@
+import os, sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.broadcastService import BroadcastService
+from services.broadcasterGPIO import GPIOBroadcaster, compile_schedule, create_pin_factory
+
+
+class SettingsStub:
+    def __init__(self, settings):
+        self.settings = settings
+
+    def loadSettings(self):
+        return self.settings
+
+
+class GPIOBroadcasterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = SettingsStub({"gpioRED": 26, "gpioBLUE": 19, "gpioGREEN": 13, "gpioLASER": 6,
+                                      "gpioWHITE": 12, "gpioSleep": 0.005})
+        self.broadcaster = GPIOBroadcaster(self.settings, create_pin_factory(mock=True))
+
+    def tearDown(self):
+        self.broadcaster.close()
+
+    def test_schedule(self):
+        """'A' is ASCII 65, digit 6 lights RED and digit 5 lights WHITE."""
+        schedule = compile_schedule("A", self.broadcaster.digit_masks)
+        red = 1 << self.broadcaster.pins.index(26)
+        white = 1 << self.broadcaster.pins.index(12)
+        self.assertEqual(schedule, (red, white))
+
+    def test_broadcast_timing(self):
+        stats = self.broadcaster.broadcast("AetherOne", 0.2)
+        self.assertEqual(stats['steps'], 40)
+        self.assertLess(stats['mean_lateness'], 0.005)
+        # all LEDs are switched off after broadcasting but stay open
+        self.assertEqual(len(self.broadcaster.leds), 5)
+        self.assertTrue(all(not led.is_lit for led in self.broadcaster.leds))
+
+    def test_stop(self):
+        stats = self.broadcaster.broadcast("AetherOne", 10, should_stop=lambda: True)
+        self.assertEqual(stats['steps'], 0)
+
+    def test_reconfigure(self):
+        self.settings.settings["gpioRED"] = "not a pin"
+        self.broadcaster.configure(self.settings)
+        self.assertEqual(len(self.broadcaster.leds), 4)
+        self.assertNotIn(26, self.broadcaster.pins)
+
+    def test_settings_are_saved_during_a_broadcast(self):
+        service = BroadcastService(None, SimpleNamespace(PROJECT_ROOT='', aetherOneDB=self.settings))
+        service.gpio_broadcaster = self.broadcaster
+        broadcast = threading.Thread(target=lambda: service.get_gpio_broadcaster().broadcast("AetherOne", 0.5))
+        broadcast.start()
+        time.sleep(0.05)
+        self.settings.settings["gpioRED"] = 21
+        start = time.monotonic()
+        service.reload_gpio_settings()
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertIn(26, self.broadcaster.pins)  # the running broadcast keeps its pins
+        broadcast.join()
+        # the next broadcast uses the new pins
+        self.assertIs(self.broadcaster, service.get_gpio_broadcaster())
+        self.assertEqual([21, 19, 13, 6, 12], self.broadcaster.pins)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os, sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.captureRandomnessFromRaspberryPi import RandomNumberGenerator, read_random_bytes, read_random_integers
+from services.hotbitsService import HotbitsService, HotbitsSource, DEV_RANDOM_POOL
+
+
+class RaspberryPiRandomTestCase(unittest.TestCase):
+
+    def test_dev_random(self):
+        self.assertEqual(100000, len(read_random_bytes(100000)))
+        rng = RandomNumberGenerator(1000)
+        rng.generate_numbers()
+        numbers = rng.get_numbers()
+        self.assertEqual(1000, len(set(numbers)))
+        self.assertTrue(all(0 <= number < 2 ** 32 for number in numbers))
+
+    def test_duplicates_are_replaced_by_reading_on(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'random')
+            with open(path, 'wb') as f:
+                f.write(np.array([1, 2, 3, 3, 3, 4, 5], dtype='>u4').tobytes())
+            with open(path, 'rb') as f:
+                self.assertEqual([1, 2], read_random_integers(2, f).tolist())
+                self.assertEqual([3], read_random_integers(1, f).tolist())
+
+            rng = RandomNumberGenerator(4, path)
+            rng.generate_numbers()
+            self.assertEqual([1, 2, 3, 4], rng.get_numbers())
+
+            # a source repeating itself fails instead of looping forever
+            with open(path, 'wb') as f:
+                f.write(np.array([7] * 100, dtype='>u4').tobytes())
+            rng = RandomNumberGenerator(2, path)
+            with self.assertRaises(RuntimeError):
+                rng.generate_numbers()
+            self.assertEqual([7], rng.get_numbers())
+
+            # the end of the source or a missing source only log an error
+            for rng in (RandomNumberGenerator(200, path), RandomNumberGenerator(2, os.path.join(folder, 'missing'))):
+                rng.generate_numbers()
+                self.assertEqual([], rng.get_numbers())
+
+    def test_pool_is_refilled_in_bulk(self):
+        with tempfile.TemporaryDirectory() as folder:
+            hotbits = HotbitsService(HotbitsSource.RASPBERRY_PI, folder, None, None, raspberryPi=True)
+            hotbits.getInt(0, 10)
+            self.assertEqual(DEV_RANDOM_POOL - 1, len(hotbits.hotbits))
+            self.assertEqual(DEV_RANDOM_POOL - 1001, len(hotbits.hotbits) - hotbits.takeHotbits(1000).size)
+
+
+if __name__ == '__main__':
+    unittest.main()
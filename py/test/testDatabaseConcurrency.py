@@ -0,0 +1,68 @@
+import os, sys
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from domains.aetherOneDomains import Analysis, AnalysisRate, Case, Catalog, Session
+from services.databaseService import CaseDAO
+
+
+class DatabaseConcurrencyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.dao = CaseDAO(os.path.join(self.folder.name, 'aetherone.db'))
+        self.dao.insert_catalog(Catalog('Generated', '', ''))
+        case_id = self.dao.insert_case(Case('Case', '', '#000000', '', datetime.now(), datetime.now()))
+        session = Session('Intention', '', case_id)
+        self.dao.insert_session(session)
+        self.analysis_ids = [self.dao.insert_analysis(Analysis(f"Note {n}", session.id)).id for n in range(5)]
+
+    def tearDown(self):
+        self.dao.close()
+        self.folder.cleanup()
+
+    def test_writers_of_several_threads(self):
+        errors = []
+
+        def rates(analysis_id: int):
+            return [AnalysisRate(f"Rate {n}", '', 1, analysis_id, n, 0, 0, '', 0, '') for n in range(50)]
+
+        def write(writer: int):
+            analysis_id = self.analysis_ids[writer]
+            try:
+                for n in range(30):
+                    self.dao.insert_rates_for_analysis(rates(analysis_id))
+                    self.dao.insert_entropy_streams([(f"stream {writer} {n}", analysis_id, [n] * 100, {})])
+                    self.dao.insert_case(Case(f"Case {writer} {n}", '', '#000000', '', datetime.now(), datetime.now()))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(writer,)) for writer in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
+        self.assertFalse(self.dao.conn.in_transaction)
+        for analysis_id in self.analysis_ids[:4]:
+            self.assertEqual(30 * 50, len(self.dao.list_rates_for_analysis(analysis_id)))
+        self.assertEqual(121, len(self.dao.list_cases()))
+        self.assertEqual(120, self.dao.conn.execute('SELECT COUNT(*) FROM entropy_stream').fetchone()[0])
+
+        # a failing transaction is rolled back with the rows written so far
+        analysis_id = self.analysis_ids[4]
+        broken = SimpleNamespace(to_tuple=lambda: ('too', 'few'))
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.dao.insert_rates_for_analysis(rates(analysis_id) + [broken])
+        self.assertEqual([], self.dao.list_rates_for_analysis(analysis_id))
+        self.assertFalse(self.dao.conn.in_transaction)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os, sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from domains.aetherOneDomains import Case, Session, Catalog, Rate
+from services.databaseService import CaseDAO
+
+
+class DomainsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.dao = CaseDAO(os.path.join(self.folder.name, 'aetherone.db'))
+
+    def tearDown(self):
+        self.dao.close()
+        self.folder.cleanup()
+
+    def test_objects_are_slotted(self):
+        rate = Rate('Arnica', 'Bruises', 1)
+        self.assertEqual(0, rate.id)
+        self.assertFalse(hasattr(rate, '__dict__'))
+        with self.assertRaises(AttributeError):
+            rate.value = 1
+
+    def test_dates_are_parsed_on_first_access(self):
+        case_id = self.dao.insert_case(Case('Case', 'mail@example.com', '#ff0000', '', datetime.now(), datetime.now()))
+        self.dao.insert_session(Session('Intention', 'Description', case_id))
+        session = self.dao.list_sessions(case_id)[0]
+        self.assertIsInstance(session._raw_created, str)
+        self.assertEqual(datetime.fromisoformat(session._raw_created), session.created)
+        self.assertEqual({'id', 'intention', 'description', 'created', 'caseID'}, set(session.to_dict()))
+
+        case = self.dao.get_case(case_id)
+        self.assertEqual('Case', case.name)
+        self.assertIsInstance(case.last_change, datetime)
+        with self.assertRaises(AttributeError):
+            case.unknown
+
+    def test_rates_from_catalog(self):
+        self.dao.insert_catalog(Catalog('Clarke', 'Materia Medica', 'John Henry Clarke'))
+        catalog = self.dao.get_catalog_by_name('Clarke')
+        self.assertIsInstance(catalog.importdate, datetime)
+        for signature in ('Arnica', 'Sulfur'):
+            self.dao.insert_rate(Rate(signature, '', catalog.id))
+        rates = self.dao.list_rates_from_catalog(catalog.id)
+        self.assertEqual(['Arnica', 'Sulfur'], [rate.signature for rate in rates])
+        self.assertEqual(catalog.id, rates[0].catalogID)
+
+
+if __name__ == '__main__':
+    unittest.main()
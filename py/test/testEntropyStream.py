@@ -0,0 +1,78 @@
+import os, sys
+import random
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.stubHotbits import StubHotbitsService
+from domains.aetherOneDomains import Analysis, Case, Catalog, Session
+from services.analyzeService import analyze_catalogs, replay_analysis
+from services.databaseService import CaseDAO
+from services.entropyStream import EntropyStream
+
+
+class EntropyStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.dao = CaseDAO(os.path.join(self.folder.name, 'aetherone.db'))
+        self.dao.insert_catalog(Catalog('Generated', '', ''))
+        self.catalog_id = self.dao.get_catalog_by_name('Generated').id
+        self.dao.conn.executemany('INSERT INTO rate (signature, description, catalog_id) VALUES (?, ?, ?)',
+                                  [(f"Rate {n}", '', self.catalog_id) for n in range(300)])
+        os.makedirs(os.path.join(self.folder.name, 'hotbits'))
+        self.hotbits = StubHotbitsService(os.path.join(self.folder.name, 'hotbits'), self.dao)
+
+    def tearDown(self):
+        self.dao.close()
+        self.folder.cleanup()
+
+    def test_analysis_is_replayed_from_the_stored_stream(self):
+        case_id = self.dao.insert_case(Case('Case', '', '#000000', '', datetime.now(), datetime.now()))
+        session = Session('Intention', '', case_id)
+        self.dao.insert_session(session)
+        analysis_id = self.dao.insert_analysis(Analysis('Note', session.id)).id
+        catalogs = [self.dao.get_catalog_columns(self.catalog_id)]
+        parameters = {'catalog_ids': [self.catalog_id], 'advanced': True, 'auto_check_gv': True, 'top_n': 10}
+
+        state = random.getstate()
+        stream = EntropyStream(source=self.hotbits)
+        rates = analyze_catalogs(analysis_id, catalogs, stream, True, True, 10)
+        self.assertEqual(state, random.getstate())
+        self.assertEqual(stream.draw_count, self.hotbits.draw_count)
+
+        self.dao.insert_entropy_streams([(stream.id, analysis_id, stream.recorded(), parameters)])
+        stored = self.dao.get_entropy_stream_for_analysis(analysis_id)
+        self.assertEqual(stream.id, stored['id'])
+        self.assertEqual(parameters, stored['parameters'])
+        replayed = replay_analysis(analysis_id, catalogs, stored['values'], stored['parameters'])
+        self.assertEqual([(r.signature, r.energetic_value, r.gv) for r in rates],
+                         [(r.signature, r.energetic_value, r.gv) for r in replayed])
+
+        # only the newest streams are kept
+        settings = self.dao.loadSettings()
+        settings['entropyStreamsKept'] = 3
+        self.dao.saveSettings(settings)
+        self.dao.insert_entropy_streams([(f"stream {n}", analysis_id, [n], parameters) for n in range(5)])
+        self.assertIsNone(self.dao.get_entropy_stream(stream.id))
+        self.assertIsNone(self.dao.get_entropy_stream('stream 1'))
+        self.assertEqual([4], self.dao.get_entropy_stream('stream 4')['values'].tolist())
+        self.assertEqual(3, self.dao.conn.execute('SELECT COUNT(*) FROM entropy_stream').fetchone()[0])
+
+    def test_replay_does_not_draw_more_than_recorded(self):
+        stream = EntropyStream(source=self.hotbits)
+        values = stream.getInts(0, 10, 5)
+        replay = EntropyStream.replay(stream.recorded())
+        self.assertEqual(values.tolist(), replay.getInts(0, 10, 5).tolist())
+        with self.assertRaises(RuntimeError):
+            replay.getInt(0, 10)
+
+    def test_hotbits_service_keeps_the_global_random_state(self):
+        state = random.getstate()
+        self.hotbits.getInt(1, 6)
+        self.assertEqual(state, random.getstate())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os, sys
+import json
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.hotbitsHealth import HealthTests, HotbitsHealth, repetition_count_cutoff, adaptive_proportion_cutoff
+
+
+class HotbitsHealthTestCase(unittest.TestCase):
+
+    def test_cutoffs_of_sp_800_90b(self):
+        # binary samples with one bit of entropy and a false positive probability of 2^-20
+        self.assertEqual(21, repetition_count_cutoff(1.0, 20))
+        self.assertEqual(589, adaptive_proportion_cutoff(1.0, 1024, 20))
+
+    def test_result_does_not_depend_on_the_batches(self):
+        bits = np.random.default_rng(5).integers(0, 2, 50000).astype(np.uint8)
+        bits[20000:20040] = 1
+        whole, split = HealthTests('whole', 1.0), HealthTests('split', 1.0)
+        whole.feed(bits)
+        for batch in np.array_split(bits, 37):
+            split.feed(batch)
+        self.assertEqual(1, whole.rct_failures)
+        for field in ('rct_failures', 'apt_failures', 'longest_run', 'bits'):
+            self.assertEqual(getattr(whole, field), getattr(split, field))
+
+    def test_bad_sources_are_quarantined(self):
+        with tempfile.TemporaryDirectory() as folder:
+            health = HotbitsHealth(folder, 0.5)
+            rng = np.random.default_rng(1)
+            for _ in range(5):
+                self.assertTrue(health.check('webCam', rng.integers(0, 2, 100000)))
+            self.assertFalse(health.check('frozen', np.zeros(100000, dtype=np.uint8)))
+            self.assertFalse(health.check('alternating', np.tile([0, 1], 50000)))
+            path = health.quarantine('frozen', {'integerList': [0] * 10, 'source': 'frozen'})
+            with open(path, 'r') as f:
+                self.assertEqual(1, json.load(f)['health']['quarantined'])
+
+            # the snapshots are shared with other processes through the health folder
+            report = HotbitsHealth(folder).report()
+            self.assertEqual({'webCam', 'frozen', 'alternating'}, set(report))
+            self.assertEqual(0, report['webCam']['quarantined'])
+            self.assertGreater(report['webCam']['min_entropy'], 0.95)
+            self.assertLess(report['alternating']['min_entropy'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
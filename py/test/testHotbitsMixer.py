@@ -0,0 +1,105 @@
+import os, sys
+import json
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.hotbitsHealth import HotbitsHealth
+from services.hotbitsMixer import HotbitsMixer, HotbitsProducer, SerialProducer, von_neumann
+
+
+class ArrayProducer(HotbitsProducer):
+    def __init__(self, name, bits):
+        self.name = name
+        self.bits = bits
+
+    def read(self):
+        time.sleep(0.001)
+        return self.bits
+
+
+class HotbitsMixerTestCase(unittest.TestCase):
+
+    def test_von_neumann(self):
+        self.assertEqual([0, 1], von_neumann([0, 1, 1, 0, 0, 0, 1, 1, 1]).tolist())
+        biased = (np.random.default_rng(1).random(200000) < 0.8).astype(np.uint8)
+        self.assertAlmostEqual(0.5, von_neumann(biased).mean(), delta=0.01)
+
+    def test_sources_are_mixed_into_files(self):
+        rng = np.random.default_rng(2)
+        for extractor in ('sha256', 'xor'):
+            with tempfile.TemporaryDirectory() as folder:
+                health = HotbitsHealth(folder)
+                mixer = HotbitsMixer(folder, [ArrayProducer('webCam', None), ArrayProducer('esp', None)],
+                                     health, extractor, file_integers=100)
+                for _ in range(4):
+                    mixer.feed('webCam', rng.integers(0, 2, 20000))
+                    mixer.feed('esp', rng.integers(0, 2, 20000))
+                mixer.feed('esp', np.zeros(20000, dtype=np.uint8))  # fails the health tests
+                files = [name for name in os.listdir(folder) if name.endswith('.json')]
+                self.assertGreater(len(files), 1)
+                contributions = {'webCam': 0, 'esp': 0}
+                for name in files:
+                    with open(os.path.join(folder, name), 'r') as f:
+                        data = json.load(f)
+                    self.assertEqual(100, len(data['integerList']))
+                    self.assertEqual(('mixed', extractor), (data['source'], data['extractor']))
+                    for source, count in data['contributions'].items():
+                        contributions[source] += count
+                self.assertGreater(contributions['webCam'], 0)
+                self.assertGreater(contributions['esp'], 0)
+
+                report = mixer.report()
+                self.assertEqual(1, report['sources']['esp']['quarantined_batches'])
+                self.assertEqual(0, report['sources']['webCam']['quarantined_batches'])
+                self.assertAlmostEqual(0.5, report['sources']['webCam']['contribution'], delta=0.05)
+
+    def test_input_is_scaled_by_the_assumed_min_entropy(self):
+        rng = np.random.default_rng(4)
+        with tempfile.TemporaryDirectory() as folder:
+            health = HotbitsHealth(folder, source_min_entropy={'timeLoop': 0.1})
+            mixer = HotbitsMixer(folder, [ArrayProducer('timeLoop', None), ArrayProducer('devRandom', None)],
+                                 health, 'sha256', file_integers=100)
+            mixer.feed('timeLoop', rng.integers(0, 2, 20000))
+            debiased_bytes = mixer.report()['sources']['timeLoop']['debiased_bits'] // 8
+            # 320 bytes of the time loop are credited with 256 bits, one block of 32 bytes
+            self.assertEqual(debiased_bytes // 320 * 32, mixer.output_bytes)
+            self.assertEqual(debiased_bytes % 320, mixer.report()['sources']['timeLoop']['buffered_bytes'])
+
+            mixer.feed('devRandom', rng.integers(0, 2, 2000))
+            report = mixer.report()['sources']
+            self.assertEqual((0.1, 0.5), (report['timeLoop']['assumed_min_entropy'],
+                                          report['devRandom']['assumed_min_entropy']))
+            self.assertGreater(report['devRandom']['contributed_bytes'], 0)
+            # every block of 32 bytes is hashed from input credited with at least 256 bits, less is left over
+            credited = 0.8 * report['timeLoop']['contributed_bytes'] + 4 * report['devRandom']['contributed_bytes']
+            self.assertGreaterEqual(credited, 256 * mixer.output_bytes / 32)
+            self.assertLess(0.8 * report['timeLoop']['buffered_bytes'] + 4 * report['devRandom']['buffered_bytes'], 256)
+
+            # xor does not add up entropy, the time loop is left out
+            mixer = HotbitsMixer(folder, [ArrayProducer('timeLoop', None), ArrayProducer('devRandom', None)],
+                                 health, 'xor', file_integers=100)
+            mixer.feed('timeLoop', rng.integers(0, 2, 20000))
+            self.assertEqual(0, mixer.output_bytes)
+            self.assertIsNotNone(mixer.report()['sources']['timeLoop']['error'])
+            self.assertEqual(['devRandom'], list(mixer.producers))
+
+    def test_threads_of_the_producers(self):
+        with tempfile.TemporaryDirectory() as folder:
+            # a serial device is read like a file when pyserial is not installed, a missing one is reported
+            mixer = HotbitsMixer(folder, [ArrayProducer('webCam', np.random.default_rng(3).integers(0, 2, 8000)),
+                                          SerialProducer('arduino', os.path.join(folder, 'missing'))],
+                                 file_integers=100, max_files=3)
+            mixer.start()
+            time.sleep(0.5)
+            mixer.stop()
+            report = mixer.report()
+            self.assertIsNotNone(report['sources']['arduino']['error'])
+            self.assertEqual(3, len([name for name in os.listdir(folder) if name.endswith('.json')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
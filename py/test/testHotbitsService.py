@@ -0,0 +1,97 @@
+import os, sys
+import json
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.analyzeService import checkGeneralVitalityBatch
+from services.databaseService import CaseDAO
+from services.entropyStream import EntropyStream
+from services.hotbitsService import HotbitsExhausted, HotbitsService, HotbitsSource
+
+
+class HotbitsServiceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.dao = CaseDAO(os.path.join(self.folder.name, 'aetherone.db'))
+        self.hotbits_folder = os.path.join(self.folder.name, 'hotbits')
+        os.makedirs(self.hotbits_folder)
+        self.hotbits = HotbitsService(HotbitsSource.WEBCAM, self.hotbits_folder, self.dao, None)
+
+    def tearDown(self):
+        self.dao.close()
+        self.folder.cleanup()
+
+    def write_hotbits(self, name, integers):
+        with open(os.path.join(self.hotbits_folder, name), 'w') as f:
+            json.dump({'integerList': integers, 'source': 'test'}, f)
+
+    def test_take_hotbits_counts_only_real_hotbits(self):
+        self.write_hotbits('hotbits_1.json', list(range(100)))
+        self.write_hotbits('hotbits_2.json', list(range(100, 200)))
+        block = self.hotbits.takeHotbits(150)
+        self.assertEqual(150, block.size)
+        self.assertEqual(150, len(set(block.tolist())))
+        self.assertEqual(150, self.hotbits.draw_count)
+        self.assertEqual(50, len(self.hotbits.hotbits))
+
+        self.hotbits.getHotbits = lambda: []  # no more hotbits files or time loop
+        block = self.hotbits.takeHotbits(80)
+        self.assertEqual(80, block.size)
+        self.assertEqual(200, self.hotbits.draw_count)
+
+    def test_strict_blocks_are_real_hotbits(self):
+        self.hotbits.getHotbits = lambda: []
+        self.hotbits.hotbits = list(range(60))
+        with self.assertRaises(HotbitsExhausted):
+            self.hotbits.takeHotbits(100, strict=True)
+        self.assertEqual((list(range(60)), 0, 0), (self.hotbits.hotbits, self.hotbits.draw_count, self.hotbits.lent))
+
+        block = self.hotbits.takeHotbits(50, strict=True)
+        self.assertEqual((50, 50), (self.hotbits.draw_count, self.hotbits.lent))
+        self.hotbits.returnHotbits(block, 20)
+        self.assertEqual(list(range(20, 60)), self.hotbits.hotbits)
+        self.assertEqual((20, 0), (self.hotbits.draw_count, self.hotbits.lent))
+        # the counters of the metrics only grow
+        self.assertEqual((50, 30), (self.hotbits.taken_total, self.hotbits.returned_total))
+
+        # the pseudo random numbers of a block which is not strict cannot be put into the pool
+        self.hotbits.hotbits = []
+        block = self.hotbits.takeHotbits(100)
+        with self.assertRaises(ValueError):
+            self.hotbits.returnHotbits(block, 10)
+        self.assertEqual(([], 20), (self.hotbits.hotbits, self.hotbits.draw_count))
+
+    def test_get_ints_has_no_modulo_bias(self):
+        # 2^32 % 3 == 1, so the largest hotbit is rejected, the next but one takes its place
+        self.hotbits.hotbits = [2 ** 32 - 1, 5, 7]
+        self.assertEqual([7 % 3, 5 % 3], self.hotbits.getInts(0, 2, 2).tolist())
+        self.assertEqual(3, self.hotbits.draw_count)
+
+        hotbits = np.random.default_rng(1).integers(0, 2 ** 32, 60000)
+        self.hotbits.hotbits = hotbits.tolist()
+        ints = self.hotbits.getInts(1, 6, 60000)
+        self.assertEqual((1, 6), (ints.min(), ints.max()))
+        self.assertTrue(np.all(np.abs(np.bincount(ints)[1:] - 10000) < 400))
+        # an entropy stream maps the same hotbits to the same integers
+        self.assertEqual(ints.tolist(), EntropyStream(hotbits).getInts(1, 6, 60000).tolist())
+
+    def test_general_vitality_batch(self):
+        # the first GV is the highest of 999, 0, 0, the dice 60 are added, 10 ends the rolls
+        self.hotbits.hotbits = [999, 0, 0, 500, 20, 30, 60, 10]
+        self.assertEqual([1059, 500], checkGeneralVitalityBatch(self.hotbits, 2))
+
+        self.hotbits.hotbits = np.random.default_rng(2).integers(0, 2 ** 32, 10000).tolist()
+        gv = checkGeneralVitalityBatch(self.hotbits, 1000)
+        self.assertEqual(1000, len(gv))
+        self.assertTrue(all(value >= 0 for value in gv))
+        # P(GV > 950) = 1 - (951/1001)^3, about 14.3 %
+        self.assertAlmostEqual(143, sum(value > 950 for value in gv), delta=40)
+        self.assertEqual([], checkGeneralVitalityBatch(self.hotbits, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
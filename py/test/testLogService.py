@@ -0,0 +1,54 @@
+import os, sys
+import json
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.logService import setup_logging, shutdown_logging, get_logger, fields, sampled
+
+
+class ExpensiveRepr:
+    calls = 0
+
+    def __repr__(self):
+        ExpensiveRepr.calls += 1
+        return 'expensive'
+
+
+class LogServiceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.log = get_logger('test')
+
+    def tearDown(self):
+        shutdown_logging()
+        self.folder.cleanup()
+
+    def read_records(self) -> list:
+        shutdown_logging()  # writes the queued records
+        with open(os.path.join(self.folder.name, 'aetherone.log'), encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_structured_fields_and_sampling(self):
+        setup_logging(self.folder.name, 'INFO', sample_interval=60)
+        self.log.info("Broadcast cycle finished", extra=fields(signature='Arnica', draws=12))
+        for _ in range(100):
+            self.log.info("Retrying", extra=sampled('test.retry'))
+
+        records = self.read_records()
+        self.assertEqual(2, len(records))
+        self.assertEqual('Arnica', records[0]['signature'])
+        self.assertEqual(12, records[0]['draws'])
+        self.assertEqual('aetherone.test', records[1]['logger'])
+
+    def test_disabled_debug_costs_no_formatting(self):
+        setup_logging(self.folder.name, 'INFO')
+        ExpensiveRepr.calls = 0
+        self.log.debug("Rates %s", ExpensiveRepr())
+        self.assertEqual(0, ExpensiveRepr.calls)
+        self.assertEqual([], self.read_records())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os, sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask
+from services.metrics import MetricsRegistry, HTTP_REQUEST_SECONDS, instrument_flask
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('test_seconds', 'Test histogram', ('name',), (0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value, name='a')
+        registry.callback('test_queue', 'Test queue', lambda: 3)
+
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE test_seconds histogram', lines)
+        self.assertIn('test_seconds_bucket{name="a",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{name="a",le="1.0"} 3', lines)
+        self.assertIn('test_seconds_bucket{name="a",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_count{name="a"} 4', lines)
+        self.assertIn('test_queue 3', lines)
+
+    def test_requests_are_timed_per_route(self):
+        app = Flask(__name__)
+
+        @app.route('/item/<int:number>')
+        def item(number):
+            return str(number)
+
+        instrument_flask(app)
+        client = app.test_client()
+        client.get('/item/1')
+        client.get('/item/2')
+        client.get('/missing')
+
+        rendered = HTTP_REQUEST_SECONDS.samples()
+        self.assertIn('aetherone_http_request_duration_seconds_count{method="GET",route="/item/<int:number>",'
+                      'status="200"} 2', rendered)
+        self.assertIn('aetherone_http_request_duration_seconds_count{method="GET",route="unmatched",'
+                      'status="404"} 1', rendered)
+
+
+if __name__ == '__main__':
+    unittest.main()
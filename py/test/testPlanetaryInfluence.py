@@ -0,0 +1,37 @@
+import os, sys
+import unittest
+from datetime import date, datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.planetaryInfluence import PlanetaryRulershipCalendarAPI
+
+
+class PlanetaryInfluenceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.api = PlanetaryRulershipCalendarAPI(2024, 2026)
+
+    def test_winter_wraps_around_new_year(self):
+        season = self.api.get_season(datetime(2025, 1, 15))
+        self.assertEqual(season.season, 'Winter')
+        self.assertEqual(season.start, '2024-12-21')
+        self.assertEqual(season.end, '2025-03-19')
+        self.assertGreater(season.progress, 0)
+        self.assertEqual(self.api.get_season(datetime(2025, 12, 25)).end, '2026-03-19')
+
+    def test_days_range(self):
+        days = self.api.days(date(2024, 12, 30), date(2025, 1, 2))
+        self.assertEqual([day.date for day in days], ['2024-12-30', '2024-12-31', '2025-01-01', '2025-01-02'])
+        self.assertEqual(days[0].day, 'Monday')
+        self.assertEqual(days[0].planet, 'Moon')
+        self.assertEqual(days[0].hours[:3], ['Moon', 'Saturn', 'Jupiter'])
+        # years outside of the precomputed span are computed on demand
+        self.assertEqual(self.api.days(date(2030, 6, 1), date(2030, 6, 1))[0].day, 'Saturday')
+
+    def test_calendar_month_lengths(self):
+        months = self.api.generate_calendar(2024).to_dict()['months']
+        self.assertEqual([month['days_count'] for month in months], [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+if __name__ == "__main__":
+    unittest.main()
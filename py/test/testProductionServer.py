@@ -0,0 +1,104 @@
+import os, sys
+import socket
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.productionServer import BoundedWSGIServer
+
+REQUEST = b"GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n"
+
+
+class BoundedWSGIServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+
+        def app(environ, start_response):
+            self.release.wait(10)
+            start_response('200 OK', [('Content-Length', '2')])
+            return [b'OK']
+
+        self.server = BoundedWSGIServer('127.0.0.1', 0, app, max_workers=1, max_connections=2)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def connect(self, active: int) -> socket.socket:
+        connection = socket.create_connection(('127.0.0.1', self.server.server_port), timeout=10)
+        connection.sendall(REQUEST)
+        deadline = time.monotonic() + 5
+        while self.server.stats()['active_connections'] + self.server.stats()['rejected_connections'] < active:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        return connection
+
+    @staticmethod
+    def read(connection: socket.socket) -> bytes:
+        chunks = []
+        while chunk := connection.recv(4096):
+            chunks.append(chunk)
+        connection.close()
+        return b''.join(chunks)
+
+    def test_connections_above_the_limit_get_503(self):
+        handled = self.connect(1)
+        waiting = self.connect(2)
+        stats = self.server.stats()
+        self.assertEqual((2, 0), (stats['active_connections'], stats['rejected_connections']))
+
+        rejected = self.connect(3)
+        self.assertTrue(self.read(rejected).startswith(b"HTTP/1.1 503 Service Unavailable"))
+        self.assertEqual(1, self.server.stats()['rejected_connections'])
+
+        self.release.set()
+        for connection in (handled, waiting):
+            response = self.read(connection)
+            self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+            self.assertTrue(response.endswith(b"OK"))
+        self.assertTrue(self.server.drain(5))
+
+
+
+class KeepAliveTimeoutTestCase(unittest.TestCase):
+
+    def setUp(self):
+        def app(environ, start_response):
+            start_response('200 OK', [('Content-Length', str(64 * 1024 * 256))])
+            return (b'x' * 64 * 1024 for _ in range(256))  # 16 MB, more than the socket buffers hold
+
+        self.server = BoundedWSGIServer('127.0.0.1', 0, app, max_workers=1, keep_alive_timeout=0.2)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_slow_readers_get_the_whole_response(self):
+        connection = socket.create_connection(('127.0.0.1', self.server.server_port), timeout=10)
+        connection.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        received = 0
+        while received < 64 * 1024 * 256 + 50:  # the headers are a little longer
+            chunk = connection.recv(1024 * 1024)
+            if not chunk:
+                break
+            if received == 0:
+                time.sleep(1)  # a slow client, the server waits longer than the keep-alive timeout to send
+            received += len(chunk)
+        self.assertGreater(received, 64 * 1024 * 256)
+
+        # an idle keep-alive connection is still closed after the timeout
+        start = time.monotonic()
+        while connection.recv(1024 * 1024):
+            pass
+        self.assertLess(time.monotonic() - start, 5)
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os, sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.profilerService import SamplingProfiler, RequestProfiles
+
+
+def busy_worker(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def test_sampling_profiler_sees_other_threads(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_worker, args=(stop,), name='BusyWorker', daemon=True)
+        worker.start()
+        profiler = SamplingProfiler()
+        try:
+            self.assertTrue(profiler.start(0.3, 0.005))
+            self.assertFalse(profiler.start(1))
+            profiler.thread.join(2)
+        finally:
+            stop.set()
+            worker.join()
+
+        status = profiler.status()
+        self.assertFalse(status['running'])
+        self.assertGreater(status['threads']['BusyWorker'], 0)
+        lines = [line for line in profiler.collapsed().splitlines() if line.startswith('BusyWorker;')]
+        self.assertTrue(any('busy_worker (testProfiler.py' in line for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+
+    def test_request_profiles_keep_the_last_entries(self):
+        profiles = RequestProfiles(max_entries=2)
+        for number in range(3):
+            profile = profiles.begin()
+            time.sleep(0.001)
+            profiles.finish(profile, 'GET', f"/case?id={number}", 0.001)
+
+        self.assertEqual([3, 2], [entry['id'] for entry in profiles.list()])
+        self.assertIsNone(profiles.as_text(1))
+        self.assertIn('GET /case?id=2', profiles.as_text(3))
+
+
+if __name__ == '__main__':
+    unittest.main()
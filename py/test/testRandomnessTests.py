@@ -0,0 +1,53 @@
+import os, sys
+import json
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.randomnessTestService import RandomnessTests, bits_from_integers
+
+# the example sequence of the NIST SP 800-22 test descriptions
+EPSILON = [int(bit) for bit in
+           "1100100100001111110110101010001000100001011010001100001000110100110001001100011001100010100010111000"]
+
+
+class RandomnessTestsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tester = RandomnessTests()
+
+    def test_nist_examples(self):
+        self.assertAlmostEqual(0.109599, self.tester.monobit_test(EPSILON)['p_value'], places=6)
+        self.assertAlmostEqual(0.706438, self.tester.block_frequency_test(EPSILON, 10)['p_value'], places=6)
+        self.assertAlmostEqual(0.500798, self.tester.runs_test(EPSILON)['p_value'], places=6)
+        self.assertAlmostEqual(0.235301, self.tester.approximate_entropy_test(EPSILON, 2)['p_value'], places=6)
+
+    def test_fft_autocorrelation_equals_the_loop_per_lag(self):
+        bits = np.random.default_rng(1).integers(0, 2, 301).tolist()
+        expected = [sum(bits[i] == bits[i + lag] for i in range(len(bits) - lag)) / len(bits)
+                    for lag in range(1, len(bits) // 2)]
+        self.assertTrue(np.allclose(expected, self.tester.autocorrelation_test(bits)))
+
+        periodic = [0, 1, 1] * 1000
+        summary = self.tester.autocorrelation_summary(periodic)
+        self.assertFalse(summary['passed'])
+        self.assertEqual(0, summary['worst_lag'] % 3)
+
+    def test_hotbits_file(self):
+        self.assertEqual([0, 1, 0, 1, 1, 1, 1, 1], bits_from_integers([5, 2 ** 32 - 1], 4).tolist())
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'hotbits_1.json')
+            with open(path, 'w') as f:
+                json.dump({'integerList': np.random.default_rng(2).integers(0, 2 ** 32, 1000).tolist(),
+                           'source': 'test'}, f)
+            results = self.tester.test_hotbits_file(path)
+        self.assertEqual(32000, results['bits'])
+        self.assertTrue(results['passed'])
+        self.assertEqual({'monobit', 'block_frequency', 'runs', 'approximate_entropy', 'autocorrelation'},
+                         set(results['tests']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os, sys
+import unittest
+import xml.etree.ElementTree as ElementTree
+from io import BytesIO
+
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services import rateCard
+from services.rateCard import RadionicChart, CARD_WIDTH, CARD_HEIGHT, _svg_template
+
+
+class RateCardTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rates = RadionicChart.parse_input('10.34 5.75 1.5 4.65')
+        self.chart = RadionicChart('Chelidonium <Base10>', 'base10')
+
+    def test_png(self):
+        data, mimetype = self.chart.render(self.rates)
+        self.assertEqual('image/png', mimetype)
+        image = Image.open(BytesIO(data))
+        self.assertEqual((CARD_WIDTH, CARD_HEIGHT), image.size)
+        self.assertEqual('P', image.mode)
+        # the rate lines are red, the background white
+        rgb = image.convert('RGB')
+        self.assertEqual((255, 255, 255), rgb.getpixel((5, 5)))
+        (x1, y1), (x2, y2) = next(self.chart._rate_lines(self.rates))
+        red, green, blue = rgb.getpixel((round((x1 + x2) / 2), round((y1 + y2) / 2)))
+        self.assertGreater(red, 200)
+        self.assertLess(max(green, blue), 60)
+
+        # the dial of the base is drawn once and shared by all charts
+        template = rateCard._templates['base10']
+        RadionicChart('Other', 'base10').render(self.rates)
+        self.assertIs(template, rateCard._templates['base10'])
+        jpeg, mimetype = self.chart.render(self.rates, 'jpeg')
+        self.assertEqual(('image/jpeg', 'RGB'), (mimetype, Image.open(BytesIO(jpeg)).mode))
+
+    def test_svg(self):
+        self.chart.render(self.rates, 'svg')
+        hits = _svg_template.cache_info().hits
+        data, mimetype = self.chart.render(self.rates, 'svg')
+        self.assertEqual('image/svg+xml', mimetype)
+        self.assertEqual(hits + 1, _svg_template.cache_info().hits)
+
+        svg = ElementTree.fromstring(data)
+        self.assertEqual((str(CARD_WIDTH), str(CARD_HEIGHT)), (svg.get('width'), svg.get('height')))
+        namespace = '{http://www.w3.org/2000/svg}'
+        self.assertEqual(len(self.rates), len([line for line in svg.iter(namespace + 'line')
+                                                if line.get('stroke') == 'red']))
+        self.assertIn('Chelidonium <Base10>', [text.text for text in svg.iter(namespace + 'text')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os, sys
+import re
+import tempfile
+import unittest
+import zipfile
+from io import BytesIO
+
+from PIL import Image
+from werkzeug.test import EnvironBuilder
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.rateCardBatch import PdfStreamWriter, RateCardBatchRenderer
+
+CARDS = [{'name': 'Arnica', 'rates': '10 20 30 40'}, {'name': 'Sulfur / Hepar', 'rates': '1 2 3 4'}]
+
+
+def jpeg(width: int, height: int) -> bytes:
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'white').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class RateCardBatchTestCase(unittest.TestCase):
+
+    def test_pdf_stream_writer(self):
+        writer = PdfStreamWriter(20, 10)
+        pdf = writer.header() + writer.page(jpeg(20, 10)) + writer.page(jpeg(20, 10)) + writer.finish()
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertTrue(pdf.endswith(b'%%EOF\n'))
+        self.assertIn(b'/Kids [5 0 R 8 0 R] /Count 2', pdf)
+        # the cross-reference table points at the objects
+        xref = int(re.search(rb'startxref\n(\d+)', pdf).group(1))
+        self.assertTrue(pdf[xref:].startswith(b'xref\n0 9\n'))
+        offsets = re.findall(rb'(\d{10}) 00000 n', pdf[xref:])
+        for number, offset in enumerate(offsets, 1):
+            self.assertTrue(pdf[int(offset):].startswith(b'%d 0 obj' % number))
+
+    def test_zip_and_pdf_streams(self):
+        renderer = RateCardBatchRenderer(max_workers=1, max_jobs=1)
+        try:
+            slot = renderer.try_acquire()
+            self.assertIsNotNone(slot)
+            self.assertIsNone(renderer.try_acquire())
+            archive = zipfile.ZipFile(BytesIO(b''.join(renderer.stream_zip(CARDS, 'base10', 'png', slot))))
+            self.assertEqual(['01_Arnica.png', '02_Sulfur___Hepar.png'], archive.namelist())
+            self.assertEqual('P', Image.open(BytesIO(archive.read('01_Arnica.png'))).mode)
+
+            slot = renderer.try_acquire()
+            self.assertIsNotNone(slot)
+            pdf = b''.join(renderer.stream_pdf(CARDS, 'base10', slot))
+            self.assertEqual(2, pdf.count(b'/Type /Page /Parent'))
+            self.assertIsNotNone(renderer.try_acquire())
+        finally:
+            renderer.shutdown()
+
+
+class RateCardsEndpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        from main import AetherOnePy
+        self.folder = tempfile.TemporaryDirectory()
+        self.aetherOnePy = AetherOnePy('production', project_root=self.folder.name, collect_hotbits=False)
+        self.client = self.aetherOnePy.app.test_client()
+
+    def tearDown(self):
+        self.aetherOnePy.rateCardBatch.shutdown()
+        self.aetherOnePy.analysisJobs.shutdown()
+        self.aetherOnePy.aetherOneDB.close()
+        self.folder.cleanup()
+
+    def test_slots_are_released_when_the_client_disconnects(self):
+        renderer = self.aetherOnePy.rateCardBatch
+        held = [renderer.try_acquire(), renderer.try_acquire()]
+        response = self.client.post('/rateCards', json={'rates': CARDS})
+        self.assertEqual(503, response.status_code)
+        for slot in held:
+            slot.release()
+            slot.release()  # a second release does nothing
+
+        # the server closes the body without reading it (client gone), more often than there are slots
+        for _ in range(3):
+            environ = EnvironBuilder('/rateCards', method='POST', json={'rates': CARDS, 'format': 'pdf'}).get_environ()
+            statuses = []
+            body = self.aetherOnePy.app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            self.assertEqual(['200 OK'], statuses)
+            body.close()
+        response = self.client.post('/rateCards', json={'rates': CARDS})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, len(zipfile.ZipFile(BytesIO(response.data)).namelist()))
+
+
+if __name__ == '__main__':
+    unittest.main()
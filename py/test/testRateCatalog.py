@@ -0,0 +1,70 @@
+import os, sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.stubHotbits import StubHotbitsService
+from domains.aetherOneDomains import Catalog, Rate
+from services.analyzeService import analyze, analyze_catalogs
+from services.databaseService import CaseDAO
+
+
+class RateCatalogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.dao = CaseDAO(os.path.join(self.folder.name, 'aetherone.db'))
+        self.dao.insert_catalog(Catalog('Generated', '', ''))
+        self.catalog_id = self.dao.get_catalog_by_name('Generated').id
+        self.dao.conn.executemany('INSERT INTO rate (signature, description, catalog_id) VALUES (?, ?, ?)',
+                                  [(f"Rate {n}", f"Description {n}", self.catalog_id) for n in range(500)])
+        os.makedirs(os.path.join(self.folder.name, 'hotbits'))
+        self.hotbits = StubHotbitsService(os.path.join(self.folder.name, 'hotbits'), self.dao)
+
+    def tearDown(self):
+        self.dao.close()
+        self.folder.cleanup()
+
+    def test_columns_are_cached_until_the_catalog_changes(self):
+        catalog = self.dao.get_catalog_columns(self.catalog_id)
+        self.assertEqual(500, len(catalog))
+        self.assertIs(catalog, self.dao.get_catalog_columns(self.catalog_id))
+        self.assertEqual({}, catalog.loaded_descriptions)
+        self.dao.insert_rate(Rate('Arnica', 'Bruises', self.catalog_id))
+        self.assertEqual(501, len(self.dao.get_catalog_columns(self.catalog_id)))
+
+    def test_only_selected_rates_are_materialized(self):
+        catalog = self.dao.get_catalog_columns(self.catalog_id)
+        for enhanced in (False, True):
+            rates = analyze(7, catalog, self.hotbits, enhancedAnalysis=enhanced)
+            self.assertLessEqual(len(rates), 24)
+            self.assertGreaterEqual(rates[0].energetic_value, 1000)
+            self.assertEqual(sorted((r.energetic_value for r in rates), reverse=True),
+                             [r.energetic_value for r in rates])
+            for rate in rates:
+                self.assertEqual(f"Description {rate.signature.split()[1]}", rate.description)
+                self.assertEqual(7, rate.analysis_id)
+        self.assertLessEqual(len(catalog.loaded_descriptions), 48)
+
+    def test_several_catalogs_in_one_pass(self):
+        self.dao.insert_catalog(Catalog('Small', '', ''))
+        small_id = self.dao.get_catalog_by_name('Small').id
+        for signature in ('Arnica', 'Sulfur', 'Zincum'):
+            self.dao.insert_rate(Rate(signature, signature.lower(), small_id))
+        catalogs = [self.dao.get_catalog_columns(self.catalog_id), self.dao.get_catalog_columns(small_id)]
+        rates = analyze_catalogs(3, catalogs, self.hotbits, top_n=10)
+        self.assertEqual([self.catalog_id] * 10 + [small_id] * 3, [rate.catalog_id for rate in rates])
+        self.assertEqual({'arnica', 'sulfur', 'zincum'}, {rate.description for rate in rates[10:]})
+        self.assertGreaterEqual(max(rate.energetic_value for rate in rates[10:]), 1000)
+
+        self.dao.insert_rates_for_analysis(rates)
+        self.assertEqual(13, len(self.dao.list_rates_for_analysis(3)))
+
+    def test_rate_lists_are_still_accepted(self):
+        rates = analyze(1, self.dao.list_rates_from_catalog(self.catalog_id)[:30], self.hotbits)
+        self.assertEqual(24, len(rates))
+        self.assertEqual([], analyze(1, [], self.hotbits))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os, sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask
+from services.responseCache import ResponseCache
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.folder.name, '1.0.0', max_memory_bytes=100, max_disk_bytes=250)
+        self.calls = 0
+        self.app = Flask(__name__)
+
+        @self.app.route('/card/<int:number>')
+        def card(number):
+            def produce():
+                self.calls += 1
+                return bytes([number]) * 60, 'image/png'
+            return self.cache.respond('card', {'number': number}, produce)
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_conditional_get(self):
+        response = self.client.get('/card/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+
+        response = self.client.get('/card/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(self.calls, 1)
+
+    def test_memory_and_disk_lru(self):
+        for number in (1, 2, 3):
+            self.client.get(f'/card/{number}')
+        # only one 60 byte entry fits into memory, the disk keeps the last three
+        self.assertEqual(self.cache.stats()['memory_entries'], 1)
+        self.assertEqual(self.cache.stats()['disk_entries'], 3)
+
+        response = self.client.get('/card/1')
+        self.assertEqual(response.data, bytes([1]) * 60)
+        self.assertEqual(self.calls, 3)
+        stats = self.cache.stats()
+        self.assertEqual(stats['disk_hits'], 1)
+        self.assertEqual(stats['misses'], 3)
+        self.assertAlmostEqual(stats['hit_rate'], 0.25)
+
+        self.client.get('/card/4')
+        self.assertEqual(self.cache.stats()['disk_entries'], 3)
+        self.assertNotIn(self.cache.key('card', {'number': 2}), os.listdir(self.folder.name))
+
+    def test_index_survives_restart(self):
+        self.client.get('/card/5')
+        cache = ResponseCache(self.folder.name, '1.0.0')
+        self.assertIsNotNone(cache.get(cache.key('card', {'number': 5})))
+        # a new version invalidates all keys
+        cache = ResponseCache(self.folder.name, '1.0.1')
+        self.assertIsNone(cache.get(cache.key('card', {'number': 5})))
+
+
+if __name__ == "__main__":
+    unittest.main()
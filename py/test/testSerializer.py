@@ -0,0 +1,40 @@
+import os, sys
+import gzip
+import json
+import unittest
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask
+from domains.aetherOneDomains import Case, Analysis, AnalysisRate
+from services.serializer import dumps, json_response, enable_compression
+
+
+class SerializerTestCase(unittest.TestCase):
+
+    def test_domain_objects_match_to_dict(self):
+        now = datetime(2025, 3, 1, 10, 30, 15, 250)
+        objects = [Case('Käse', 'mail@example.com', '#ff0000', 'Description', now, now),
+                   Analysis('Note', 3),
+                   AnalysisRate('Arnica', 'Bruises', 1, 2, 3, 512, 4, 'C', 30, '')]
+        self.assertEqual(json.loads(json.dumps([o.to_dict() for o in objects])), json.loads(dumps(objects)))
+
+    def test_large_responses_are_compressed(self):
+        app = Flask(__name__)
+        enable_compression(app, min_size=100)
+
+        @app.route('/rates')
+        def rates():
+            return json_response([{'signature': f"Rate {n}"} for n in range(100)])
+
+        client = app.test_client()
+        plain = client.get('/rates')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        compressed = client.get('/rates', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual('gzip', compressed.headers['Content-Encoding'])
+        self.assertEqual(plain.data, gzip.decompress(compressed.data))
+        self.assertLess(len(compressed.data), len(plain.data))
+
+
+if __name__ == '__main__':
+    unittest.main()
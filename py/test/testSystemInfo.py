@@ -0,0 +1,29 @@
+import os, sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.systemInfo import SystemInfo
+
+
+class SystemInfoTestCase(unittest.TestCase):
+
+    def test_dynamic_values_are_cached(self):
+        systemInfo = SystemInfo(False, refresh_seconds=60)
+        calls = []
+        dynamic = systemInfo._dynamic
+        systemInfo._dynamic = lambda: calls.append(1) or dynamic()
+
+        first = systemInfo.snapshot()
+        second = systemInfo.snapshot()
+        self.assertIs(first, second)
+        self.assertEqual(1, len(calls))
+        self.assertIn('memoryAvailable', first)
+        self.assertFalse(first['raspberryPi'])
+
+        systemInfo.refresh_seconds = 0
+        systemInfo.snapshot()
+        self.assertEqual(2, len(calls))
+
+
+if __name__ == '__main__':
+    unittest.main()